@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# scripts/benchmark_configs.py
+"""Benchmark the config scripts against synthetic config trees.
+
+Generates a tree with generate_synthetic_configs.py for a scale preset,
+then runs validate_configs.py, generate_tf_vars.py and detect_changes.py
+against it as child processes, measuring wall time, peak RSS and output
+size of each scenario. Results are compared with the stored baselines in
+scripts/benchmarks/config_baselines.json and the run fails when a
+scenario got slower, bigger in memory or bigger in output than its
+baseline allows:
+
+    python scripts/benchmark_configs.py --preset medium
+    python scripts/benchmark_configs.py --preset medium --update-baseline
+
+Timings depend on the machine; refresh the baselines with
+--update-baseline on the machine that runs the comparison.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmark_thresholds import run_child
+from generate_synthetic_configs import generate_tree
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPTS_DIR.parent
+BASELINE_FILE = SCRIPTS_DIR / 'benchmarks' / 'config_baselines.json'
+
+# name: apps, environments, services per app, log lines per service
+PRESETS = {
+    "small": (20, ["qa", "staging", "prd"], 10, 5),
+    "medium": (100, ["qa", "staging", "prd"], 20, 10),
+    "large": (500, ["qa", "staging", "prd"], 50, 20),
+}
+
+# Allowed growth over the baseline before a metric counts as a regression
+TOLERANCES = {"seconds": 0.25, "peak_rss_mb": 0.15, "output_bytes": 0.0}
+# Absolute growth that is always allowed, so sub-second scenarios do not flap on noise
+SLACK = {"seconds": 0.1, "peak_rss_mb": 2.0, "output_bytes": 0}
+# Metrics reported but not compared: detect's output is the GitHub Actions matrix on
+# stdout, whose size follows the output format rather than the work done
+UNGATED = {"detect": {"output_bytes"}}
+
+# name: (script, warm config cache, reuse previous output)
+SCENARIOS = {
+    "validate-cold": ("validate_configs.py", False, False),
+    "validate-warm": ("validate_configs.py", True, False),
+    "generate-cold": ("generate_tf_vars.py", False, False),
+    "generate-warm": ("generate_tf_vars.py", True, False),
+    "generate-incremental": ("generate_tf_vars.py", True, True),
+    "detect": ("detect_changes.py", True, False),
+}
+
+
+def directory_size(path):
+    return sum(entry.stat().st_size for entry in Path(path).rglob('*') if entry.is_file())
+
+
+def scenario_command(name, tree, work_dir, jobs):
+    """Return the command line of a scenario and the path its output is measured at, if any."""
+    script, _, incremental = SCENARIOS[name]
+    apps_dir, env_dir = tree / 'applications', tree / 'environments'
+    command = [sys.executable, str(SCRIPTS_DIR / script)]
+
+    if script == 'validate_configs.py':
+        return command + ['--apps-dir', str(apps_dir), '--env-dir', str(env_dir), '--jobs', str(jobs)], None
+
+    if script == 'generate_tf_vars.py':
+        output = work_dir / 'output'
+        if not incremental:
+            shutil.rmtree(output, ignore_errors=True)
+            manifest = work_dir / 'manifest.json'
+            if manifest.exists():
+                manifest.unlink()
+        return command + ['--all', '--apps-dir', str(apps_dir), '--env-dir', str(env_dir),
+                          '--output-pattern', str(output / '{env}' / '{app}.tfvars.json'),
+                          '--manifest', str(work_dir / 'manifest.json'), '--jobs', str(jobs)], output
+
+    # A change to every tenth application config, in git's repository-relative notation
+    changed = [Path(os.path.relpath(path, ROOT)).as_posix() for path in sorted(apps_dir.glob('*.yaml'))[::10]]
+    return command + ['--apps-dir', str(apps_dir), '--env-dir', str(env_dir), *changed], None
+
+
+def run_scenario(name, tree, work_dir, jobs):
+    _, warm, _ = SCENARIOS[name]
+    cache = work_dir / 'cache'
+    if not warm:
+        shutil.rmtree(cache, ignore_errors=True)
+
+    command, output = scenario_command(name, tree, work_dir, jobs)
+    stdout_file = work_dir / f"{name}.stdout"
+    env = dict(os.environ, MONITOR_CONFIG_CACHE_DIR=str(cache))
+    exit_code, elapsed, rss, stderr = run_child(command, env, stdout_file)
+    if exit_code != 0:
+        print(f"Warning: {name} exited with {exit_code}: {stderr.strip()}")
+
+    return {
+        "exit_code": exit_code,
+        "seconds": round(elapsed, 3),
+        "peak_rss_mb": round(rss, 1),
+        "output_bytes": directory_size(output) if output is not None else stdout_file.stat().st_size,
+    }
+
+
+def load_baselines():
+    try:
+        with open(BASELINE_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baselines(baselines):
+    BASELINE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(BASELINE_FILE, 'w') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results, baseline):
+    """Return a description of every metric that regressed past its tolerance."""
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        for metric, tolerance in TOLERANCES.items():
+            if metric in UNGATED.get(name, ()):
+                continue
+            if result[metric] > expected[metric] * (1 + tolerance) + SLACK[metric]:
+                regressions.append(f"{name}: {metric} {result[metric]} exceeds baseline {expected[metric]} "
+                                   f"(+{tolerance:.0%} allowed)")
+    return regressions
+
+
+def print_report(results, baseline):
+    print(f"{'scenario':<22}{'wall s':>10}{'baseline':>10}{'RSS MB':>9}{'baseline':>10}{'output':>13}{'baseline':>13}")
+    for name, result in results.items():
+        expected = baseline.get(name, {})
+        print(f"{name:<22}{result['seconds']:>10}{expected.get('seconds', '-'):>10}"
+              f"{result['peak_rss_mb']:>9}{expected.get('peak_rss_mb', '-'):>10}"
+              f"{result['output_bytes']:>13}{expected.get('output_bytes', '-'):>13}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the config scripts against a synthetic config tree')
+    parser.add_argument('--preset', default='small', choices=PRESETS, help='Tree scale (default: small)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma separated scenarios to run, in order (default: {','.join(SCENARIOS)})")
+    parser.add_argument('--jobs', type=int, default=1, help='--jobs passed to the scripts (default: 1)')
+    parser.add_argument('--tree', help='Keep the synthetic tree in this directory instead of a temporary one')
+    parser.add_argument('--update-baseline', action='store_true', help='Store these results as the preset baseline')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    apps, envs, services, log_lines = PRESETS[args.preset]
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_dir = Path(work_dir)
+        tree = Path(args.tree) if args.tree else work_dir / 'tree'
+        files = generate_tree(tree, apps, envs, services, log_lines)
+        print(f"Benchmarking preset {args.preset}: {apps} apps x {len(envs)} envs x {services} services "
+              f"x {log_lines} log lines ({files} config files)")
+
+        results = {name: run_scenario(name, tree, work_dir, args.jobs) for name in names}
+
+    baselines = load_baselines()
+    baseline = baselines.get(args.preset, {})
+    print_report(results, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"preset": args.preset, "results": results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    if any(result["exit_code"] != 0 for result in results.values()):
+        sys.exit(1)
+
+    if args.update_baseline:
+        baselines[args.preset] = {**baseline, **{
+            name: {metric: result[metric] for metric in TOLERANCES} for name, result in results.items()
+        }}
+        save_baselines(baselines)
+        print(f"Baseline for {args.preset} saved to {BASELINE_FILE}")
+        return
+
+    regressions = compare(results, baseline)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
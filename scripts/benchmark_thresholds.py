@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# scripts/benchmark_thresholds.py
+"""Benchmark the threshold pipeline against the local fake Datadog API.
+
+Starts scripts/fake_datadog.py in-process, then runs
+generate_alb_thresholds.py (and validate_datadog_creds.py) as child
+processes against it for a synthetic fleet of ALBs. For every scenario it
+reports wall time, requests, throttled requests, points served, requests
+and points per second, and the peak RSS of the child process.
+
+    python scripts/benchmark_thresholds.py --albs 200 --interval 300 --latency-ms 40
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fake_datadog import add_fake_arguments, fake_from_args, start_server
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+# name: (script, extra arguments, throttled, fresh store)
+SCENARIOS = {
+    "validate": ("validate_datadog_creds.py", [], False, False),
+    "cold": ("generate_alb_thresholds.py", [], False, True),
+    "warm": ("generate_alb_thresholds.py", [], False, False),
+    "sketch-cold": ("generate_alb_thresholds.py", ["--sketch", "--baseline"], False, True),
+    "sketch-warm": ("generate_alb_thresholds.py", ["--sketch", "--baseline"], False, False),
+    "throttled": ("generate_alb_thresholds.py", [], True, True),
+}
+
+
+def peak_rss_mb(rusage):
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return rusage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def run_child(command, env, stdout_path=None):
+    """Run a child process and return its exit code, wall time and peak RSS in MB.
+
+    The child's stdout is discarded unless stdout_path is given.
+    """
+    stdout = open(stdout_path, 'wb') if stdout_path is not None else subprocess.DEVNULL
+    started = time.perf_counter()
+    try:
+        process = subprocess.Popen(command, env=env, stdout=stdout, stderr=subprocess.PIPE)
+    finally:
+        if stdout_path is not None:
+            stdout.close()
+    _, status, rusage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - started
+    stderr = process.stderr.read().decode('utf-8', 'replace')
+    process.stderr.close()
+    return os.waitstatus_to_exitcode(status), elapsed, peak_rss_mb(rusage), stderr
+
+
+def run_scenario(name, fake, api_url, albs, args, work_dir):
+    script, extra, throttled, fresh = SCENARIOS[name]
+    store = Path(work_dir) / ('store-sketch' if '--sketch' in extra else 'store')
+    if fresh and store.exists():
+        for path in store.rglob('*'):
+            if path.is_file():
+                path.unlink()
+
+    # A budget file of its own, so the fake server's limits never reach the one real runs share
+    env = dict(os.environ, DATADOG_HOST=api_url, DATADOG_API_KEY='benchmark', DATADOG_APP_KEY='benchmark',
+               ALB_SERIES_STORE_DIR=str(store), DATADOG_RATE_BUDGET_FILE=str(Path(work_dir) / f"rate_budget-{name}.json"))
+    command = [sys.executable, str(SCRIPTS_DIR / script)]
+    if script == 'generate_alb_thresholds.py':
+        command += ["--env", "bench", "--alb", ",".join(albs), "--batch-size", str(args.batch_size),
+                    "--concurrency", str(args.concurrency), "--output-dir", str(work_dir),
+                    "--index-dir", str(work_dir), *extra]
+
+    fake.throttle_rate = args.throttle_rate if throttled else 0.0
+    with fake.lock:
+        before = dict(fake.stats)
+    exit_code, elapsed, rss, stderr = run_child(command, env)
+    with fake.lock:
+        served = {key: fake.stats[key] - before[key] for key in before}
+
+    if exit_code != 0:
+        print(f"Warning: {name} exited with {exit_code}: {stderr.strip()}")
+
+    return {
+        "scenario": name,
+        "exit_code": exit_code,
+        "seconds": round(elapsed, 3),
+        "requests": served["requests"],
+        "throttled": served["throttled"],
+        "points": served["points"],
+        "requests_per_second": round(served["requests"] / elapsed, 1),
+        "points_per_second": round(served["points"] / elapsed),
+        "peak_rss_mb": round(rss, 1),
+    }
+
+
+def print_report(results):
+    columns = ["scenario", "seconds", "requests", "throttled", "points", "requests_per_second",
+               "points_per_second", "peak_rss_mb"]
+    headers = ["scenario", "wall s", "requests", "429s", "points", "req/s", "points/s", "peak RSS MB"]
+    rows = [headers] + [[str(result[column]) for column in columns] for result in results]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    for row in rows:
+        print("  ".join(cell.ljust(width) if i == 0 else cell.rjust(width) for i, (cell, width) in enumerate(zip(row, widths))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ALB threshold pipeline against a fake Datadog API')
+    parser.add_argument('--albs', type=int, default=50, help='Number of synthetic ALBs (default: 50)')
+    parser.add_argument('--batch-size', type=int, default=20, help='ALBs per grouped query (default: 20)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Queries in flight at once (default: 4)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma separated scenarios to run, in order (default: {','.join(SCENARIOS)})")
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    add_fake_arguments(parser)
+    parser.set_defaults(throttle_rate=0.1)
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    fake = fake_from_args(args)
+    server = start_server(fake)
+    api_url = f"http://127.0.0.1:{server.server_address[1]}"
+    albs = [f"app/bench-alb-{i:04d}/{i:016x}" for i in range(args.albs)]
+    print(f"Benchmarking {args.albs} ALBs against {api_url} "
+          f"(interval {args.interval}s, latency {args.latency_ms}ms, throttled scenario at {args.throttle_rate:.0%})")
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name in names:
+            results.append(run_scenario(name, fake, api_url, albs, args, work_dir))
+    server.shutdown()
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"parameters": vars(args), "results": results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    if any(result["exit_code"] != 0 for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
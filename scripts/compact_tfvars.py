@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# scripts/compact_tfvars.py
+"""Compact form of rendered monitor families.
+
+Entries of a family repeat the same cluster, alert settings, tags and
+threshold blocks. The compact form hoists, per family, the most common
+value of every field all entries have into a defaults object and keeps
+only what differs from it in each entry:
+
+    services          = {"api": {"name": "api", "thresholds": {"cpu_percent": 95}}, ...}
+    services_defaults = {"cluster": "...", "thresholds": {"cpu_percent": 85, ...}, ...}
+
+Fields are two levels deep: scalars, and objects such as thresholds whose
+own fields are merged key by key. expand_entry() is the inverse and
+mirrors the merge the tofu root module performs on the compact variables.
+"""
+
+import json
+
+DEFAULTS_SUFFIX = '_defaults'
+
+
+def defaults_name(family):
+    """Return the name of the variable holding a family's defaults."""
+    return f"{family}{DEFAULTS_SUFFIX}"
+
+
+def _value_key(value):
+    try:
+        hash(value)
+        return type(value), value
+    except TypeError:
+        return type(value), json.dumps(value, sort_keys=True)
+
+
+def _common_values(dicts):
+    """Return, for every key all dicts have, its most common value when at least two dicts share it."""
+    keys = set(dicts[0]).intersection(*dicts[1:])
+    common = {}
+    for key in sorted(keys):
+        counts = {}
+        for item in dicts:
+            value_key = _value_key(item[key])
+            count, _ = counts.get(value_key, (0, None))
+            counts[value_key] = (count + 1, item[key])
+        count, value = max(counts.values(), key=lambda entry: entry[0])
+        if count > 1:
+            common[key] = value
+    return common
+
+
+def family_defaults(entries):
+    """Pick the defaults of a family from its entries."""
+    entries = list(entries.values())
+    if len(entries) < 2:
+        return {}
+
+    defaults = {}
+    fields = set(entries[0]).intersection(*entries[1:])
+    nested = {field for field in fields if all(isinstance(entry[field], dict) for entry in entries)}
+    for field in sorted(nested):
+        common = _common_values([entry[field] for entry in entries])
+        if common:
+            defaults[field] = common
+    defaults.update(_common_values([{field: entry[field] for field in fields - nested} for entry in entries]))
+    return defaults
+
+
+def entry_delta(defaults, entry, interned):
+    """Return what an entry adds to the defaults, sharing identical nested deltas through interned."""
+    delta = {}
+    for field, value in entry.items():
+        default = defaults.get(field)
+        if isinstance(default, dict):
+            nested = {key: item for key, item in value.items() if key not in default or default[key] != item
+                      or type(default[key]) is not type(item)}
+            if nested:
+                delta[field] = interned.setdefault(_value_key(nested), nested)
+        elif field not in defaults or default != value or type(default) is not type(value):
+            delta[field] = value
+    return delta
+
+
+def expand_entry(defaults, delta):
+    """Rebuild a full entry from the defaults and its delta."""
+    entry = {}
+    for field, value in defaults.items():
+        entry[field] = {**value, **delta.get(field, {})} if isinstance(value, dict) else value
+    for field, value in delta.items():
+        if not isinstance(defaults.get(field), dict):
+            entry[field] = value
+    return entry
+
+
+def compact_tf_vars(tf_vars, families):
+    """Return the variables with each family replaced by its deltas plus a <family>_defaults variable.
+
+    The rendered variables are not modified; unchanged nested objects are
+    shared with them rather than copied.
+    """
+    compacted = dict(tf_vars)
+    interned = {}
+    for family in families:
+        entries = tf_vars[family]
+        defaults = family_defaults(entries)
+        compacted[family] = {key: entry_delta(defaults, entry, interned) for key, entry in entries.items()}
+        compacted[defaults_name(family)] = defaults
+    return compacted
+
+
+def expand_tf_vars(tf_vars, families):
+    """Inverse of compact_tf_vars()."""
+    expanded = dict(tf_vars)
+    for family in families:
+        defaults = expanded.pop(defaults_name(family), {})
+        expanded[family] = {key: expand_entry(defaults, delta) for key, delta in tf_vars[family].items()}
+    return expanded
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# scripts/computed_thresholds.py
+"""Computed threshold layer.
+
+generate_alb_thresholds.py --index-dir derives ALB thresholds from each
+load balancer's history and records them in one index per environment,
+e.g. monitor_configs/computed/<env>.json:
+
+    {"format": 1, "environment": "qa", "albs": {
+        "app/qa-alb-1/123": {"latency": {"value": 0.42, "computed_at": 1760000000, "ttl": 604800}, ...}}}
+
+The feed is opt-in: only with --computed-dir does generate_tf_vars.py
+resolve an ALB threshold from the environment override, then a fresh
+computed value, then the application config, then the static default.
+A value older than its TTL is ignored, so a threshold that is no longer
+recomputed falls back to the configured one instead of going stale. Each index is read and filtered once per process, and a
+render only does dict lookups in the result, however many ALBs it holds.
+"""
+
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from config_loader import content_hash
+
+INDEX_FORMAT = 1
+DEFAULT_TTL = 7 * 24 * 3600
+
+# (directory, env) -> fresh thresholds, see computed_thresholds()
+_fresh = {}
+
+
+def index_path(directory, env):
+    return Path(directory) / f"{env}.json"
+
+
+def empty_index(env):
+    return {"format": INDEX_FORMAT, "environment": env, "albs": {}}
+
+
+def parse_index(data, name):
+    """Parse index content; name is reported in errors."""
+    index = json.loads(data)
+    if index.get('format') != INDEX_FORMAT:
+        raise ValueError(f"{name}: unsupported computed threshold index format {index.get('format')!r}")
+    return index
+
+
+def read_index(directory, env):
+    """Return the index of an environment, or an empty one when there is none."""
+    path = index_path(directory, env)
+    try:
+        with open(path, 'rb') as f:
+            return parse_index(f.read(), path)
+    except FileNotFoundError:
+        return empty_index(env)
+
+
+def fresh_thresholds(index, now=None):
+    """Return {alb_name: {threshold: value}} for the entries of an index that are within their TTL."""
+    now = time.time() if now is None else now
+    fresh = {}
+    for alb, entries in index['albs'].items():
+        values = {name: entry['value'] for name, entry in entries.items() if now < entry['computed_at'] + entry['ttl']}
+        if values:
+            fresh[alb] = values
+    return fresh
+
+
+def computed_thresholds(directory, env):
+    """Return the fresh computed thresholds of an environment, read once per process; {} when directory is None."""
+    if directory is None:
+        return {}
+    key = (str(directory), env)
+    fresh = _fresh.get(key)
+    if fresh is None:
+        fresh = _fresh[key] = fresh_thresholds(read_index(directory, env))
+    return fresh
+
+
+def thresholds_digest(fresh):
+    """Return a short digest of fresh thresholds, which changes when a value is recomputed or expires."""
+    return content_hash(json.dumps(fresh, sort_keys=True).encode('utf-8'))[:12]
+
+
+def update_index(directory, env, thresholds, ttl=DEFAULT_TTL, now=None):
+    """Record computed thresholds in the index of an environment; returns the index path.
+
+    thresholds maps an ALB name to {threshold: value}. Entries of other
+    ALBs and thresholds are kept; the file is replaced atomically.
+    """
+    now = int(time.time() if now is None else now)
+    index = read_index(directory, env)
+    for alb, values in thresholds.items():
+        entries = index['albs'].setdefault(alb, {})
+        for name, value in values.items():
+            entries[name] = {"value": round(value, 3), "computed_at": now, "ttl": ttl}
+
+    path = index_path(directory, env)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# scripts/config_layers.py
+"""Layered environment configs.
+
+The environment config of a pair is resolved from up to four layers, each
+overriding the ones before it:
+
+    environments/_global.yaml            every application and environment
+    environments/<app>/_base.yaml        every environment of the application
+    environments/<app>/<env>.yaml        the environment itself (required)
+    environments/_regions/<region>.yaml  the region named by a `region:` key, if any
+
+Mappings are merged key by key; any other value, lists included, replaces
+the inherited one. Files and directories whose name starts with an
+underscore are layers, never environments.
+
+Merged chains of layers are memoized per process by the content hashes of
+their layers, so a batch render merges the global and application layers
+once and reuses the result for every environment inheriting them.
+"""
+
+import os
+import pickle
+from pathlib import Path
+
+from config_loader import content_hash, load_yaml_bytes
+
+LAYER_PREFIX = '_'
+GLOBAL_LAYER = '_global.yaml'
+BASE_LAYER = '_base.yaml'
+REGIONS_DIR = '_regions'
+
+# Content hashes of a chain of layers -> the merged config, pickled so
+# every caller gets its own copy
+_merged = {}
+
+
+def is_layer(path, env_dir):
+    """Return whether a YAML file under env_dir is a shared layer rather than an environment."""
+    return any(part.startswith(LAYER_PREFIX) for part in Path(os.path.relpath(path, env_dir)).parts)
+
+
+def layer_paths(env_dir, app_name, env):
+    """Return the global, application and environment layers of a pair, whether they exist or not."""
+    env_dir = Path(env_dir)
+    return [env_dir / GLOBAL_LAYER, env_dir / app_name / BASE_LAYER, env_dir / app_name / f"{env}.yaml"]
+
+
+def region_path(env_dir, region):
+    return Path(env_dir) / REGIONS_DIR / f"{region}.yaml"
+
+
+def input_paths(env_dir, app_name, env):
+    """Return the existing files the environment config of a pair may be resolved from.
+
+    Which region a pair selects is only known once its layers are parsed,
+    so every region layer is included.
+    """
+    paths = [path for path in layer_paths(env_dir, app_name, env) if path.exists()]
+    return paths + sorted((Path(env_dir) / REGIONS_DIR).glob('*.yaml'))
+
+
+def merge_config(base, overlay):
+    """Return overlay merged onto base; neither is modified."""
+    merged = dict(base)
+    for key, value in overlay.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def read_file(path):
+    """Return the content of a file, or None when it does not exist."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def merge_layers(layers):
+    """Merge (path, content) layers in order, reusing the longest chain merged before."""
+    chains = []
+    for _, data in layers:
+        chains.append((chains[-1] if chains else ()) + (content_hash(data),))
+
+    start = len(chains)
+    while start > 0 and chains[start - 1] not in _merged:
+        start -= 1
+    config = pickle.loads(_merged[chains[start - 1]]) if start else {}
+
+    for (path, data), chain in zip(layers[start:], chains[start:]):
+        config = merge_config(config, load_yaml_bytes(data, path) or {})
+        _merged[chain] = pickle.dumps(config, protocol=pickle.HIGHEST_PROTOCOL)
+    return config
+
+
+def resolve_env_config(env_dir, app_name, env, read=read_file):
+    """Return the merged environment config of a pair and the layer files it was resolved from.
+
+    read returns the content of a layer path or None when it does not
+    exist, e.g. to resolve a pair at another git revision.
+    """
+    layers = []
+    for path in layer_paths(env_dir, app_name, env):
+        data = read(path)
+        if data is not None:
+            layers.append((path, data))
+    if not layers or layers[-1][0] != layer_paths(env_dir, app_name, env)[-1]:
+        raise FileNotFoundError(f"Environment config for {app_name} in {env} not found: "
+                                f"{layer_paths(env_dir, app_name, env)[-1]}")
+
+    config = merge_layers(layers)
+    region = config.get('region')
+    if region:
+        path = region_path(env_dir, region)
+        data = read(path)
+        if data is None:
+            raise FileNotFoundError(f"Region layer {region} of {app_name}/{env} not found: {path}")
+        layers.append((path, data))
+        config = merge_layers(layers)
+    return config, [path for path, _ in layers]
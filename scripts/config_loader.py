@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# scripts/config_loader.py
+"""Shared loading of monitor_configs YAML files.
+
+Parsed documents are cached on disk keyed by the SHA-256 of the file content,
+so repeated CI steps and local reruns only parse files that actually changed.
+Entries are stored as JSON, never pickled, since the cache directory may be
+restored from a CI cache that other workflows can write to. Documents JSON
+cannot represent exactly (dates, sets, non-string keys) are not stored.
+The libyaml C loader is used when PyYAML was built with it.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import pickle
+import sys
+import tempfile
+from pathlib import Path
+
+import yaml
+
+try:
+    YamlLoader = yaml.CSafeLoader
+except AttributeError:
+    YamlLoader = yaml.SafeLoader
+
+CACHE_DIR_ENV = 'MONITOR_CONFIG_CACHE_DIR'
+CACHE_MAX_BYTES_ENV = 'MONITOR_CONFIG_CACHE_MAX_BYTES'
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / '.cache' / 'monitor_configs'
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+logger = logging.getLogger('config_loader')
+
+# Bump when the cached representation changes so stale entries are ignored
+CACHE_FORMAT = f"v2-py{sys.version_info.major}.{sys.version_info.minor}-pyyaml{yaml.__version__}"
+
+# Parsed documents already seen by this process, stored pickled so every
+# caller gets its own copy and cannot mutate another caller's config.
+# Only documents parsed or decoded by this process are pickled here.
+_memory_cache = {}
+
+# Bytes held by each on-disk cache directory, scanned on the first write of
+# the process and counted from there, so writes only rescan the directory
+# once the cache outgrows its budget
+_cache_sizes = {}
+
+
+def content_hash(data):
+    """Return the hex SHA-256 of raw file content."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def cache_dir():
+    """Return the on-disk cache directory, or None when caching is disabled."""
+    configured = os.environ.get(CACHE_DIR_ENV)
+    if configured is None:
+        return DEFAULT_CACHE_DIR / CACHE_FORMAT
+    if not configured:
+        return None
+    return Path(configured) / CACHE_FORMAT
+
+
+def cache_max_bytes():
+    """Return the size budget of the on-disk cache."""
+    return int(os.environ.get(CACHE_MAX_BYTES_ENV, DEFAULT_CACHE_MAX_BYTES))
+
+
+def parse_yaml(data, name=None):
+    """Parse YAML content with the fastest available safe loader.
+
+    name is reported as the file in parse error marks.
+    """
+    if name is not None:
+        stream = io.BytesIO(data)
+        stream.name = str(name)
+        return yaml.load(stream, Loader=YamlLoader)
+    return yaml.load(data, Loader=YamlLoader)
+
+
+def _read_cached(directory, digest):
+    """Return the JSON encoded document for a content hash from disk, if present."""
+    entry = directory / f"{digest}.json"
+    try:
+        payload = entry.read_bytes()
+    except OSError:
+        return None
+
+    # Refresh the entry's mtime so eviction drops the least recently used files first
+    try:
+        os.utime(entry)
+    except OSError:
+        pass
+    return payload
+
+
+def _encode(document):
+    """Return the JSON encoding of a document, or None when JSON would not give the same document back."""
+    try:
+        payload = json.dumps(document, separators=(',', ':'), allow_nan=False).encode('utf-8')
+    except (TypeError, ValueError):
+        return None
+    return payload if json.loads(payload) == document else None
+
+
+def _write_cached(directory, digest, payload):
+    """Store a JSON encoded document on disk and keep the cache within its budget."""
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, directory / f"{digest}.json")
+    except OSError as e:
+        logger.warning("Could not write config cache entry in %s: %s", directory, e)
+        return
+
+    max_bytes = cache_max_bytes()
+    size = _cache_sizes.get(directory)
+    size = cache_entries(directory)[1] if size is None else size + len(payload)
+    _cache_sizes[directory] = evict(directory, max_bytes) if size > max_bytes else size
+
+
+def cache_entries(directory):
+    """Return the (mtime, size, path) of every cache entry, oldest first, and their total size."""
+    entries = []
+    total = 0
+    for entry in Path(directory).glob('*.json'):
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry))
+        total += stat.st_size
+    entries.sort()
+    return entries, total
+
+
+def evict(directory, max_bytes):
+    """Remove least recently used cache entries until the cache fits in max_bytes; returns its new size."""
+    entries, total = cache_entries(directory)
+    for _, size, entry in entries:
+        if total <= max_bytes:
+            break
+        try:
+            entry.unlink()
+            total -= size
+        except OSError:
+            pass
+    return total
+
+
+def load_yaml_file(file_path):
+    """Load a YAML file and return its contents, reusing cached parses of identical content."""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    return load_yaml_bytes(data, file_path)
+
+
+def load_yaml_bytes(data, name=None):
+    """Parse YAML content, e.g. a git blob, reusing cached parses of identical content."""
+    digest = content_hash(data)
+    payload = _memory_cache.get(digest)
+    if payload is not None:
+        return pickle.loads(payload)
+
+    directory = cache_dir()
+    if directory is not None:
+        payload = _read_cached(directory, digest)
+        if payload is not None:
+            try:
+                document = json.loads(payload)
+                _memory_cache[digest] = pickle.dumps(document, protocol=pickle.HIGHEST_PROTOCOL)
+                return document
+            except ValueError:
+                # Truncated or foreign entry, parse the file again and overwrite it
+                pass
+
+    document = parse_yaml(data, name)
+    if directory is not None:
+        payload = _encode(document)
+        if payload is not None:
+            _write_cached(directory, digest, payload)
+    _memory_cache[digest] = pickle.dumps(document, protocol=pickle.HIGHEST_PROTOCOL)
+    return document
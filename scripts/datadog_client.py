@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# scripts/datadog_client.py
+"""Shared HTTP client for the Datadog API.
+
+Every script talks to Datadog through a DatadogClient, which provides:
+
+- one keep-alive requests.Session with a connection pool sized for the
+  caller's concurrency;
+- a token bucket per host and endpoint, refilled at the rate Datadog
+  advertises in its X-RateLimit-Limit/-Period headers and corrected from
+  X-RateLimit-Remaining/-Reset after every response;
+- retries with full-jitter exponential backoff on 429, 5xx and connection
+  errors, waiting for X-RateLimit-Reset on a 429 when it is given.
+
+The buckets live in a small JSON file guarded by flock, so parallel
+processes (e.g. several threshold jobs on one runner) share one budget
+instead of each assuming the whole limit is theirs. The file defaults to
+.cache/datadog/rate_budget.json; DATADOG_RATE_BUDGET_FILE moves it, and an
+empty value keeps the budget per process.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import fcntl
+except ImportError:  # Windows: the budget stays per process
+    fcntl = None
+
+DEFAULT_API_URL = "https://api.datadoghq.eu"
+BUDGET_FILE_ENV = 'DATADOG_RATE_BUDGET_FILE'
+DEFAULT_BUDGET_FILE = Path(__file__).resolve().parent.parent / '.cache' / 'datadog' / 'rate_budget.json'
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class DatadogError(Exception):
+    """A request that failed for good, after any retries."""
+
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+def budget_file():
+    """Return the shared budget file, or None when the budget is per process."""
+    configured = os.environ.get(BUDGET_FILE_ENV)
+    if configured is None:
+        return DEFAULT_BUDGET_FILE
+    return Path(configured) if configured else None
+
+
+class RateBudget:
+    """Token buckets keyed by endpoint URL, shared across threads and, through a locked file, processes."""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path is not None and fcntl is not None else None
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    @contextmanager
+    def _locked(self):
+        """Yield the buckets with exclusive access, writing them back afterwards."""
+        with self._lock:
+            if self.path is None:
+                yield self._buckets
+                return
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    try:
+                        buckets = json.loads(f.read() or '{}')
+                    except ValueError:
+                        buckets = {}
+                    yield buckets
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(buckets, sort_keys=True))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _refill(bucket, now):
+        if bucket.get('reset_at') and now >= bucket['reset_at']:
+            # The server-side window rolled over
+            bucket['tokens'] = float(bucket['limit'])
+            bucket['reset_at'] = None
+        else:
+            rate = bucket['limit'] / bucket['period']
+            bucket['tokens'] = min(float(bucket['limit']), bucket['tokens'] + (now - bucket['updated']) * rate)
+        bucket['updated'] = now
+
+    def acquire(self, key):
+        """Block until a request to the endpoint may be sent, and take its token."""
+        while True:
+            with self._locked() as buckets:
+                bucket = buckets.get(key)
+                if bucket is None:
+                    # Nothing known about this endpoint yet, the first response tells us
+                    return
+                now = time.time()
+                self._refill(bucket, now)
+                if bucket['tokens'] >= 1:
+                    bucket['tokens'] -= 1
+                    return
+                wait = (1 - bucket['tokens']) * bucket['period'] / bucket['limit']
+                if bucket.get('reset_at'):
+                    wait = min(wait, bucket['reset_at'] - now)
+            time.sleep(max(wait, 0.01))
+
+    def observe(self, key, headers):
+        """Correct an endpoint's bucket from the X-RateLimit-* headers of a response."""
+        try:
+            limit = int(headers['X-RateLimit-Limit'])
+            period = int(headers['X-RateLimit-Period'])
+            remaining = int(headers['X-RateLimit-Remaining'])
+            reset = int(headers['X-RateLimit-Reset'])
+        except (KeyError, ValueError):
+            return
+        if limit <= 0 or period <= 0:
+            return
+
+        with self._locked() as buckets:
+            now = time.time()
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = {"tokens": float(remaining)}
+            bucket.update(limit=limit, period=period, updated=now, reset_at=now + reset if remaining <= 0 else None)
+            # The server count is authoritative, other processes may have spent tokens too
+            bucket['tokens'] = min(bucket['tokens'], float(remaining))
+
+
+class DatadogClient:
+    """Pooled, rate-limit-aware client for the Datadog HTTP API."""
+
+    def __init__(self, api_url=None, api_key=None, app_key=None, pool_size=10, max_retries=5, timeout=120,
+                 backoff=0.5, max_backoff=30, budget=None):
+        self.api_url = (api_url or os.environ.get('DATADOG_HOST') or DEFAULT_API_URL).rstrip('/')
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget if budget is not None else RateBudget(budget_file())
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'DD-API-KEY': api_key if api_key is not None else os.environ.get('DATADOG_API_KEY', ''),
+            'DD-APPLICATION-KEY': app_key if app_key is not None else os.environ.get('DATADOG_APP_KEY', ''),
+        })
+
+    def _retry_delay(self, attempt, response):
+        if response is not None and response.status_code == 429:
+            try:
+                return float(response.headers['X-RateLimit-Reset']) + random.uniform(0, self.backoff)
+            except (KeyError, ValueError):
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def request(self, method, path, **kwargs):
+        """Send a request, retrying throttled and transient failures; returns the final response.
+
+        Raises DatadogError when the request still fails after max_retries
+        retries or with a status that is not worth retrying.
+        """
+        url = f"{self.api_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            # Buckets are keyed by the full URL, so other hosts (another site, a local fake) keep their own limits
+            self.budget.acquire(url)
+            response = None
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            else:
+                self.budget.observe(url, response.headers)
+                if response.status_code < 400:
+                    return response
+                error = f"{response.status_code} {response.reason}"
+                if response.status_code not in RETRY_STATUSES:
+                    raise DatadogError(f"{method} {path} failed: {error}: {response.text}", response)
+
+            if attempt < self.max_retries:
+                time.sleep(self._retry_delay(attempt, response))
+
+        raise DatadogError(f"{method} {path} failed after {self.max_retries + 1} attempts: {error}", response)
+
+    def get(self, path, params=None):
+        return self.request('GET', path, params=params)
+
+    def close(self):
+        self.session.close()
@@ -1,70 +1,267 @@
 #!/usr/bin/env python3
+import argparse
 import os
 import sys
 import json
 import subprocess
+from pathlib import Path
 
-def get_changed_files():
+from computed_thresholds import fresh_thresholds, index_path, parse_index
+from config_layers import REGIONS_DIR, layer_paths, resolve_env_config
+from config_loader import load_yaml_bytes
+from generate_tf_vars import GENERATOR_SOURCES, build_tf_vars, discover_pairs, serialize_tf_vars, split_names
+
+ROOT = Path(__file__).resolve().parent.parent
+APPS_DIR = ROOT / 'monitor_configs' / 'applications'
+ENVS_DIR = ROOT / 'monitor_configs' / 'environments'
+
+# Files (or directories, with a trailing slash) whose change affects every pair
+SHARED_PATHS = [
+    *(os.path.relpath(path, ROOT) for path in GENERATOR_SOURCES),
+    'scripts/config_loader.py',
+    'requirements.txt',
+    'tofu/backend.tf',
+    'tofu/modules/',
+    'tofu/shared/',
+]
+
+# Per-environment tofu root module; a change there affects every app in that environment
+TOFU_ENVIRONMENTS_DIR = 'tofu/environments/'
+
+def resolve_base(base=None):
+    """Return the git ref to compare HEAD against."""
+    if base:
+        return base
+    if os.environ.get('GITHUB_BASE_REF'):
+        # For pull requests
+        return f"origin/{os.environ['GITHUB_BASE_REF']}"
+    # For pushes
+    return "HEAD^"
+
+def get_changed_files(base=None):
     """Get list of changed files using git diff"""
     try:
         # Get the base and head SHAs
-        if os.environ.get('GITHUB_BASE_REF'):
-            # For pull requests
-            base = f"origin/{os.environ['GITHUB_BASE_REF']}"
-        else:
-            # For pushes
-            base = "HEAD^"
-        
+        base = resolve_base(base)
+
         # Get changed files
         cmd = ['git', 'diff', '--name-only', base, 'HEAD']
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = subprocess.run(cmd, capture_output=True, text=True, cwd=ROOT)
+        if result.returncode != 0:
+            print(f"Error getting changed files: {result.stderr.strip()}", file=sys.stderr)
         return result.stdout.splitlines()
     except Exception as e:
         print(f"Error getting changed files: {e}", file=sys.stderr)
         return []
 
-def parse_monitor_path(path):
-    """Extract application and environment from monitor config path"""
-    if not path.startswith('monitor_configs/'):
-        return None
-        
-    parts = path.split('/')
-    if len(parts) < 3:
-        return None
-        
-    if parts[1] == 'applications':
-        # monitor_configs/applications/app-name/...
-        return {'application': parts[2], 'environment': None}
-    elif parts[1] == 'environments':
-        # monitor_configs/environments/env-name/...
-        return {'application': None, 'environment': parts[2]}
-    return None
+def relative_path(path):
+    """Return a path relative to the repository root in git's notation."""
+    return Path(os.path.relpath(Path(path).resolve(), ROOT)).as_posix()
+
+def build_dependency_index(apps_dir=APPS_DIR, env_dir=ENVS_DIR, apps=None, envs=None, computed_dir=None):
+    """Map every config file to the (app, env) pairs rendered from it.
+
+    Pairs are discovered from what exists on disk: an application config in
+    apps_dir and an environment config in env_dir/<app>/<env>.yaml. Each
+    pair also depends on its shared layers, whether they exist yet or not,
+    on every region layer, since the region it selects is only known once
+    its layers are parsed, and, when rendering with computed thresholds
+    from computed_dir, on the computed threshold index of its environment.
+    """
+    pairs = discover_pairs(apps_dir, env_dir, apps, envs)
+    regions = [relative_path(path) for path in sorted((Path(env_dir) / REGIONS_DIR).glob('*.yaml'))]
+    index = {}
+    for app_name, env in pairs:
+        paths = [relative_path(Path(apps_dir) / f"{app_name}.yaml")]
+        paths += [relative_path(path) for path in layer_paths(env_dir, app_name, env)]
+        if computed_dir is not None:
+            paths.append(relative_path(index_path(computed_dir, env)))
+        for path in paths + regions:
+            index.setdefault(path, []).append((app_name, env))
+    return pairs, index
+
+def classify_changes(changed_files, pairs, index):
+    """Split the pairs affected by the changed files by cause.
+
+    Returns the pairs affected only through their own config files, whose
+    rendered output can be compared, and the pairs affected through shared
+    files such as the generator or tofu modules, which always need a plan.
+    """
+    config_pairs = set()
+    shared_pairs = set()
 
-def main():
-    changed_files = get_changed_files()
-    apps = set()
-    envs = set()
-    
     for path in changed_files:
-        result = parse_monitor_path(path)
-        if result:
-            if result['application']:
-                apps.add(result['application'])
-            if result['environment']:
-                envs.add(result['environment'])
-    
-    # Output in format for GitHub Actions
-    if apps:
-        print(f"applications={json.dumps(list(apps))}")
-    else:
-        # Default to all apps if no specific changes detected
-        print("applications=['api-gateway', 'business-portal', 'blockchain-providers', 'connect', 'evm-proxy', 'imx-blockchain-providers', 'login', 'nft-api', 'notifications', 'usages', 'pay', 'wallet', 'wallet-connect']")
-    
-    if envs:
-        print(f"environments={json.dumps(list(envs))}")
+        if path in index:
+            config_pairs.update(index[path])
+        elif any(path == shared or (shared.endswith('/') and path.startswith(shared)) for shared in SHARED_PATHS):
+            print(f"{path} is shared by every application, planning all pairs", file=sys.stderr)
+            shared_pairs.update(pairs)
+        elif path.startswith(TOFU_ENVIRONMENTS_DIR):
+            env = path[len(TOFU_ENVIRONMENTS_DIR):].split('/', 1)[0]
+            shared_pairs.update(pair for pair in pairs if pair[1] == env)
+        elif path.startswith('monitor_configs/'):
+            # Deleted configs and files outside the expected layout render nothing
+            print(f"{path} does not map to an existing application/environment pair, ignoring", file=sys.stderr)
+
+    return config_pairs - shared_pairs, shared_pairs
+
+def affected_pairs(changed_files, pairs, index):
+    """Return the pairs affected by the changed files, in discovery order."""
+    config_pairs, shared_pairs = classify_changes(changed_files, pairs, index)
+    affected = config_pairs | shared_pairs
+    return [pair for pair in pairs if pair in affected]
+
+def read_git_blobs(specs):
+    """Read '<rev>:<path>' blobs with a single git cat-file process.
+
+    Returns a dict mapping each spec to its content, or None when the path
+    does not exist at that revision.
+    """
+    specs = list(dict.fromkeys(specs))
+    if not specs:
+        return {}
+
+    result = subprocess.run(['git', 'cat-file', '--batch'], input=''.join(f"{spec}\n" for spec in specs).encode('utf-8'),
+                            capture_output=True, cwd=ROOT, check=True)
+    output = result.stdout
+    blobs = {}
+    offset = 0
+    for spec in specs:
+        header_end = output.index(b'\n', offset)
+        header = output[offset:header_end].decode('utf-8')
+        offset = header_end + 1
+        if header.endswith(' missing') or header.endswith(' ambiguous'):
+            blobs[spec] = None
+            continue
+        size = int(header.rsplit(' ', 1)[1])
+        blobs[spec] = output[offset:offset + size]
+        offset += size + 1  # content is followed by a newline
+    return blobs
+
+def render_blobs(app_data, env_config, env, name, computed=None):
+    """Render a pair from raw application config content, returning its canonical tfvars bytes.
+
+    env_config is the resolved environment config and computed the fresh
+    computed thresholds of the environment.
+    """
+    app_config = load_yaml_bytes(app_data, f"{name} (application)")
+    return serialize_tf_vars(build_tf_vars(app_config, env_config, env, computed))
+
+def semantic_filter(candidates, base, apps_dir=APPS_DIR, env_dir=ENVS_DIR, computed_dir=None):
+    """Keep only the pairs whose rendered tfvars differ between base and HEAD.
+
+    Both sides are rendered in-process with the current generator from git
+    blobs, so no second checkout is needed. A pair that is new, deleted on
+    one side or fails to render on either side is kept. With computed_dir,
+    each side renders with the computed threshold indexes of its revision.
+    """
+    specs = [f"{rev}:{relative_path(path)}" for rev in (base, 'HEAD') for app_name, env in candidates
+             for path in [Path(apps_dir) / f"{app_name}.yaml", *layer_paths(env_dir, app_name, env)]]
+    if computed_dir is not None:
+        specs += [f"{rev}:{relative_path(index_path(computed_dir, env))}" for rev in (base, 'HEAD')
+                  for env in {env for _, env in candidates}]
+    blobs = read_git_blobs(specs)
+
+    computed = {}
+
+    def computed_at(rev, env):
+        if computed_dir is None:
+            return {}
+        key = (rev, env)
+        if key not in computed:
+            spec = f"{rev}:{relative_path(index_path(computed_dir, env))}"
+            computed[key] = fresh_thresholds(parse_index(blobs[spec], spec)) if blobs[spec] is not None else {}
+        return computed[key]
+
+    def reader(rev):
+        def read(path):
+            # Region layers are only known once the other layers are parsed
+            spec = f"{rev}:{relative_path(path)}"
+            if spec not in blobs:
+                blobs.update(read_git_blobs([spec]))
+            return blobs[spec]
+        return read
+
+    changed = []
+    for app_name, env in candidates:
+        app_path = relative_path(Path(apps_dir) / f"{app_name}.yaml")
+        rendered = []
+        for rev in (base, 'HEAD'):
+            app_data = blobs[f"{rev}:{app_path}"]
+            if app_data is None:
+                rendered.append(None)
+                continue
+            try:
+                env_config, _ = resolve_env_config(env_dir, app_name, env, reader(rev))
+                rendered.append(render_blobs(app_data, env_config, env, f"{rev}:{app_name}/{env}", computed_at(rev, env)))
+            except FileNotFoundError:
+                # The environment (or the region it selects) does not exist on this side
+                rendered.append(None)
+            except Exception as e:
+                print(f"Could not render {app_name}/{env} at {rev}: {e}", file=sys.stderr)
+                rendered.append(e)
+
+        base_output, head_output = rendered
+        if base_output is None or head_output is None or base_output != head_output or isinstance(head_output, Exception):
+            changed.append((app_name, env))
+        else:
+            print(f"{app_name}/{env}: config changed but rendered tfvars are identical, skipping", file=sys.stderr)
+
+    return changed
+
+def select_pairs(pairs, index, changed_files, base=None, semantic=False, apps_dir=APPS_DIR, env_dir=ENVS_DIR,
+                 computed_dir=None):
+    """Return the pairs the changed files affect, in discovery order, and those affected through shared files.
+
+    With semantic, pairs affected only through their own config files are
+    kept only when their rendered tfvars differ between base and HEAD.
+    Pairs affected through shared files are always kept: a tofu module
+    change leaves the rendered tfvars untouched but still needs a plan.
+    """
+    config_pairs, shared_pairs = classify_changes(changed_files, pairs, index)
+    if semantic:
+        config_pairs = set(semantic_filter([pair for pair in pairs if pair in config_pairs], resolve_base(base),
+                                           apps_dir, env_dir, computed_dir))
+    affected = config_pairs | shared_pairs
+    return [pair for pair in pairs if pair in affected], shared_pairs
+
+def to_matrix(pairs, full_plan=()):
+    """Build an explicit GitHub Actions include-list matrix from (app, env) pairs.
+
+    full_plan holds the pairs that need a full plan whether or not their
+    rendered tfvars changed, such as pairs affected through shared files.
+    """
+    return {"include": [{"application": app_name, "environment": env, "full_plan": (app_name, env) in full_plan}
+                        for app_name, env in pairs]}
+
+def main():
+    parser = argparse.ArgumentParser(description='Determine which application/environment pairs need a plan')
+    parser.add_argument('--apps-dir', default=APPS_DIR, help='Applications config directory')
+    parser.add_argument('--env-dir', default=ENVS_DIR, help='Environments config directory')
+    parser.add_argument('--base', help='Git ref to diff HEAD against (default: PR base branch or HEAD^)')
+    parser.add_argument('--all', action='store_true', help='Select every pair on disk instead of diffing')
+    parser.add_argument('--apps', help='Comma separated applications to restrict the selection to')
+    parser.add_argument('--envs', help='Comma separated environments to restrict the selection to')
+    parser.add_argument('--semantic', action='store_true',
+                        help='Only select config-affected pairs whose rendered tfvars differ between the base ref and HEAD')
+    parser.add_argument('--computed-dir',
+                        help='Directory of the computed ALB threshold indexes the pairs are rendered with, as passed to '
+                             'generate_tf_vars.py (default: computed thresholds are not used)')
+    parser.add_argument('files', nargs='*', help='Changed files to use instead of running git diff')
+    args = parser.parse_args()
+
+    pairs, index = build_dependency_index(args.apps_dir, args.env_dir, split_names(args.apps), split_names(args.envs),
+                                          args.computed_dir or None)
+
+    if args.all:
+        selected, full_plan = pairs, set(pairs)
     else:
-        # Default to qa if no specific environment changes detected
-        print("environments=['qa']")
+        selected, full_plan = select_pairs(pairs, index, args.files or get_changed_files(args.base), args.base,
+                                           args.semantic, args.apps_dir, args.env_dir, args.computed_dir or None)
+
+    # Output in format for GitHub Actions
+    print(f"matrix={json.dumps(to_matrix(selected, full_plan))}")
+    print(f"has_changes={'true' if selected else 'false'}")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# scripts/diff_tfvars.py
+"""Structural diff of two rendered tfvars documents.
+
+Compares a previous render with a new one family by family and entry by
+entry, keyed by map key, and reports every added, removed and modified
+path, e.g. services["app-api"].thresholds.cpu_percent. Each change is
+mapped to the tofu resource instances rendered from that entry, so a
+small edit can be planned with -target:
+
+    python scripts/diff_tfvars.py old.tfvars.json tofu/environments/qa/terraform.tfvars.json
+    python scripts/diff_tfvars.py --targets previous/ tofu/environments/qa
+
+Either side may be a single tfvars file or a --shard output directory, in
+full or --compact form. A change to a --group-monitors group also targets
+the per-service monitors of the services joining or leaving it. A change
+to a variable outside the monitor families (project, environment,
+channels, tags) targets every module.
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+from compact_tfvars import DEFAULTS_SUFFIX, expand_tf_vars
+from generate_tf_vars import SHARD_MODULES
+from monitor_groups import GROUPED_FAMILIES
+
+# Resources each module renders per entry of its family variable, with the
+# condition under which the module creates the instance, mirroring its for_each
+FAMILY_RESOURCES = {
+    "services": [
+        ("cpu_usage", None),
+        ("memory_usage", None),
+        ("network_errors", None),
+        ("container_health", lambda entry, env: env == "prd"),
+        ("unhealthy_tasks", lambda entry, env: env == "prd"),
+        ("ecs_task_health", None),
+    ],
+    "alb": [
+        (resource, lambda entry, env: bool(entry.get('alb_name')) and all(
+            entry.get('thresholds', {}).get(name) is not None for name in ('request_count', 'latency', 'error_rate')))
+        for resource in ("request_count", "latency", "error_rate")
+    ],
+    "databases": [(resource, None) for resource in ("cpu_usage", "memory_usage", "connections", "iops_usage")],
+    "queues": [
+        ("age_of_oldest_message", None),
+        ("queue_depth", None),
+        ("dlq_messages", lambda entry, env: entry.get('dlq_name') is not None),
+        ("dlq_message_age", lambda entry, env: entry.get('dlq_name') is not None),
+    ],
+    "topics": [(resource, None) for resource in ("message_count", "oldest_message_age", "failed_deliveries",
+                                                 "message_volume_drop")],
+    "java_services": [("jvm_memory_usage", None)],
+    "node_services": [(resource, None) for resource in ("node_cpu_total_usage", "node_heap_memory_usage",
+                                                        "node_event_loop_delay")],
+    "apm_services": [(resource, None) for resource in ("apm_latency", "error_rate_monitor", "apm_throughput")],
+    "logs": [("log_monitor", None)],
+    "service_groups": [
+        ("cpu_usage_group", None),
+        ("memory_usage_group", None),
+        ("network_errors_group", None),
+        ("container_health_group", lambda entry, env: env == "prd"),
+        ("unhealthy_tasks_group", lambda entry, env: env == "prd"),
+    ],
+    "apm_service_groups": [(resource, None) for resource in ("apm_latency_group", "error_rate_monitor_group",
+                                                             "apm_throughput_group")],
+}
+
+
+def family_module(family):
+    """Return the module rendering a family or group variable."""
+    if family in GROUPED_FAMILIES:
+        family = GROUPED_FAMILIES[family][0]
+    return SHARD_MODULES[family]
+
+
+def load_tfvars(path):
+    """Load a tfvars file or shard directory as one document, expanding the compact form."""
+    path = Path(path)
+    if path.is_dir():
+        document = {}
+        for shard in sorted(path.glob('*.auto.tfvars.json')):
+            with open(shard) as f:
+                document.update(json.load(f))
+    else:
+        with open(path) as f:
+            document = json.load(f)
+
+    if any(name.endswith(DEFAULTS_SUFFIX) for name in document):
+        document = expand_tf_vars(document, [family for family in SHARD_MODULES if family in document])
+    return document
+
+
+def entry_path(family, key):
+    return f"{family}[{json.dumps(key)}]"
+
+
+def diff_values(path, old, new, changes):
+    """Append the modified leaf paths between two values, recursing into objects."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in old.items():
+            if key not in new:
+                changes.append({"path": f"{path}.{key}", "old": value})
+            else:
+                diff_values(f"{path}.{key}", value, new[key], changes)
+        for key, value in new.items():
+            if key not in old:
+                changes.append({"path": f"{path}.{key}", "new": value})
+    elif old != new or type(old) is not type(new):
+        changes.append({"path": path, "old": old, "new": new})
+
+
+def resource_addresses(family, key, entries, env):
+    """Return the addresses of the resource instances rendered from an entry, in any of its versions."""
+    module = family_module(family)
+    addresses = []
+    for resource, condition in FAMILY_RESOURCES[family]:
+        if condition is None or any(condition(entry, env) for entry in entries if entry is not None):
+            addresses.append(f"module.{module}.datadog_monitor.{resource}[{json.dumps(key)}]")
+    return addresses
+
+
+def member_addresses(name, entries, old, new, env):
+    """Return the addresses of the per-service monitors a group change replaces or restores.
+
+    Those are the monitors of every member of an added or removed group,
+    and of the services joining or leaving a modified one.
+    """
+    family = GROUPED_FAMILIES[name][0]
+    members = [set(entry['services']) for entry in entries]
+    addresses = []
+    for key in sorted(members[0] ^ members[1] if len(members) == 2 else members[0]):
+        pair = [(old.get(family) or {}).get(key), (new.get(family) or {}).get(key)]
+        addresses.extend(resource_addresses(family, key, pair, env))
+    return addresses
+
+
+def diff_tfvars(old, new):
+    """Compare two rendered documents.
+
+    Returns a report with the added, removed and modified entries and
+    variables, each with the resource addresses it affects, and the sorted
+    union of those addresses as targets.
+    """
+    report = {"added": [], "removed": [], "modified": [], "targets": []}
+    targets = set()
+    env = new.get('environment', old.get('environment'))
+
+    for name in sorted(set(old) | set(new)):
+        if name in FAMILY_RESOURCES:
+            old_entries, new_entries = old.get(name) or {}, new.get(name) or {}
+
+            def addresses_of(key, entries):
+                addresses = resource_addresses(name, key, entries, env)
+                if name in GROUPED_FAMILIES:
+                    addresses += member_addresses(name, entries, old, new, env)
+                return addresses
+
+            for key, entry in old_entries.items():
+                if key not in new_entries:
+                    addresses = addresses_of(key, [entry])
+                    report["removed"].append({"path": entry_path(name, key), "addresses": addresses})
+                    targets.update(addresses)
+                elif entry != new_entries[key]:
+                    changes = []
+                    diff_values(entry_path(name, key), entry, new_entries[key], changes)
+                    if not changes:
+                        continue
+                    addresses = addresses_of(key, [entry, new_entries[key]])
+                    report["modified"].append({"path": entry_path(name, key), "changes": changes, "addresses": addresses})
+                    targets.update(addresses)
+            for key, entry in new_entries.items():
+                if key not in old_entries:
+                    addresses = addresses_of(key, [entry])
+                    report["added"].append({"path": entry_path(name, key), "addresses": addresses})
+                    targets.update(addresses)
+        elif old.get(name) != new.get(name):
+            # Shared by every module, e.g. notification channels
+            changes = []
+            diff_values(name, old.get(name), new.get(name), changes)
+            addresses = [f"module.{module}" for module in SHARD_MODULES.values()]
+            report["modified"].append({"path": name, "changes": changes, "addresses": addresses})
+            targets.update(addresses)
+
+    # A module address already covers every instance in it
+    modules = {target for target in targets if target.count('.') == 1}
+    report["targets"] = sorted(target for target in targets
+                               if target in modules or target.split('.datadog_monitor.')[0] not in modules)
+    return report
+
+
+def print_summary(report):
+    for kind, sign in (("added", "+"), ("removed", "-"), ("modified", "~")):
+        for item in report[kind]:
+            print(f"{sign} {item['path']}")
+            for change in item.get("changes", []):
+                print(f"    {change['path']}: {json.dumps(change.get('old'))} -> {json.dumps(change.get('new'))}")
+    print(f"{len(report['added'])} added, {len(report['removed'])} removed, {len(report['modified'])} modified, "
+          f"{len(report['targets'])} target(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Diff two rendered tfvars documents and map changes to tofu resource addresses')
+    parser.add_argument('old', help='Previous tfvars file or shard directory (missing = empty)')
+    parser.add_argument('new', help='New tfvars file or shard directory')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--targets', action='store_true', help='Print only the -target addresses, one per line')
+    args = parser.parse_args()
+
+    old = load_tfvars(args.old) if os.path.exists(args.old) else {}
+    report = diff_tfvars(old, load_tfvars(args.new))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+    if args.targets:
+        sys.stdout.write(''.join(f"{target}\n" for target in report["targets"]))
+    else:
+        print_summary(report)
+
+
+if __name__ == '__main__':
+    main()
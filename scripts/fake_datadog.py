@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# scripts/fake_datadog.py
+"""Local stand-in for the parts of the Datadog API the scripts use.
+
+Serves GET /api/v1/validate and GET /api/v1/query with synthetic but
+deterministic series, so generate_alb_thresholds.py and
+validate_datadog_creds.py can be run, timed and regression-tested offline:
+
+    python scripts/fake_datadog.py --port 8126 --interval 300 --latency-ms 50 --throttle-rate 0.05
+    DATADOG_HOST=http://127.0.0.1:8126 python scripts/generate_alb_thresholds.py --env qa --alb my-alb
+
+Query responses contain one series per loadbalancer:<name> tag in the
+query scope. Every series has a point every --interval seconds and the
+same value for the same (query, loadbalancer, timestamp), so refetching a
+window returns identical data. Responses carry X-RateLimit-* headers; a
+request over the --rate-limit budget, or picked by --throttle-rate, gets
+a 429. GET /_stats returns request, point and throttle counters.
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+LOADBALANCER_TAG = re.compile(r'loadbalancer:([^\s,}()]+)')
+
+
+class FakeDatadog:
+    """Behaviour and counters of a fake API, shared by every request handler thread."""
+
+    def __init__(self, interval=3600, latency_ms=0, jitter_ms=0, throttle_rate=0.0, rate_limit=0, rate_period=10,
+                 api_key=None, seed=0):
+        self.interval = interval
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self.api_key = api_key
+        self.random = random.Random(seed)
+
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_requests = 0
+        self.stats = {"requests": 0, "queries": 0, "points": 0, "series": 0, "throttled": 0, "forbidden": 0}
+
+    def count(self, **increments):
+        with self.lock:
+            for name, value in increments.items():
+                self.stats[name] += value
+
+    def admit(self):
+        """Account one request against the rate limit window.
+
+        Returns (allowed, headers) where headers are the X-RateLimit-* values
+        to send back.
+        """
+        with self.lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            if now - self.window_start >= self.rate_period:
+                self.window_start = now
+                self.window_requests = 0
+            self.window_requests += 1
+
+            limit = self.rate_limit or 1000000
+            reset = max(0, math.ceil(self.rate_period - (now - self.window_start)))
+            headers = {
+                "X-RateLimit-Limit": str(limit),
+                "X-RateLimit-Period": str(self.rate_period),
+                "X-RateLimit-Remaining": str(max(0, limit - self.window_requests)),
+                "X-RateLimit-Reset": str(reset),
+            }
+            allowed = self.window_requests <= limit and self.random.random() >= self.throttle_rate
+            if not allowed:
+                self.stats["throttled"] += 1
+            return allowed, headers
+
+    def delay(self):
+        if self.latency_ms or self.jitter_ms:
+            with self.lock:
+                jitter = self.random.uniform(0, self.jitter_ms)
+            time.sleep((self.latency_ms + jitter) / 1000)
+
+    def series(self, query, loadbalancer, start, end):
+        """Return the synthetic pointlist of one loadbalancer for a query over [start, end]."""
+        seed = zlib.crc32(f"{query}\n{loadbalancer}".encode('utf-8'))
+        base = 10 + seed % 90
+        first = (start // self.interval + 1) * self.interval
+        points = []
+        for timestamp in range(first, end + 1, self.interval):
+            hour = timestamp / 3600
+            daily = math.sin(2 * math.pi * (hour % 24) / 24)
+            weekly = math.sin(2 * math.pi * (hour % 168) / 168)
+            noise = ((timestamp * 2654435761 ^ seed) & 0xffff) / 0xffff - 0.5
+            points.append([timestamp * 1000, round(base * (1 + 0.3 * daily + 0.1 * weekly + 0.2 * noise), 4)])
+        return points
+
+    def query(self, query, start, end):
+        loadbalancers = list(dict.fromkeys(LOADBALANCER_TAG.findall(query)))
+        series = []
+        for loadbalancer in loadbalancers:
+            pointlist = self.series(query, loadbalancer, start, end)
+            series.append({
+                "metric": query.split('{', 1)[0],
+                "scope": f"loadbalancer:{loadbalancer}",
+                "tag_set": [f"loadbalancer:{loadbalancer}"],
+                "interval": self.interval,
+                "length": len(pointlist),
+                "pointlist": pointlist,
+            })
+        self.count(queries=1, series=len(series), points=sum(entry["length"] for entry in series))
+        return {"status": "ok", "query": query, "from_date": start * 1000, "to_date": end * 1000, "series": series}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        fake = self.server.fake
+        url = urlparse(self.path)
+
+        if url.path == '/_stats':
+            with fake.lock:
+                self.send_json(200, dict(fake.stats))
+            return
+
+        allowed, headers = fake.admit()
+        fake.delay()
+        if not allowed:
+            self.send_json(429, {"errors": ["Rate limit of traffic exceeded"]}, headers)
+            return
+
+        if fake.api_key is not None and self.headers.get('DD-API-KEY') != fake.api_key:
+            fake.count(forbidden=1)
+            self.send_json(403, {"errors": ["Forbidden"]}, headers)
+            return
+
+        if url.path == '/api/v1/validate':
+            self.send_json(200, {"valid": True}, headers)
+        elif url.path == '/api/v1/query':
+            params = parse_qs(url.query)
+            try:
+                start, end, query = int(params['from'][0]), int(params['to'][0]), params['query'][0]
+            except (KeyError, ValueError):
+                self.send_json(400, {"errors": ["from, to and query are required"]}, headers)
+                return
+            self.send_json(200, fake.query(query, start, end), headers)
+        else:
+            self.send_json(404, {"errors": ["Not found"]}, headers)
+
+
+def start_server(fake, host='127.0.0.1', port=0):
+    """Serve a FakeDatadog in a background thread; returns the server, whose server_address has the port."""
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.fake = fake
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_fake_arguments(parser):
+    """Add the options describing the fake API's behaviour to an argument parser."""
+    parser.add_argument('--interval', type=int, default=3600, help='Seconds between synthetic points (default: 3600)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Delay added to every request')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Random extra delay, up to this many ms')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with 429 at random (default: 0)')
+    parser.add_argument('--rate-limit', type=int, default=0,
+                        help='Requests allowed per --rate-period before answering 429 (default: unlimited)')
+    parser.add_argument('--rate-period', type=int, default=10, help='Rate limit window in seconds (default: 10)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for throttling and jitter')
+
+
+def fake_from_args(args, api_key=None):
+    return FakeDatadog(args.interval, args.latency_ms, args.jitter_ms, args.throttle_rate, args.rate_limit,
+                       args.rate_period, api_key, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a local stand-in for the Datadog API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8126)
+    parser.add_argument('--api-key', help='Only accept this DD-API-KEY (default: accept any)')
+    add_fake_arguments(parser)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    server.fake = fake_from_args(args, args.api_key)
+    print(f"Fake Datadog API listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,103 +1,381 @@
+import os
+import sys
 import time
 import json
 import argparse
-from datadog import initialize, api
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
-# Initialize Datadog client
-options = {
-    "api_key": API_KEY,
-    "app_key": APP_KEY
-}
-initialize(**options)
+import numpy as np
+
+from computed_thresholds import DEFAULT_TTL, update_index
+from config_layers import resolve_env_config
+from config_loader import load_yaml_file
+from datadog_client import DEFAULT_API_URL, DatadogClient
+from generate_tf_vars import discover_pairs, find_app_config, process_alb_config, split_names
+from series_sketch import SKETCH_STATISTICS, SeriesSketch, load_sketch, save_sketch
+from series_stats import STATISTICS, compute_stats
+from series_store import fetch_start, merge_tail, open_series, prune, series_key, store_dir, write_series
 
 END_TIME = int(time.time())
 START_TIME = END_TIME - 3 * 30 * 24 * 3600
 
+# Grouped queries: %(scope)s selects one or more load balancers, and every
+# query is split by loadbalancer so one request returns a series per ALB.
 QUERIES = {
-    "request_count": "avg:aws.applicationelb.request_count{loadbalancer:%s}.as_rate()",
-    "latency": "avg:aws.applicationelb.target_response_time.average{loadbalancer:%s}",
+    "request_count": "avg:aws.applicationelb.request_count{%(scope)s} by {loadbalancer}.as_rate()",
+    "latency": "avg:aws.applicationelb.target_response_time.average{%(scope)s} by {loadbalancer}",
     "error_rate": (
-        "sum:aws.applicationelb.httpcode_target_5xx{loadbalancer:%s}.as_count() / "
-        "sum:aws.applicationelb.request_count{loadbalancer:%s}.as_count() * 100"
+        "sum:aws.applicationelb.httpcode_target_5xx{%(scope)s} by {loadbalancer}.as_count() / "
+        "sum:aws.applicationelb.request_count{%(scope)s} by {loadbalancer}.as_count() * 100"
     )
 }
 
+# Every level is either a factor applied to the monitor's "stat" (the mean
+# unless set), or a dict {"stat": ..., "factor": ..., "add": {stat: factor}}
+# computing factor * stat + sum(factor * stat) from the series statistics
+# (see series_stats.STATISTICS), e.g. {"stat": "seasonal_peak", "add": {"seasonal_mad": 3}}.
 MULTIPLIERS = {
     "request_count": {"critical": 1.0, "critical_recovery": 0.8, "warning": 0.9, "warning_recovery": 0.7},
     "latency": {"critical": 1.0, "critical_recovery": 0.8, "warning": 0.9, "warning_recovery": 0.7},
     "error_rate": {"critical": 1.0, "critical_recovery": 0.6, "warning": 0.8, "warning_recovery": 0.5},
 }
 
+def alb_scope(albs):
+    """Build a tag filter matching any of the given load balancers."""
+    return " OR ".join(f"loadbalancer:{alb}" for alb in albs)
+
+
+def series_loadbalancer(series):
+    """Return the loadbalancer tag value a grouped series belongs to."""
+    for tag in series.get('tag_set') or series.get('scope', '').split(','):
+        if tag.startswith('loadbalancer:'):
+            return tag[len('loadbalancer:'):]
+    return None
 
-def fetch_historical_data(query, start_time, end_time):
+
+def fetch_historical_data(client, query, start_time, end_time):
+    """Run a metric query and return the non-null [timestamp, value] points of each series by loadbalancer.
+
+    Returns None when the query failed, as opposed to an empty dict when it
+    returned no data.
+    """
     try:
-        result = api.Metric.query(start=start_time, end=end_time, query=query)
+        result = client.get("/api/v1/query", params={"from": start_time, "to": end_time, "query": query}).json()
         if 'series' not in result or not result['series']:
             print(f"No data found for query: {query}")
-            return None
+            return {}
 
-        data_points = result['series'][0]['pointlist']
-        values = [point[1] for point in data_points if point[1] is not None]
-        return sum(values) / len(values) if values else None
+        points = {}
+        for series in result['series']:
+            alb = series_loadbalancer(series)
+            if alb is not None:
+                points.setdefault(alb.lower(), []).extend(point for point in series['pointlist'] if point[1] is not None)
+        return points
 
     except Exception as e:
         print(f"Error fetching data for query '{query}': {e}")
         return None
 
 
-def calculate_thresholds(avg_value, multipliers):
-    if avg_value is None:
+def plan_requests(albs, store, batch_size, sketch=False):
+    """Split the fleet into grouped (monitor, fetch start, ALB batch) requests.
+
+    ALBs whose stored series (or sketches) already cover the window only
+    need their tail fetched; ALBs are grouped by where their fetch starts so
+    that, in the usual case of a fleet refreshed together, every batch
+    shares one window.
+    """
+    planned = []
+    for monitor, query in QUERIES.items():
+        by_start = {}
+        for alb in albs:
+            start = START_TIME
+            if store is not None and sketch:
+                start = fetch_start(load_sketch(store, series_key(query, alb)), START_TIME)
+            elif store is not None:
+                series = open_series(store, series_key(query, alb))
+                if series is not None:
+                    with series:
+                        start = fetch_start(series, START_TIME)
+            by_start.setdefault(start, []).append(alb)
+
+        for start, group in sorted(by_start.items()):
+            planned += [(monitor, start, group[i:i + batch_size]) for i in range(0, len(group), batch_size)]
+    return planned
+
+
+def refresh_series(store, monitor, alb, points, fetched_from):
+    """Merge fetched points into an ALB's stored series and return its timestamp and value arrays over the window.
+
+    points is None when the fetch failed, in which case whatever the store
+    already holds for the window is used.
+    """
+    series = open_series(store, series_key(QUERIES[monitor], alb)) if store is not None else None
+    if series is None and points is None:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+
+    if series is not None:
+        with series:
+            if points is None:
+                first = bisect_left(series.timestamps, START_TIME * 1000)
+                return np.array(series.timestamps[first:]), np.array(series.values[first:])
+            columns = merge_tail(series, points, fetched_from, END_TIME, START_TIME)
+    else:
+        columns = merge_tail(None, points, fetched_from, END_TIME, START_TIME)
+
+    if store is not None:
+        write_series(store, series_key(QUERIES[monitor], alb), *columns)
+    return np.frombuffer(columns[0], dtype=np.int64), np.frombuffer(columns[1], dtype=np.float64)
+
+
+def refresh_sketch(store, monitor, alb, points, fetched_from):
+    """Fold fetched points into an ALB's stored sketch and return it, compacted to the window.
+
+    points is None when the fetch failed, in which case the stored sketch
+    is used as it is.
+    """
+    key = series_key(QUERIES[monitor], alb)
+    sketch = load_sketch(store, key) if store is not None else None
+    if points is not None:
+        if sketch is None or fetched_from == START_TIME:
+            sketch = SeriesSketch()
+        timestamps, values = (np.array(points, dtype=np.float64).T if points else (np.empty(0), np.empty(0)))
+        sketch.fold(timestamps.astype(np.int64), values, fetched_from, END_TIME)
+    if sketch is None:
+        return SeriesSketch()
+
+    sketch.compact(START_TIME)
+    if store is not None and points is not None:
+        save_sketch(store, key, sketch)
+    return sketch
+
+
+def load_multipliers(path, statistics=STATISTICS):
+    """Load threshold multipliers from a JSON file (e.g. scripts/thresholds.json) over the built-in ones."""
+    with open(path) as f:
+        overrides = json.load(f)
+
+    multipliers = {monitor: dict(levels) for monitor, levels in MULTIPLIERS.items()}
+    for monitor, levels in overrides.items():
+        if monitor not in QUERIES:
+            raise ValueError(f"{path}: unknown monitor '{monitor}'")
+        multipliers[monitor].update(levels)
+
+    for monitor, levels in multipliers.items():
+        for level, spec in levels.items():
+            stats = [spec] if level == 'stat' else []
+            if isinstance(spec, dict):
+                stats += [spec.get('stat', levels.get('stat', 'mean')), *spec.get('add', {})]
+            unknown = [stat for stat in stats if stat not in statistics]
+            if unknown:
+                raise ValueError(f"{path}: {monitor}.{level} refers to unknown statistic(s) {', '.join(unknown)}")
+    return multipliers
+
+
+def threshold_value(stats, spec, stat):
+    """Compute one threshold level from the series statistics."""
+    if not isinstance(spec, dict):
+        return stats[stat] * spec
+    value = stats[spec.get('stat', stat)] * spec.get('factor', 1)
+    for name, factor in spec.get('add', {}).items():
+        value += stats[name] * factor
+    return value
+
+
+def calculate_thresholds(stats, multipliers):
+    if stats is None:
         return {
             "critical": multipliers.get("default_critical", 1),
             "critical_recovery": multipliers.get("default_critical_recovery", 0.8),
             "warning": multipliers.get("default_warning", 0.9),
             "warning_recovery": multipliers.get("default_warning_recovery", 0.7)
         }
+    stat = multipliers.get("stat", "mean")
     return {
-        "critical": avg_value * multipliers["critical"],
-        "critical_recovery": avg_value * multipliers["critical_recovery"],
-        "warning": avg_value * multipliers["warning"],
-        "warning_recovery": avg_value * multipliers["warning_recovery"]
+        level: threshold_value(stats, multipliers[level], stat)
+        for level in ("critical", "critical_recovery", "warning", "warning_recovery")
     }
 
 
-def process_alb_monitoring(env, alb):
-    thresholds = {}
+def print_stats(monitor, alb, stats):
+    if stats is not None:
+        print(f"Statistics for {monitor} ({alb}): "
+              + " ".join(f"{name}={stats[name]:.4g}" for name in ("mean", "p50", "p95", "p99")))
+    else:
+        print(f"No data found for {monitor} ({alb})")
+
+
+def process_fleet(env, albs, api_url=DEFAULT_API_URL, batch_size=20, concurrency=4, multipliers=MULTIPLIERS,
+                  sketch=False, baseline=False):
+    """Compute thresholds for many ALBs with grouped queries run concurrently.
+
+    ALBs are split into batches of batch_size; each (monitor, batch) is one
+    request, and at most concurrency requests are in flight at a time,
+    within the rate limit budget shared through datadog_client.py. Series
+    are kept in the local series store (see series_store.py), so only the
+    part of the window fetched since the previous run is queried.
 
-    for monitor, query_template in QUERIES.items():
-        if monitor == "error_rate":
-            query = query_template % (alb, alb)
-        else:
-            query = query_template % alb
+    With sketch, every series is kept as a mergeable sketch instead of raw
+    points (see series_sketch.py) and only SKETCH_STATISTICS are available.
+    With baseline, the sketches of every ALB are also merged into
+    environment-wide thresholds. Returns the thresholds per ALB, the
+    baseline thresholds or None, and per ALB the monitors whose thresholds
+    were computed from data rather than defaulted for lack of it.
+    """
+    store = store_dir()
+    requests_to_run = plan_requests(albs, store, batch_size, sketch)
+    print(f"Processing {len(albs)} ALBs in environment {env} with {len(requests_to_run)} grouped queries")
 
-        print(f"Processing monitor: {monitor}, Environment: {env}, ALB: {alb}")
-        avg_value = fetch_historical_data(query, START_TIME, END_TIME)
-        if avg_value is not None:
-            print(f"Average value for {monitor} ({alb}): {avg_value}")
-        else:
-            print(f"No data found for {monitor} ({alb})")
+    client = DatadogClient(api_url, pool_size=max(1, concurrency))
 
-        thresholds[monitor] = calculate_thresholds(avg_value, MULTIPLIERS[monitor])
+    def run(request):
+        monitor, start, batch = request
+        return fetch_historical_data(client, QUERIES[monitor] % {"scope": alb_scope(batch)}, start, END_TIME)
 
-    return thresholds
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        results = list(pool.map(run, requests_to_run))
+    client.close()
+
+    stats = {monitor: {} for monitor in QUERIES}
+    sketches = {monitor: SeriesSketch() for monitor in QUERIES}
+    for (monitor, start, batch), result in zip(requests_to_run, results):
+        for alb in batch:
+            points = None if result is None else result.get(alb.lower(), [])
+            if sketch:
+                series_sketch = refresh_sketch(store, monitor, alb, points, start)
+                stats[monitor][alb] = series_sketch.stats()
+                if baseline:
+                    sketches[monitor].merge(series_sketch)
+            else:
+                stats[monitor][alb] = compute_stats(*refresh_series(store, monitor, alb, points, start))
+
+    if store is not None and not sketch:
+        prune(store, START_TIME)
+
+    fleet = {}
+    measured = {}
+    for alb in albs:
+        thresholds = {}
+        for monitor in QUERIES:
+            print_stats(monitor, alb, stats[monitor][alb])
+            thresholds[monitor] = calculate_thresholds(stats[monitor][alb], multipliers[monitor])
+        fleet[alb] = thresholds
+        measured[alb] = [monitor for monitor in QUERIES if stats[monitor][alb] is not None]
+
+    if not baseline:
+        return fleet, None, measured
+
+    baseline_thresholds = {}
+    for monitor, merged in sketches.items():
+        print_stats(monitor, f"{env} baseline", merged.stats())
+        baseline_thresholds[monitor] = calculate_thresholds(merged.stats(), multipliers[monitor])
+    return fleet, baseline_thresholds, measured
+
+
+def process_alb_monitoring(env, alb, api_url=DEFAULT_API_URL, multipliers=MULTIPLIERS):
+    return process_fleet(env, [alb], api_url, multipliers=multipliers)[0][alb]
+
+
+def discover_albs(apps_dir, env_dir, env, apps=None):
+    """Return the ALB names monitored in an environment, from the infrastructure.alb app config sections.
+
+    Environment overrides are applied the same way generate_tf_vars.py does,
+    so disabled services and overridden alb_names are honoured.
+    """
+    albs = []
+    for app_name, _ in discover_pairs(apps_dir, env_dir, apps, [env]):
+        app_config = load_yaml_file(find_app_config(apps_dir, app_name))
+        env_config, _ = resolve_env_config(env_dir, app_name, env)
+        alb_config = app_config.get('monitor_sets', {}).get('infrastructure', {}).get('alb', {})
+        for service in process_alb_config(alb_config, env_config, app_name, None).values():
+            if service['alb_name'] and service['alb_name'] not in albs:
+                albs.append(service['alb_name'])
+    return albs
+
+
+def write_thresholds(env, alb, thresholds, output_dir):
+    # Sanitize ALB name for file output
+    sanitized_alb_name = alb.replace("/", "_")
+    output_file = Path(output_dir) / f"alb_thresholds_{env}_{sanitized_alb_name}.json"
+    with open(output_file, "w") as f:
+        json.dump(thresholds, f, indent=2)
+
+    print(f"Thresholds saved to {output_file}")
 
 
 def main():
+    script_dir = Path(__file__).parent.parent
+
     parser = argparse.ArgumentParser(description="Generate historical thresholds for ALB monitors.")
     parser.add_argument("--env", required=True, help="Environment name (e.g., qa, staging, prd).")
-    parser.add_argument("--alb", required=True, help="ALB name (e.g., qa-alb-1).")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--alb", help="ALB name (e.g., qa-alb-1), or a comma separated list of names.")
+    target.add_argument("--fleet", action="store_true",
+                        help="Process every ALB configured for the environment in the application configs.")
+    parser.add_argument("--apps", help="Comma separated applications to restrict --fleet to")
+    parser.add_argument("--apps-dir", default=script_dir / 'monitor_configs' / 'applications',
+                        help="Applications config directory")
+    parser.add_argument("--env-dir", default=script_dir / 'monitor_configs' / 'environments',
+                        help="Environments config directory")
+    parser.add_argument("--batch-size", type=int, default=20, help="ALBs per grouped query (default: 20)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Queries in flight at once (default: 4)")
+    parser.add_argument("--api-url", default=os.environ.get('DATADOG_HOST', DEFAULT_API_URL),
+                        help="Datadog API base URL (default: $DATADOG_HOST or the EU site)")
+    parser.add_argument("--output-dir", default=".", help="Directory to write threshold files to")
+    parser.add_argument("--index-dir",
+                        help="Also record the critical thresholds in the per-environment index of this directory "
+                             "(e.g. monitor_configs/computed), read by generate_tf_vars.py --computed-dir")
+    parser.add_argument("--ttl", type=int, default=DEFAULT_TTL,
+                        help="Seconds the computed thresholds stay in effect (default: 7 days)")
+    parser.add_argument("--sketch", action="store_true",
+                        help="Keep mergeable per-day sketches of every series instead of raw points")
+    parser.add_argument("--baseline", action="store_true",
+                        help="With --sketch, also write environment-wide thresholds merged from every ALB")
+    parser.add_argument("--multipliers", help="JSON file of threshold multipliers (e.g. scripts/thresholds.json) "
+                                               "overriding the built-in ones")
     args = parser.parse_args()
 
-    # Sanitize ALB name for file output
-    sanitized_alb_name = args.alb.replace("/", "_")
-    thresholds = process_alb_monitoring(args.env, args.alb)
+    if args.baseline and not args.sketch:
+        parser.error("--baseline requires --sketch")
+
+    if not os.environ.get('DATADOG_API_KEY') or not os.environ.get('DATADOG_APP_KEY'):
+        print("Error: Missing Datadog credentials in environment variables")
+        sys.exit(1)
+
+    try:
+        statistics = SKETCH_STATISTICS if args.sketch else STATISTICS
+        multipliers = load_multipliers(args.multipliers, statistics) if args.multipliers else MULTIPLIERS
+    except (OSError, ValueError) as e:
+        print(f"Error loading multipliers: {e}")
+        sys.exit(1)
+
+    if args.fleet:
+        albs = discover_albs(args.apps_dir, args.env_dir, args.env, split_names(args.apps))
+        if not albs:
+            print(f"No ALBs configured for environment {args.env}")
+            return
+    else:
+        albs = split_names(args.alb)
+
+    fleet, baseline, measured = process_fleet(args.env, albs, args.api_url.rstrip('/'), args.batch_size, args.concurrency,
+                                    multipliers, args.sketch, args.baseline)
 
     # Save thresholds to JSON
-    output_file = f"alb_thresholds_{args.env}_{sanitized_alb_name}.json"
-    with open(output_file, "w") as f:
-        json.dump(thresholds, f, indent=2)
+    for alb, thresholds in fleet.items():
+        write_thresholds(args.env, alb, thresholds, args.output_dir)
 
-    print(f"Thresholds saved to {output_file}")
+    if args.index_dir:
+        # The ALB monitors alert on the critical level; defaults for series without data are not recorded
+        computed = {alb: {monitor: fleet[alb][monitor]["critical"] for monitor in measured[alb]} for alb in fleet}
+        print(f"Computed thresholds recorded in {update_index(args.index_dir, args.env, computed, args.ttl)}")
+
+    if baseline is not None:
+        output_file = Path(args.output_dir) / f"alb_baseline_{args.env}.json"
+        with open(output_file, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline thresholds saved to {output_file}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# scripts/generate_synthetic_configs.py
+"""Generate a synthetic monitor_configs tree of configurable scale.
+
+The tree has the same layout and uses every monitor family the real
+configs do (ECS, ALB, DB, SQS, SNS, APM, Java/Node and logs), with
+environment overrides for a share of the services. The same arguments
+always produce byte-identical files, so benchmark runs are comparable:
+
+    python scripts/generate_synthetic_configs.py --output /tmp/synthetic \\
+        --apps 500 --envs qa,staging,prd --services 50 --log-lines 20
+
+With --layered the settings every environment shares move to an
+environments/_global.yaml and per-application _base.yaml layers; the
+tree renders exactly like the flat one.
+"""
+
+import argparse
+import random
+import shutil
+from pathlib import Path
+
+import yaml
+
+try:
+    YamlDumper = yaml.CSafeDumper
+except AttributeError:
+    YamlDumper = yaml.SafeDumper
+
+LOG_LINE_TEMPLATES = [
+    "Error getting balance for wallet {n}",
+    "TimeoutException while calling upstream-{n}",
+    "Failed to acquire lock {n}",
+    "io.example.common.exception.BusinessException: code {n}",
+    "Connection reset by peer ({n})",
+]
+
+
+def priority(rng):
+    return str(rng.randint(1, 5))
+
+
+def application_config(app_name, services, log_lines, rng):
+    """Build one application config with the given number of services."""
+    app_type = rng.choice(["java", "node"])
+    names = [f"{app_name}-svc-{i:03d}" for i in range(services)]
+    alb_names = names[::5]
+    db_names = names[::10]
+    queue_names = names[::5]
+    topic_names = names[::10]
+
+    return {
+        "name": app_name,
+        "description": f"Synthetic application {app_name}",
+        "type": app_type,
+        "monitor_sets": {
+            "infrastructure": {
+                "ecs": {"enabled": True, "settings": {"services": {
+                    name: {
+                        "thresholds": {
+                            "cpu_percent": rng.choice([80, 85, 90]),
+                            "memory_percent": rng.choice([85, 90]),
+                            "memory_available": rng.choice([512, 1024, 2048]),
+                            "network_errors": rng.choice([10, 20]),
+                        },
+                        "alert_settings": {"include_tags": True, "priority": priority(rng)},
+                    } for name in names
+                }}},
+                "alb": {"enabled": True, "settings": {"services": {
+                    name: {
+                        "alb_name": f"{name}-alb",
+                        "thresholds": {"request_count": rng.choice([100, 500]), "latency": rng.choice([200, 500]),
+                                       "error_rate": rng.choice([5, 20])},
+                        "alert_settings": {"include_tags": True, "priority": priority(rng)},
+                    } for name in alb_names
+                }}},
+                "db": {"enabled": True, "settings": {"databases": {
+                    name: {
+                        "type": rng.choice(["rds", "aurora"]),
+                        "identifier": f"{name}-db",
+                        "service_name": name,
+                        "thresholds": {"cpu_percent": 80, "memory_threshold": 2048, "connection_threshold": 100},
+                        "alert_settings": {"include_tags": True, "priority": priority(rng)},
+                    } for name in db_names
+                }}},
+            },
+            "messaging": {
+                "sqs": {"enabled": True, "settings": {"queues": {
+                    f"{name}-events": {
+                        "queue_name": f"{name}-events",
+                        "dlq_name": f"{name}-events-dlq",
+                        "service_name": name,
+                        "thresholds": {"age_threshold": 300, "depth_threshold": 1000, "dlq_threshold": 1},
+                        "alert_settings": {"include_tags": True, "priority": priority(rng)},
+                    } for name in queue_names
+                }}},
+                "sns": {"enabled": True, "settings": {"topics": {
+                    name: {
+                        "topic_name": f"{name}-topic",
+                        "service_name": name,
+                        "thresholds": {"message_count_threshold": 100, "age_threshold": 300},
+                        "alert_settings": {"include_tags": True, "priority": priority(rng)},
+                    } for name in topic_names
+                }}},
+            },
+            "application": {
+                "apm": {"enabled": True, "services": {
+                    name: {
+                        "thresholds": {"latency": rng.choice([200, 250]), "error_rate": 0.05, "throughput": 100},
+                        "alert_settings": {"priority": priority(rng), "include_tags": True},
+                    } for name in names
+                }},
+                app_type: {"enabled": True, "services": {
+                    name: {"alert_settings": {"priority": priority(rng)}} for name in names
+                }},
+            },
+            "logs": {"enabled": True, "services": {
+                name: {
+                    "custom_log_lines": [rng.choice(LOG_LINE_TEMPLATES).format(n=i) for i in range(log_lines)],
+                    "thresholds": {"critical": 20, "critical_recovery": 15, "warning": 10, "warning_recovery": 5},
+                } for name in names
+            }},
+        },
+    }
+
+
+def notification_channels(suffix):
+    return {
+        "infrastructure": {"ecs": f"slack-ecs-alerts-{suffix}", "alb": f"slack-elb-alerts-{suffix}",
+                           "rds": f"slack-rds-alerts-{suffix}"},
+        "messaging": {"sns": f"slack-sns-alerts-{suffix}", "sqs": f"slack-sqs-alerts-{suffix}"},
+        "application": {"java": f"slack-apm-alerts-{suffix}", "node": f"slack-apm-alerts-{suffix}",
+                        "apm": f"slack-apm-alerts-{suffix}"},
+        "logs": f"slack-logs-alerts-{suffix}",
+        "default": f"slack-ecs-alerts-{suffix}",
+    }
+
+
+def environment_config(app_config, env, rng, override_share):
+    """Build one environment config overriding a share of the application's services."""
+    app_name = app_config['name']
+    monitor_sets = app_config['monitor_sets']
+    app_type = app_config['type']
+
+    def some(names):
+        return [name for name in names if rng.random() < override_share]
+
+    ecs = monitor_sets['infrastructure']['ecs']['settings']['services']
+    alb = monitor_sets['infrastructure']['alb']['settings']['services']
+    apm = monitor_sets['application']['apm']['services']
+    logs = monitor_sets['logs']['services']
+
+    return {
+        "environment": env,
+        "cluster_name": f"{app_name}-{env}-cluster",
+        "notification_channels": notification_channels("p1" if env == "prd" else "p2"),
+        "threshold_overrides": {
+            "infrastructure": {
+                "ecs": {name: {"cpu_percent": 90, "memory_percent": 90, "alert_settings": {"priority": priority(rng)}}
+                        for name in some(ecs)},
+                "alb": {name: {"enabled": False} for name in some(alb)},
+            },
+            "application": {
+                "apm": {"enabled": True, "services": {
+                    name: {"thresholds": {"latency": 150}, "alert_settings": {"priority": priority(rng)}}
+                    for name in some(apm)
+                }},
+                app_type: {"enabled": True, "services": {
+                    name: {"alert_settings": {"priority": priority(rng)}} for name in some(apm)
+                }},
+            },
+            "logs": {"error_rate": 25, "services": {
+                name: {"thresholds": {"critical": 50, "critical_recovery": 40, "warning": 35, "warning_recovery": 30}}
+                for name in some(logs)
+            }},
+        },
+    }
+
+
+def global_layer():
+    """Build the environments/_global.yaml layer: non-production channels and the log error rate."""
+    channels = notification_channels("p2")
+    return {"notification_channels": channels, "threshold_overrides": {"logs": {"error_rate": 25}}}
+
+
+def base_layer(app_config):
+    """Build the <app>/_base.yaml layer enabling the application's APM and runtime monitors."""
+    return {"threshold_overrides": {"application": {"apm": {"enabled": True}, app_config['type']: {"enabled": True}}}}
+
+
+def strip_inherited(document, inherited):
+    """Return document without the values it would inherit unchanged from the inherited layers."""
+    stripped = {}
+    for key, value in document.items():
+        if key not in inherited:
+            stripped[key] = value
+        elif isinstance(value, dict) and isinstance(inherited[key], dict):
+            nested = strip_inherited(value, inherited[key])
+            if nested or not value:
+                stripped[key] = nested
+        elif value != inherited[key]:
+            stripped[key] = value
+    return stripped
+
+
+def write_yaml(path, document):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        yaml.dump(document, f, Dumper=YamlDumper, sort_keys=False, default_flow_style=False, width=1000)
+
+
+def generate_tree(output, apps, envs, services, log_lines, override_share=0.3, seed=0, layered=False):
+    """Write a synthetic tree to output/applications and output/environments; returns the file count."""
+    output = Path(output)
+    for directory in ('applications', 'environments'):
+        shutil.rmtree(output / directory, ignore_errors=True)
+
+    files = 0
+    if layered:
+        write_yaml(output / 'environments' / '_global.yaml', global_layer())
+        files += 1
+    for i in range(apps):
+        app_name = f"app-{i:04d}"
+        rng = random.Random(f"{seed}:{app_name}")
+        app_config = application_config(app_name, services, log_lines, rng)
+        write_yaml(output / 'applications' / f"{app_name}.yaml", app_config)
+        files += 1
+        if layered:
+            write_yaml(output / 'environments' / app_name / '_base.yaml', base_layer(app_config))
+            files += 1
+        for env in envs:
+            env_config = environment_config(app_config, env, rng, override_share)
+            if layered:
+                env_config = strip_inherited(strip_inherited(env_config, global_layer()), base_layer(app_config))
+            write_yaml(output / 'environments' / app_name / f"{env}.yaml", env_config)
+            files += 1
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic monitor_configs tree')
+    parser.add_argument('--output', required=True, help='Directory to write applications/ and environments/ to')
+    parser.add_argument('--apps', type=int, default=20, help='Number of applications (default: 20)')
+    parser.add_argument('--envs', default='qa,staging,prd', help='Comma separated environments (default: qa,staging,prd)')
+    parser.add_argument('--services', type=int, default=10, help='Services per application (default: 10)')
+    parser.add_argument('--log-lines', type=int, default=5, help='Custom log lines per service (default: 5)')
+    parser.add_argument('--override-share', type=float, default=0.3,
+                        help='Share of services overridden per environment (default: 0.3)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--layered', action='store_true',
+                        help='Move shared environment settings to _global.yaml and per-application _base.yaml layers')
+    args = parser.parse_args()
+
+    envs = [env.strip() for env in args.envs.split(',') if env.strip()]
+    files = generate_tree(args.output, args.apps, envs, args.services, args.log_lines, args.override_share, args.seed,
+                          args.layered)
+    print(f"Wrote {files} config files to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
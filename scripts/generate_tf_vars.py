@@ -1,14 +1,144 @@
 #!/usr/bin/env python3
 import argparse
+import hashlib
 import json
-import yaml
+import logging
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
-def load_yaml_file(file_path):
-    """Load a YAML file and return its contents."""
-    with open(file_path, 'r') as f:
-        return yaml.safe_load(f)
+import render_profile
+from compact_tfvars import DEFAULTS_SUFFIX, compact_tf_vars
+from computed_thresholds import computed_thresholds, thresholds_digest
+from config_layers import LAYER_PREFIX, input_paths, resolve_env_config
+from config_loader import content_hash, load_yaml_file
+from log_setup import add_logging_arguments, configure_logging
+from merge_engine import Field, MergePlan
+from monitor_groups import GROUPED_FAMILIES, group_tf_vars
+from render_manifest import input_hashes, is_up_to_date, load_manifest, pair_key, record, save_manifest
+
+# Sharded output: one <shard>.auto.tfvars.json per monitor family variable
+# (with its <family>_defaults in compact form and its monitor groups),
+# planned through the tofu module that consumes it. The remaining variables
+# (project, environment, channels, tags) form the common shard, which every
+# module reads.
+SHARD_MODULES = {
+    "services": "ecs_monitoring",
+    "alb": "alb_monitoring",
+    "databases": "db_monitoring",
+    "queues": "sqs_monitoring",
+    "topics": "sns_monitoring",
+    "java_services": "java_monitoring",
+    "node_services": "node_monitoring",
+    "apm_services": "apm_monitoring",
+    "logs": "logs_monitoring",
+}
+COMMON_SHARD = "common"
+SHARD_INDEX = "tfvars.shards.json"
+SHARD_FORMAT = 1
+
+logger = logging.getLogger('generate_tf_vars')
+
+# Modules whose code shapes the rendered output; see generator_version()
+GENERATOR_SOURCES = [Path(__file__).resolve()] + [
+    Path(__file__).resolve().parent / module
+    for module in ('merge_engine.py', 'compact_tfvars.py', 'monitor_groups.py', 'config_layers.py',
+                   'computed_thresholds.py')
+]
+
+# Merge plans: how every output field of a monitor family is resolved.
+# Each Field lists its default followed by the lookups tried in order,
+# 'override' being the environment override and 'base' the application config.
+# ALB thresholds also look up 'computed', the fresh values of the computed
+# threshold index (see computed_thresholds.py), between the two.
+
+# ECS overrides are looked up directly under threshold_overrides.infrastructure, keyed by service
+ECS_PLAN = MergePlan([
+    Field('service_name',                 None,  'override.service_name',          'base.service_name'),
+    Field('thresholds.cpu_percent',       85,    'override.cpu_percent',           'base.thresholds.cpu_percent'),
+    Field('thresholds.memory_percent',    90,    'override.memory_percent',        'base.thresholds.memory_percent'),
+    Field('thresholds.memory_available',  1024,  'override.memory_available',      'base.thresholds.memory_available'),
+    Field('thresholds.network_errors',    20,    'override.network_errors',        'base.thresholds.network_errors'),
+    Field('thresholds.desired_count',     2,     'override.desired_count',         'base.thresholds.desired_count'),
+    Field('alert_settings.priority',      '2',   'override.alert_settings.priority', 'base.alert_settings.priority'),
+    Field('alert_settings.include_tags',  True,  'base.alert_settings.include_tags'),
+])
+
+ALB_PLAN = MergePlan([
+    Field('alb_name',                     None,  'override.alb_name',              'base.alb_name'),
+    Field('service_name',                 None,  'override.service_name',          'base.service_name'),
+    Field('thresholds.request_count',     100,   'override.request_count',   'computed.request_count', 'base.thresholds.request_count'),
+    Field('thresholds.latency',           200,   'override.latency',         'computed.latency',       'base.thresholds.latency'),
+    Field('thresholds.error_rate',        20,    'override.error_rate',      'computed.error_rate',    'base.thresholds.error_rate'),
+    Field('alert_settings.priority',      '2',   'override.alert_settings.priority', 'base.alert_settings.priority'),
+    Field('alert_settings.include_tags',  True,  'base.alert_settings.include_tags'),
+])
+
+DB_PLAN = MergePlan([
+    Field('type',                              None,  'override.type',           'base.type', required=True),
+    Field('identifier',                        None,  'override.identifier',     'base.identifier', required=True),
+    Field('service_name',                      None,  'override.service_name',   'base.service_name', required=True),
+    Field('thresholds.cpu_percent',            80,    'override.cpu_percent',          'base.thresholds.cpu_percent'),
+    Field('thresholds.memory_threshold',       2,     'override.memory_threshold',     'base.thresholds.memory_threshold'),
+    Field('thresholds.connection_threshold',   100,   'override.connection_threshold', 'base.thresholds.connection_threshold'),
+    Field('thresholds.iops_threshold',         2400,  'override.iops_threshold',       'base.thresholds.iops_threshold'),
+    Field('alert_settings.priority',           '2',   'override.alert_settings.priority', 'base.alert_settings.priority'),
+    Field('alert_settings.include_tags',       True,  'base.alert_settings.include_tags'),
+])
+
+SQS_PLAN = MergePlan([
+    Field('service_name',                 None,  'override.service_name',          'base.service_name', required=True),
+    Field('queue_name',                   None,  'override.queue_name',            'base.queue_name', required=True),
+    Field('dlq_name',                     None,  'override.dlq_name',              'base.dlq_name'),
+    Field('thresholds.age_threshold',     300,   'override.thresholds.age_threshold',   'base.thresholds.age_threshold'),
+    Field('thresholds.depth_threshold',   1000,  'override.thresholds.depth_threshold', 'base.thresholds.depth_threshold'),
+    Field('thresholds.dlq_threshold',     1,     'override.thresholds.dlq_threshold',   'base.thresholds.dlq_threshold'),
+    Field('alert_settings.priority',      '2',   'override.alert_settings.priority',     'base.alert_settings.priority'),
+    Field('alert_settings.include_tags',  True,  'override.alert_settings.include_tags', 'base.alert_settings.include_tags'),
+])
+
+SNS_PLAN = MergePlan([
+    Field('service_name',                          None,  'override.service_name',  'base.service_name', required=True),
+    Field('topic_name',                            None,  'override.topic_name',    'base.topic_name', required=True),
+    Field('thresholds.message_count_threshold',    100,   'override.thresholds.message_count_threshold', 'base.thresholds.message_count_threshold'),
+    Field('thresholds.age_threshold',              300,   'override.thresholds.age_threshold',           'base.thresholds.age_threshold'),
+    Field('alert_settings.priority',               '2',   'override.alert_settings.priority',     'base.alert_settings.priority'),
+    Field('alert_settings.include_tags',           True,  'override.alert_settings.include_tags', 'base.alert_settings.include_tags'),
+])
+
+JAVA_PLAN = MergePlan([
+    Field('alert_settings.priority',      '2',   'override.alert_settings.priority', 'base.alert_settings.priority'),
+    Field('alert_settings.include_tags',  True,  'base.alert_settings.include_tags'),
+])
+
+NODE_PLAN = MergePlan([
+    Field('alert_settings.priority',      '3',   'override.alert_settings.priority', 'base.alert_settings.priority'),
+    Field('alert_settings.include_tags',  True,  'base.alert_settings.include_tags'),
+])
+
+APM_PLAN = MergePlan([
+    Field('enabled',                      True,  'override.enabled',               'base.enabled'),
+    Field('alert_settings.priority',      '3',   'override.alert_settings.priority', 'base.alert_settings.priority'),
+    Field('alert_settings.include_tags',  True,  'base.alert_settings.include_tags'),
+])
+
+# Log thresholds default relative to the environment's global error rate (context['error_rate'])
+LOG_PLAN = MergePlan([
+    Field('thresholds.critical',          lambda ctx: ctx['error_rate'],      'override.thresholds.critical',          'base.thresholds.critical'),
+    Field('thresholds.critical_recovery', lambda ctx: ctx['error_rate'] - 10, 'override.thresholds.critical_recovery', 'base.thresholds.critical_recovery'),
+    Field('thresholds.warning',           lambda ctx: ctx['error_rate'] - 5,  'override.thresholds.warning',           'base.thresholds.warning'),
+    Field('thresholds.warning_recovery',  lambda ctx: ctx['error_rate'] - 15, 'override.thresholds.warning_recovery',  'base.thresholds.warning_recovery'),
+    Field('error_rate_priority',          '2',   'override.alert_settings.priority', 'base.alert_settings.priority'),
+    Field('log_line_priority',            '3',   'override.alert_settings.priority', 'base.alert_settings.priority'),
+    Field('include_tags',                 True,  'base.alert_settings.include_tags'),
+    Field('combine_log_lines',            lambda ctx: ctx['combine_log_lines'], 'override.combine_log_lines', 'base.combine_log_lines'),
+])
+
+# Combined log-line monitors OR at most this many patterns into one query
+LOG_LINES_PER_MONITOR = 10
 
 def apply_overrides(service_settings, overrides):
     """Apply environment overrides to service settings."""
@@ -38,9 +168,8 @@ def validate_db_names(app_config, env_config):
 
     unknown_dbs = env_db_names - app_db_names
     if unknown_dbs:
-        print(f"\nWarning: Found database overrides in environment config that don't exist in application config: {unknown_dbs}")
-        print(f"Application database names: {app_db_names}")
-        print(f"Environment override names: {env_db_names}")
+        logger.warning("Found database overrides in environment config that don't exist in application config: %s", sorted(unknown_dbs),
+                       extra={"fields": {"app_databases": sorted(app_db_names), "override_databases": sorted(env_db_names)}})
 
 def process_ecs_services(ecs_config, env_config, new_cluster_name, app_name):
     """Process ECS services configuration with threshold overrides."""
@@ -55,40 +184,11 @@ def process_ecs_services(ecs_config, env_config, new_cluster_name, app_name):
     for service_name, service_settings in main_services.items():
         # Get service-specific overrides
         service_overrides = ecs_overrides.get(service_name, {})
-        
-        # Debug prints to track values
-        print(f"Debug - Processing ECS service: {service_name}")
-        print(f"Debug - Base settings: {service_settings}")
-        print(f"Debug - Override settings: {service_overrides}")
-
-        # Get base thresholds and settings
-        base_thresholds = service_settings.get('thresholds', {})
-        base_alert_settings = service_settings.get('alert_settings', {})
-        
-        # Create the final thresholds dict with override priority
-        final_thresholds = {
-            "cpu_percent": service_overrides.get('cpu_percent', 
-                base_thresholds.get('cpu_percent', 85)),
-            "memory_percent": service_overrides.get('memory_percent', 
-                base_thresholds.get('memory_percent', 90)),
-            "memory_available": service_overrides.get('memory_available', 
-                base_thresholds.get('memory_available', 1024)),
-            "network_errors": service_overrides.get('network_errors', 
-                base_thresholds.get('network_errors', 20)),
-            "desired_count": service_overrides.get('desired_count', 
-                base_thresholds.get('desired_count', 2))
-        }
 
-        # Create final alert settings with override priority
-        final_alert_settings = {
-            "priority": service_overrides.get('alert_settings', {}).get('priority', 
-                base_alert_settings.get('priority', '2')),
-            "include_tags": base_alert_settings.get('include_tags', True)
-        }
+        logger.debug("Processing ECS service %s", service_name,
+                     extra={"fields": {"base": service_settings, "overrides": service_overrides}})
 
-        # Get service name with override priority
-        actual_service_name = service_overrides.get('service_name', 
-            service_settings.get('service_name'))
+        resolved = ECS_PLAN.resolve({'override': service_overrides, 'base': service_settings})
 
         # Get task name with proper override handling and fallback
         task_name = service_overrides.get('task_name')
@@ -99,15 +199,13 @@ def process_ecs_services(ecs_config, env_config, new_cluster_name, app_name):
             env = env_config.get('environment', 'prd')  # Default to prd if not specified
             task_name = f"{service_name}-{env}"
 
-        print(f"Debug - Final task_name for {service_name}: {task_name}")
-
         service_config = {
             "name": service_name,
-            "service_name": actual_service_name,
+            "service_name": resolved['service_name'],
             "task_name": task_name,
             "cluster": new_cluster_name,
-            "thresholds": final_thresholds,
-            "alert_settings": final_alert_settings,
+            "thresholds": resolved['thresholds'],
+            "alert_settings": resolved['alert_settings'],
             "tags": {
                 "application": app_name,
                 "service": service_name
@@ -116,13 +214,15 @@ def process_ecs_services(ecs_config, env_config, new_cluster_name, app_name):
 
         services_config[f"{app_name}-{service_name}"] = service_config
 
-        print(f"Debug - Final config for {service_name}:")
-        print(service_config)
+        logger.debug("Final ECS config for %s", service_name, extra={"fields": {"config": service_config}})
 
     return services_config
 
-def process_alb_config(alb_config, env_config, app_name, new_cluster_name):
-    """Process ALB configuration."""
+def process_alb_config(alb_config, env_config, app_name, new_cluster_name, computed=None):
+    """Process ALB configuration.
+
+    computed maps an ALB name to its fresh computed thresholds.
+    """
     alb_services_config = {}
 
     # Check if the ALB monitoring is enabled
@@ -136,95 +236,59 @@ def process_alb_config(alb_config, env_config, app_name, new_cluster_name):
         for service_name, service_settings in main_services.items():
             # Get environment overrides for the specific service
             service_overrides = alb_overrides.get(service_name, {})
-            
-            # Debug prints to verify values
-            print(f"Debug - Processing ALB service: {service_name}")
-            print(f"Debug - Base settings: {service_settings}")
-            print(f"Debug - Override settings: {service_overrides}")
+
+            logger.debug("Processing ALB service %s", service_name,
+                         extra={"fields": {"base": service_settings, "overrides": service_overrides}})
             
             # Check if service should be enabled (default to True if not specified)
             if service_overrides.get('enabled', True):
-                # Get base and override thresholds
-                base_thresholds = service_settings.get('thresholds', {})
-                
-                # Merge thresholds, giving priority to overrides
-                final_thresholds = {
-                    "request_count": service_overrides.get('request_count', 
-                        base_thresholds.get('request_count', 100)),
-                    "latency": service_overrides.get('latency', 
-                        base_thresholds.get('latency', 200)),
-                    "error_rate": service_overrides.get('error_rate', 
-                        base_thresholds.get('error_rate', 20))
-                }
-
-                # Get base and override alert settings
-                base_alert_settings = service_settings.get('alert_settings', {})
-                override_alert_settings = service_overrides.get('alert_settings', {})
-                
-                # Merge alert settings
-                final_alert_settings = {
-                    "priority": override_alert_settings.get('priority', 
-                        base_alert_settings.get('priority', '2')),
-                    "include_tags": base_alert_settings.get('include_tags', True)
-                }
-
-                print(f"Debug - Final thresholds: {final_thresholds}")
-                print(f"Debug - Final alert settings: {final_alert_settings}")
-
-                # Build the complete service config
-                alb_service_config = {
+                sources = {'override': service_overrides, 'base': service_settings}
+                # The computed thresholds are keyed by the ALB the service resolves to, looked up
+                # the way ALB_PLAN resolves alb_name
+                alb_name = service_overrides.get('alb_name', service_settings.get('alb_name'))
+                if computed and alb_name in computed:
+                    sources['computed'] = computed[alb_name]
+                resolved = ALB_PLAN.resolve(sources)
+
+                alb_services_config[f"{app_name}-{service_name}"] = {
                     "name": service_name,
                     "cluster": new_cluster_name,
-                    "alb_name": service_overrides.get('alb_name', 
-                        service_settings.get('alb_name')),
-                    "service_name": service_overrides.get('service_name', 
-                        service_settings.get('service_name')),
-                    "thresholds": final_thresholds,
-                    "alert_settings": final_alert_settings,
+                    "alb_name": resolved['alb_name'],
+                    "service_name": resolved['service_name'],
+                    "thresholds": resolved['thresholds'],
+                    "alert_settings": resolved['alert_settings'],
                     "tags": {
                         "application": app_name,
                         "service": service_name
                     }
                 }
 
-                alb_services_config[f"{app_name}-{service_name}"] = alb_service_config
-
     return alb_services_config
 
 def process_db_config(db_config, env_config, app_name, new_cluster_name):
     """Process database configuration."""
     databases_config = {}
 
+    db_overrides = env_config.get('threshold_overrides', {}).get('infrastructure', {}).get('db', {})
+
     # Check if the DB monitoring is enabled in the main config and overrides
-    if db_config.get('enabled', True):  # Default to True if not specified
+    if db_config.get('enabled', True) and db_overrides.get('enabled', True):  # Default to True if not specified
         for db_name, db_settings in db_config.get('settings', {}).get('databases', {}).items():
-            # Get environment overrides for the database
-            db_env_overrides = env_config.get('threshold_overrides', {}).get('infrastructure', {}).get('db', {}).get(db_name, {})
-            
-            # Check if the database should be enabled based on overrides
-            if env_config.get('threshold_overrides', {}).get('infrastructure', {}).get('db', {}).get('enabled', True):
-                # Build the database service config with overrides
-                databases_config[f"{app_name}-{db_name}"] = {
-                    "name": db_name,
-                    "type": db_env_overrides.get('type', db_settings['type']),
-                    "identifier": db_env_overrides.get('identifier', db_settings['identifier']),
-                    "service_name": db_env_overrides.get('service_name', db_settings['service_name']),
-                    "cluster": new_cluster_name,
-                    "thresholds": {
-                        "cpu_percent": db_env_overrides.get('cpu_percent', db_settings['thresholds'].get('cpu_percent', 80)),
-                        "memory_threshold": db_env_overrides.get('memory_threshold', db_settings['thresholds'].get('memory_threshold', 2)),
-                        "connection_threshold": db_env_overrides.get('connection_threshold', db_settings['thresholds'].get('connection_threshold', 100)),
-                        "iops_threshold": db_env_overrides.get('iops_threshold', db_settings['thresholds'].get('iops_threshold', 2400))
-                    },
-                    "alert_settings": {
-                        "priority": db_env_overrides.get('alert_settings', {}).get('priority', db_settings['alert_settings'].get('priority', '2')),
-                        "include_tags": db_settings.get('alert_settings', {}).get('include_tags', True)
-                    },
-                    "tags": {
-                        "application": app_name,
-                        "database": db_name
-                    }
+            resolved = DB_PLAN.resolve({'override': db_overrides.get(db_name, {}), 'base': db_settings})
+
+            databases_config[f"{app_name}-{db_name}"] = {
+                "name": db_name,
+                "type": resolved['type'],
+                "identifier": resolved['identifier'],
+                "service_name": resolved['service_name'],
+                "cluster": new_cluster_name,
+                "thresholds": resolved['thresholds'],
+                "alert_settings": resolved['alert_settings'],
+                "tags": {
+                    "application": app_name,
+                    "database": db_name
                 }
+            }
     
     return databases_config
 
@@ -238,51 +302,29 @@ def process_messaging(messaging_config, env_config, app_name, new_cluster_name):
 
     # Process SQS configuration
     sqs_config = messaging_config.get('sqs', {})
-    sqs_enabled = sqs_config.get('enabled', True)
     sqs_overrides = messaging_overrides.get('sqs', {})
-    sqs_override_enabled = sqs_overrides.get('enabled', True)
     
-    if sqs_enabled and sqs_override_enabled:
+    if sqs_config.get('enabled', True) and sqs_overrides.get('enabled', True):
         # Get queue settings from both main config and overrides
         main_queues = sqs_config.get('settings', {}).get('queues', {})
         override_queues = sqs_overrides.get('settings', {}).get('queues', {})
         
         for queue_name, queue_settings in main_queues.items():
-            # Get override settings for this specific queue
             queue_overrides = override_queues.get(queue_name, {})
-            
-            # Merge thresholds with priority to overrides
-            base_thresholds = queue_settings.get('thresholds', {})
-            override_thresholds = queue_overrides.get('thresholds', {})
-            
-            final_thresholds = {
-                'age_threshold': override_thresholds.get('age_threshold', base_thresholds.get('age_threshold', 300)),
-                'depth_threshold': override_thresholds.get('depth_threshold', base_thresholds.get('depth_threshold', 1000)),
-                'dlq_threshold': override_thresholds.get('dlq_threshold', base_thresholds.get('dlq_threshold', 1))
-            }
-
-            # Merge alert settings
-            base_alert_settings = queue_settings.get('alert_settings', {})
-            override_alert_settings = queue_overrides.get('alert_settings', {})
-            
-            final_alert_settings = {
-                'priority': override_alert_settings.get('priority', base_alert_settings.get('priority', '2')),
-                'include_tags': override_alert_settings.get('include_tags', base_alert_settings.get('include_tags', True))
-            }
+            resolved = SQS_PLAN.resolve({'override': queue_overrides, 'base': queue_settings})
 
-            print(f"Debug - Processing queue {queue_name}")
-            print(f"Debug - Base thresholds: {base_thresholds}")
-            print(f"Debug - Override thresholds: {override_thresholds}")
-            print(f"Debug - Final thresholds: {final_thresholds}")
+            logger.debug("Processing queue %s", queue_name,
+                         extra={"fields": {"base": queue_settings.get('thresholds', {}), "overrides": queue_overrides.get('thresholds', {}),
+                                           "final": resolved['thresholds']}})
 
             queues_config[f"{app_name}-{queue_name}"] = {
                 "name": queue_name,
-                "service_name": queue_overrides.get('service_name', queue_settings['service_name']),
+                "service_name": resolved['service_name'],
                 "cluster": new_cluster_name,
-                "queue_name": queue_overrides.get('queue_name', queue_settings['queue_name']),
-                "dlq_name": queue_overrides.get('dlq_name', queue_settings.get('dlq_name')),
-                "thresholds": final_thresholds,
-                "alert_settings": final_alert_settings,
+                "queue_name": resolved['queue_name'],
+                "dlq_name": resolved['dlq_name'],
+                "thresholds": resolved['thresholds'],
+                "alert_settings": resolved['alert_settings'],
                 "tags": {
                     "application": app_name,
                     "queue": queue_name
@@ -291,51 +333,28 @@ def process_messaging(messaging_config, env_config, app_name, new_cluster_name):
 
     # Process SNS configuration
     sns_config = messaging_config.get('sns', {})
-    sns_enabled = sns_config.get('enabled', True)
     sns_overrides = messaging_overrides.get('sns', {})
-    sns_override_enabled = sns_overrides.get('enabled', True)
     
-    if sns_enabled and sns_override_enabled:
+    if sns_config.get('enabled', True) and sns_overrides.get('enabled', True):
         # Get topic settings from both main config and overrides
         main_topics = sns_config.get('settings', {}).get('topics', {})
         override_topics = sns_overrides.get('settings', {}).get('topics', {})
         
         for topic_name, topic_settings in main_topics.items():
-            # Get override settings for this specific topic
             topic_overrides = override_topics.get(topic_name, {})
-            
-            # Merge thresholds with priority to overrides
-            base_thresholds = topic_settings.get('thresholds', {})
-            override_thresholds = topic_overrides.get('thresholds', {})
-            
-            final_thresholds = {
-                'message_count_threshold': override_thresholds.get('message_count_threshold', 
-                    base_thresholds.get('message_count_threshold', 100)),
-                'age_threshold': override_thresholds.get('age_threshold', 
-                    base_thresholds.get('age_threshold', 300))
-            }
-
-            # Merge alert settings
-            base_alert_settings = topic_settings.get('alert_settings', {})
-            override_alert_settings = topic_overrides.get('alert_settings', {})
-            
-            final_alert_settings = {
-                'priority': override_alert_settings.get('priority', base_alert_settings.get('priority', '2')),
-                'include_tags': override_alert_settings.get('include_tags', base_alert_settings.get('include_tags', True))
-            }
+            resolved = SNS_PLAN.resolve({'override': topic_overrides, 'base': topic_settings})
 
-            print(f"Debug - Processing topic {topic_name}")
-            print(f"Debug - Base thresholds: {base_thresholds}")
-            print(f"Debug - Override thresholds: {override_thresholds}")
-            print(f"Debug - Final thresholds: {final_thresholds}")
+            logger.debug("Processing topic %s", topic_name,
+                         extra={"fields": {"base": topic_settings.get('thresholds', {}), "overrides": topic_overrides.get('thresholds', {}),
+                                           "final": resolved['thresholds']}})
 
             topics_config[f"{app_name}-{topic_name}"] = {
                 "name": topic_name,
-                "service_name": topic_overrides.get('service_name', topic_settings['service_name']),
+                "service_name": resolved['service_name'],
                 "cluster": new_cluster_name,
-                "topic_name": topic_overrides.get('topic_name', topic_settings['topic_name']),
-                "thresholds": final_thresholds,
-                "alert_settings": final_alert_settings,
+                "topic_name": resolved['topic_name'],
+                "thresholds": resolved['thresholds'],
+                "alert_settings": resolved['alert_settings'],
                 "tags": {
                     "application": app_name,
                     "topic": topic_name
@@ -351,73 +370,39 @@ def process_application_config(app_config, env_config, new_cluster_name):
     # Ensure monitor_sets exists in app_config
     monitor_sets = app_config.get('monitor_sets', {})
     if not monitor_sets:
-        print("Debug - No monitor_sets found in app_config.")
+        logger.debug("No monitor_sets found in app_config")
         return applications_config
 
     # Check for application monitoring settings within monitor_sets
     application_settings = monitor_sets.get('application', {})
     if not application_settings:
-        print("Debug - No application settings found within monitor_sets.")
+        logger.debug("No application settings found within monitor_sets")
         return applications_config
 
-    # Process Java monitoring
-    java_config = application_settings.get('java', {})
-    if app_config.get('type') == "java" and java_config.get('enabled', False):
-        for service_name, service_config in java_config.get('services', {}).items():
-            # Get the complete override path for Java service
-            java_env_overrides = env_config.get('threshold_overrides', {}).get('application', {}).get('java', {}).get('services', {}).get(service_name, {})
-            
-            # Only keep alert settings since we're using anomaly detection now
-            base_alert_settings = service_config.get('alert_settings', {})
-            override_alert_settings = java_env_overrides.get('alert_settings', {})
-            
-            final_alert_settings = {
-                'priority': override_alert_settings.get('priority', base_alert_settings.get('priority', '2')),
-                'include_tags': base_alert_settings.get('include_tags', True)
-            }
+    application_overrides = env_config.get('threshold_overrides', {}).get('application', {})
 
-            applications_config[f"{service_name}-jvm"] = {
-                "name": service_name,
-                "service_name": service_name,
-                "cluster": new_cluster_name,
-                "service_type": app_config.get('type'),
-                "alert_settings": final_alert_settings,
-                "tags": {
-                    "application": app_config['name'],
-                    "type": "java"
-                }
-            }
-            print(f"Debug - Added Java service config for {service_name}")
-
-    # Process Node.js monitoring
-    node_config = application_settings.get('node', {})
-    if app_config.get('type') == "node" and node_config.get('enabled', False):
-        print("Debug - Node monitoring enabled and type is node")
-        for service_name, service_config in node_config.get('services', {}).items():
-            # Get the complete override path for Node service
-            node_env_overrides = env_config.get('threshold_overrides', {}).get('application', {}).get('node', {}).get('services', {}).get(service_name, {})
-
-            # Only keep alert settings since we're using anomaly detection now
-            base_alert_settings = service_config.get('alert_settings', {})
-            override_alert_settings = node_env_overrides.get('alert_settings', {})
-            
-            final_alert_settings = {
-                'priority': override_alert_settings.get('priority', base_alert_settings.get('priority', '3')),
-                'include_tags': base_alert_settings.get('include_tags', True)
-            }
+    # Java and Node.js services only keep alert settings since they use anomaly detection
+    for service_type, suffix, plan in (("java", "jvm", JAVA_PLAN), ("node", "node", NODE_PLAN)):
+        type_config = application_settings.get(service_type, {})
+        if app_config.get('type') != service_type or not type_config.get('enabled', False):
+            continue
+
+        type_overrides = application_overrides.get(service_type, {}).get('services', {})
+        for service_name, service_config in type_config.get('services', {}).items():
+            resolved = plan.resolve({'override': type_overrides.get(service_name, {}), 'base': service_config})
 
-            applications_config[f"{service_name}-node"] = {
+            applications_config[f"{service_name}-{suffix}"] = {
                 "name": service_name,
                 "service_name": service_name,
                 "cluster": new_cluster_name,
                 "service_type": app_config.get('type'),
-                "alert_settings": final_alert_settings,
+                "alert_settings": resolved['alert_settings'],
                 "tags": {
                     "application": app_config['name'],
-                    "type": "node"
+                    "type": service_type
                 }
             }
-            print(f"Debug - Added Node service config for {service_name}")
+            logger.debug("Added %s service config for %s", service_type, service_name)
 
     return applications_config
 
@@ -427,35 +412,32 @@ def process_apm_config(app_config, env_config, new_cluster_name):
 
     # Check if APM is enabled for the application in the main config
     if app_config.get('monitor_sets', {}).get('application', {}).get('apm', {}).get('enabled', False):
+        apm_overrides = env_config.get('threshold_overrides', {}).get('application', {}).get('apm', {}).get('services', {})
+
+        # Get the application type from the main config
+        service_type = app_config.get('type', 'java')  # Default to 'java' if not specified
+
         for service_name, service_settings in app_config['monitor_sets']['application']['apm']['services'].items():
-            # Apply overrides if present in the environment config
-            apm_env_overrides = env_config.get('threshold_overrides', {}).get('application', {}).get('apm', {}).get('services', {}).get(service_name, {})
+            resolved = APM_PLAN.resolve({'override': apm_overrides.get(service_name, {}), 'base': service_settings})
 
             # Check if the service should be enabled, considering overrides
-            service_enabled = apm_env_overrides.get('enabled', service_settings.get('enabled', True))
-            if not service_enabled:
-                print(f"Debug - APM monitoring disabled for {service_name}")
+            if not resolved['enabled']:
+                logger.debug("APM monitoring disabled for %s", service_name)
                 continue  # Skip this service if APM is disabled
 
-            # Get the application type from the main config
-            service_type = app_config.get('type', 'java')  # Default to 'java' if not specified
-
             # Build the APM service config with only necessary settings
             apm_config[f"{service_name}-apm"] = {
                 "name": service_name,
                 "cluster": new_cluster_name,
                 "service_name": service_name,
                 "service_type": service_type,
-                "alert_settings": {
-                    "priority": apm_env_overrides.get('alert_settings', {}).get('priority', service_settings.get('alert_settings', {}).get('priority', '3')),
-                    "include_tags": service_settings.get('alert_settings', {}).get('include_tags', True)
-                },
+                "alert_settings": resolved['alert_settings'],
                 "tags": {
                     "application": app_config['name'],
                     "type": "apm"
                 }
             }
-            print(f"Debug - Added APM service config for {service_name}")
+            logger.debug("Added APM service config for %s", service_name)
 
     return apm_config
 
@@ -466,7 +448,7 @@ def process_log_config(app_config, env_config, new_cluster_name):
     # Check if 'logs' is enabled in the main configuration
     logs_main_config = app_config.get('monitor_sets', {}).get('logs', {})
     if not logs_main_config.get('enabled', False):
-        print("Debug - Log monitoring is disabled.")
+        logger.debug("Log monitoring is disabled")
         return logs_config
 
     # Set index based on environment
@@ -474,87 +456,82 @@ def process_log_config(app_config, env_config, new_cluster_name):
     index = "main" if environment == "prd" else environment
 
     # Global error rate threshold, defaulting to 25 if not specified
-    global_error_rate_threshold = env_config.get('threshold_overrides', {}).get('logs', {}).get('error_rate', 25)
+    logs_overrides = env_config.get('threshold_overrides', {}).get('logs', {})
+    context = {"error_rate": logs_overrides.get('error_rate', 25),
+               "combine_log_lines": logs_overrides.get('combine_log_lines', logs_main_config.get('combine_log_lines', False))}
 
     # Get services from both configurations
     main_services = logs_main_config.get('services', {})
-    override_services = env_config.get('threshold_overrides', {}).get('logs', {}).get('services', {})
+    override_services = logs_overrides.get('services', {})
 
-    # Create a combined list of services
-    all_service_names = set(main_services.keys()).union(override_services.keys())
+    # Create a combined list of services, keeping config order so output is reproducible
+    all_service_names = list(main_services) + [name for name in override_services if name not in main_services]
 
-    print("Debug - Processing log configuration")
-    print(f"Debug - Found services: {all_service_names}")
+    logger.debug("Processing log configuration", extra={"fields": {"services": all_service_names}})
 
     for service_name in all_service_names:
         # Get settings from both configs
         main_service_settings = main_services.get(service_name, {})
         override_service_settings = override_services.get(service_name, {})
 
-        print(f"\nDebug - Processing service: {service_name}")
-        print(f"Debug - Main settings: {main_service_settings}")
-        print(f"Debug - Override settings: {override_service_settings}")
+        logger.debug("Processing log service %s", service_name,
+                     extra={"fields": {"base": main_service_settings, "overrides": override_service_settings}})
 
         # Merge custom_log_lines from both configs
         main_log_lines = main_service_settings.get('custom_log_lines', [])
         override_log_lines = override_service_settings.get('custom_log_lines', [])
         
         # Combine and deduplicate log lines while preserving order
-        combined_log_lines = []
-        seen = set()
-        for line in override_log_lines + main_log_lines:
-            if line not in seen:
-                combined_log_lines.append(line)
-                seen.add(line)
-
-        print(f"Debug - Combined log lines: {combined_log_lines}")
-
-        # Process thresholds with override priority
-        main_thresholds = main_service_settings.get('thresholds', {})
-        override_thresholds = override_service_settings.get('thresholds', {})
-        
-        final_thresholds = {
-            "critical": override_thresholds.get("critical",
-                main_thresholds.get("critical", global_error_rate_threshold)),
-            "critical_recovery": override_thresholds.get("critical_recovery",
-                main_thresholds.get("critical_recovery", global_error_rate_threshold - 10)),
-            "warning": override_thresholds.get("warning",
-                main_thresholds.get("warning", global_error_rate_threshold - 5)),
-            "warning_recovery": override_thresholds.get("warning_recovery",
-                main_thresholds.get("warning_recovery", global_error_rate_threshold - 15))
-        }
+        combined_log_lines = list(dict.fromkeys(override_log_lines + main_log_lines))
+
+        resolved = LOG_PLAN.resolve({'override': override_service_settings, 'base': main_service_settings}, context)
+        final_thresholds = resolved['thresholds']
 
-        print(f"Debug - Final thresholds: {final_thresholds}")
+        logger.debug("Final log thresholds for %s", service_name,
+                     extra={"fields": {"log_lines": combined_log_lines, "thresholds": final_thresholds}})
+
+        # One alert settings object per monitor kind, shared by every monitor of the service
+        error_rate_alert_settings = {"priority": resolved['error_rate_priority'], "include_tags": resolved['include_tags']}
+        log_line_alert_settings = {"priority": resolved['log_line_priority'], "include_tags": resolved['include_tags']}
 
         # Create error rate monitor
         logs_config[f"{service_name}-error-rate"] = {
             "name": f"Error Rate Monitor for {service_name}",
             "cluster": new_cluster_name,
             "query": f'logs("service:{service_name} env:{environment} status:error").index("{index}").rollup("count").by("service").last("5m") > {final_thresholds["critical"]}',
-            "alert_settings": {
-                "priority": override_service_settings.get('alert_settings', {}).get('priority',
-                    main_service_settings.get('alert_settings', {}).get('priority', '2')),
-                "include_tags": main_service_settings.get('alert_settings', {}).get('include_tags', True)
-            },
+            "alert_settings": error_rate_alert_settings,
             "thresholds": final_thresholds,
             "service_name": service_name
         }
 
+        # Quote log lines if they contain spaces
+        log_line_queries = [f'"{log_line}"' if " " in log_line else log_line for log_line in combined_log_lines]
+
+        if resolved['combine_log_lines']:
+            # One monitor per chunk of log lines, counting the lines matching any of them
+            chunks = [log_line_queries[start:start + LOG_LINES_PER_MONITOR]
+                      for start in range(0, len(log_line_queries), LOG_LINES_PER_MONITOR)]
+            for number, chunk in enumerate(chunks, 1):
+                suffix = f" ({number}/{len(chunks)})" if len(chunks) > 1 else ""
+                monitor_id = f"{service_name}-log-lines" + (f"-{number}" if number > 1 else "")
+                logs_config[monitor_id] = {
+                    "name": f"Custom Log Monitor for {len(chunk)} log lines of {service_name}{suffix}",
+                    "cluster": new_cluster_name,
+                    "query": f'logs("service:{service_name} env:{environment} ({" OR ".join(chunk)})").index("{index}").rollup("count").by("service").last("5m") > {final_thresholds["critical"]}',
+                    "alert_settings": log_line_alert_settings,
+                    "thresholds": final_thresholds,
+                    "service_name": service_name
+                }
+            continue
+
         # Process combined custom log lines
-        for log_line in combined_log_lines:
-            # Quote log line if it contains spaces
-            log_line_query = f'"{log_line}"' if " " in log_line else log_line
-            
+        for log_line, log_line_query in zip(combined_log_lines, log_line_queries):
             monitor_id = f"{service_name}-{log_line}"
             logs_config[monitor_id] = {
                 "name": f"Custom Log Monitor for '{log_line}'",
                 "cluster": new_cluster_name,
                 "query": f'logs("service:{service_name} env:{environment} {log_line_query}").index("{index}").rollup("count").by("service").last("5m") > {final_thresholds["critical"]}',
-                "alert_settings": {
-                    "priority": override_service_settings.get('alert_settings', {}).get('priority',
-                        main_service_settings.get('alert_settings', {}).get('priority', '3')),
-                    "include_tags": main_service_settings.get('alert_settings', {}).get('include_tags', True)
-                },
+                "alert_settings": log_line_alert_settings,
                 "thresholds": final_thresholds,
                 "service_name": service_name
             }
@@ -562,8 +539,8 @@ def process_log_config(app_config, env_config, new_cluster_name):
     return logs_config
 
 
-def process_app_config(app_config, env_config):
-    """Process application configuration with environment overrides."""
+def process_app_config(app_config, env_config, computed=None):
+    """Process application configuration with environment overrides and computed ALB thresholds."""
 
     ecs_config = app_config['monitor_sets']['infrastructure'].get('ecs', {})
     alb_config = app_config['monitor_sets']['infrastructure'].get('alb', {})
@@ -576,7 +553,7 @@ def process_app_config(app_config, env_config):
     services_config = process_ecs_services(ecs_config, env_config, new_cluster_name, app_name) if ecs_config.get('enabled', False) else {}
     databases_config = process_db_config(db_config, env_config, app_name, new_cluster_name)
     queues_config, topics_config = process_messaging(messaging_config, env_config, app_name, new_cluster_name)
-    alb_services_config = process_alb_config(alb_config, env_config, app_name, new_cluster_name)
+    alb_services_config = process_alb_config(alb_config, env_config, app_name, new_cluster_name, computed)
     applications_config = process_application_config(app_config, env_config, new_cluster_name)
     apm_config = process_apm_config(app_config, env_config, new_cluster_name)
     logs_config= process_log_config(app_config, env_config, new_cluster_name)
@@ -584,35 +561,27 @@ def process_app_config(app_config, env_config):
     return services_config, databases_config, queues_config, topics_config, alb_services_config, applications_config, apm_config, logs_config
 
 
-def main():
-    parser = argparse.ArgumentParser(description='Generate Terraform variables from YAML configs')
-    parser.add_argument('--env', required=True, help='Environment name')
-    parser.add_argument('--app-name', required=True, help='Name of the application')
-    parser.add_argument('--apps-dir', required=True, help='Applications config directory')
-    parser.add_argument('--env-dir', required=True, help='Environments config directory')
-    parser.add_argument('--output', required=True, help='Output file path')
-
-    args = parser.parse_args()
-
-    # Update path resolution for environment-specific overrides
-    env_config_path = os.path.join(args.env_dir, args.app_name, f"{args.env}.yaml")
+def find_env_config(env_dir, app_name, env):
+    """Return the path of the environment layer of an application; see config_layers for the others."""
+    env_config_path = os.path.join(env_dir, app_name, f"{env}.yaml")
     if not os.path.exists(env_config_path):
-        raise FileNotFoundError(f"Environment config for {args.app_name} in {args.env} not found: {env_config_path}")
-        
-    env_config = load_yaml_file(env_config_path)
+        raise FileNotFoundError(f"Environment config for {app_name} in {env} not found: {env_config_path}")
+    return env_config_path
 
-    # Process application configs
-    app_files = list(Path(args.apps_dir).glob(f"{args.app_name}.yaml"))
+def find_app_config(apps_dir, app_name):
+    """Return the path of the application config for an application."""
+    app_files = list(Path(apps_dir).glob(f"{app_name}.yaml"))
     if len(app_files) != 1:
-        raise ValueError(f"Expected exactly one application config for {args.app_name}, found {len(app_files)}")
-    
-    app_config = load_yaml_file(app_files[0])
-    services_config, databases_config, queues_config, topics_config, alb_services_config, applications_config, apm_config, logs_config = process_app_config(app_config, env_config)
+        raise ValueError(f"Expected exactly one application config for {app_name}, found {len(app_files)}")
+    return app_files[0]
 
-    
-    tf_vars = {
+def build_tf_vars(app_config, env_config, env, computed=None):
+    """Render the Terraform variables for one application in one environment."""
+    services_config, databases_config, queues_config, topics_config, alb_services_config, applications_config, apm_config, logs_config = process_app_config(app_config, env_config, computed)
+
+    return {
         "project_name": app_config['name'].lower(),
-        "environment": args.env,
+        "environment": env,
         "services": services_config,
         "alb": alb_services_config,
         "databases": databases_config,
@@ -641,20 +610,425 @@ def main():
             "default": "dd-ecs-alerts-p2"
         }),
         "tags": {
-            "environment": args.env,
+            "environment": env,
             "managed_by": "terraform",
             "project": app_config['name'].lower()
         }
     }
 
-    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+def serialize_tf_vars(tf_vars):
+    """Serialize rendered Terraform variables in their canonical on-disk form.
+
+    Keys are sorted so the bytes, and therefore the content hash, only depend
+    on the rendered values and not on config or code ordering.
+    """
+    return json.dumps(tf_vars, indent=2, sort_keys=True).encode('utf-8')
+
+def write_output(content, output):
+    """Write serialized output to a file, leaving it untouched if the content is the same.
+
+    Returns whether the file changed.
+    """
+    try:
+        with open(output, 'rb') as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+
+    output_dir = os.path.dirname(output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    with open(output, 'wb') as f:
+        f.write(content)
+    return True
+
+def shard_tf_vars(tf_vars):
+    """Split rendered variables into {shard: variables}."""
+    shards = {COMMON_SHARD: {}}
+    for name, value in tf_vars.items():
+        family = name[:-len(DEFAULTS_SUFFIX)] if name.endswith(DEFAULTS_SUFFIX) else name
+        family = GROUPED_FAMILIES[family][0] if family in GROUPED_FAMILIES else family
+        shards.setdefault(family if family in SHARD_MODULES else COMMON_SHARD, {})[name] = value
+    return shards
+
+def shard_targets(shard):
+    """Return the tofu -target addresses a change to a shard needs planned."""
+    modules = SHARD_MODULES.values() if shard == COMMON_SHARD else [SHARD_MODULES[shard]]
+    return [f"module.{module}" for module in modules]
+
+def changed_targets(shards):
+    return sorted({target for shard in shards for target in shard_targets(shard)})
+
+def write_shards(tf_vars, directory):
+    """Write every shard of the rendered variables to directory, plus an index of their content hashes.
+
+    Only shards whose content differs are rewritten, so their files keep
+    their mtime. Returns the serialized index and the shards that changed.
+    """
+    index = {"format": SHARD_FORMAT, "shards": {}}
+    changed = []
+    for shard, variables in sorted(shard_tf_vars(tf_vars).items()):
+        content = serialize_tf_vars(variables)
+        file_name = f"{shard}.auto.tfvars.json"
+        if write_output(content, os.path.join(directory, file_name)):
+            changed.append(shard)
+        index["shards"][shard] = {
+            "file": file_name,
+            "sha256": content_hash(content),
+            "variables": sorted(variables),
+            "targets": shard_targets(shard),
+        }
 
-    print(f"\nWriting configuration to: {args.output}")
-    with open(args.output, 'w') as f:
-        json.dump(tf_vars, f, indent=2)
-        
-    print("\nGenerated configuration:")
-    print(json.dumps(tf_vars, indent=2))
+    content = serialize_tf_vars(index)
+    write_output(content, os.path.join(directory, SHARD_INDEX))
+    return content, changed
+
+@lru_cache(maxsize=None)
+def generator_version():
+    """Return a hash of the generator source, so a code change invalidates every manifest entry."""
+    digest = hashlib.sha256()
+    for module_path in GENERATOR_SOURCES:
+        with open(module_path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def generate_pair(app_name, env, apps_dir, env_dir, output, manifest=None, app_configs=None, shard=False, compact=False,
+                  group=False, computed_dir=None):
+    """Render one (app, env) pair unless the manifest shows its output is already current.
+
+    With shard, output is a directory that receives one tfvars file per
+    shard and the shard index, which the manifest tracks as the output.
+    With compact, monitor families are written as per-family defaults plus
+    per-entry deltas. With group, services sharing thresholds and alert
+    settings are also consolidated into multi-alert monitor groups.
+    computed_dir holds the computed threshold indexes, None to ignore them.
+
+    Returns the pair status ("changed" or "unchanged"), the serialized output
+    (the shard index when sharding), which is None when rendering was
+    skipped, and the shards that changed, None when not sharding.
+    """
+    app_path = find_app_config(apps_dir, app_name)
+    find_env_config(env_dir, app_name, env)
+    output_file = os.path.join(output, SHARD_INDEX) if shard else output
+    computed = computed_thresholds(computed_dir, env)
+
+    if manifest is not None:
+        inputs = input_hashes([app_path, *input_paths(env_dir, app_name, env)])
+        # Output options change the rendered files as much as the code does
+        version = generator_version() + ''.join(f"+{name}" for name, enabled in
+                                                (("shard", shard), ("compact", compact), ("group", group)) if enabled)
+        if computed:
+            # Recomputed and expired thresholds change the output without touching any input file
+            version += f"+computed-{thresholds_digest(computed)}"
+        if is_up_to_date(manifest, app_name, env, inputs, output_file, version):
+            return "unchanged", None, ([] if shard else None)
+
+    if app_configs is None:
+        app_configs = {}
+    if app_name not in app_configs:
+        app_configs[app_name] = load_yaml_file(app_path)
+    env_config, _ = resolve_env_config(env_dir, app_name, env)
+
+    tf_vars = build_tf_vars(app_configs[app_name], env_config, env, computed)
+    if group:
+        tf_vars = group_tf_vars(tf_vars)
+    if compact:
+        tf_vars = compact_tf_vars(tf_vars, SHARD_MODULES)
+    if shard:
+        content, changed_shards = write_shards(tf_vars, output)
+        changed = bool(changed_shards)
+    else:
+        content = serialize_tf_vars(tf_vars)
+        changed = write_output(content, output)
+        changed_shards = None
+
+    if manifest is not None:
+        record(manifest, app_name, env, inputs, output_file, content_hash(content), version)
+
+    return ("changed" if changed else "unchanged"), content, changed_shards
+
+def write_changes(results, path):
+    """Write the machine-readable changed/unchanged result of a run.
+
+    For sharded output every changed pair also lists its changed shards and
+    the module addresses to pass to tofu plan as -target.
+    """
+    def shard_fields(shards):
+        return {"shards": shards, "targets": changed_targets(shards)} if shards is not None else {}
+
+    report = {
+        "generator_version": generator_version(),
+        "results": [
+            {"app": app_name, "env": env, "output": output, "status": status, **shard_fields(shards),
+             **({"error": error} if error else {})}
+            for app_name, env, output, status, error, shards in results
+        ],
+        "changed": [
+            {"app": app_name, "env": env, **shard_fields(shards)}
+            for app_name, env, _, status, _, shards in results if status == "changed"
+        ],
+    }
+
+    output_dir = os.path.dirname(path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+
+def split_names(value):
+    """Split a comma separated CLI value into a list of names."""
+    return [name.strip() for name in value.split(',') if name.strip()] if value else []
+
+def discover_pairs(apps_dir, env_dir, apps=None, envs=None):
+    """Find every (app, env) pair that has both an application and an environment config."""
+    available_apps = sorted(p.stem for p in Path(apps_dir).glob('*.yaml'))
+    selected_apps = apps or available_apps
+
+    missing_apps = [app for app in selected_apps if app not in available_apps]
+    if missing_apps:
+        raise ValueError(f"No application config found for: {', '.join(missing_apps)}")
+
+    pairs = []
+    for app_name in selected_apps:
+        available_envs = sorted(p.stem for p in Path(env_dir, app_name).glob('*.yaml') if not p.name.startswith(LAYER_PREFIX))
+        for env in (envs or available_envs):
+            if env in available_envs:
+                pairs.append((app_name, env))
+            else:
+                logger.info("Skipping %s/%s: no environment config in %s", app_name, env, os.path.join(env_dir, app_name))
+    return pairs
+
+def render_app(app_name, envs, apps_dir, env_dir, output_pattern, manifest_entries=None, options=None):
+    """Render one application in each of its environments.
+
+    Runs in a worker process in parallel mode, so it only takes and returns
+    picklable values: the manifest entries it may update travel in and out
+    explicitly, as do the profile phases recorded when --profile is on.
+    options are the output options passed on to generate_pair(). A
+    failing environment is reported, not raised.
+    """
+    manifest = {"entries": dict(manifest_entries)} if manifest_entries is not None else None
+    app_configs = {}
+    results = []
+
+    for env in envs:
+        pair_start = time.perf_counter()
+        output = output_pattern.format(app=app_name, env=env)
+        try:
+            status, _, shards = generate_pair(app_name, env, apps_dir, env_dir, output, manifest, app_configs, **(options or {}))
+            error = None
+        except Exception as e:
+            status, error, shards = "error", f"{type(e).__name__}: {e}", None
+        results.append((env, output, status, error, shards, time.perf_counter() - pair_start))
+
+    entries = None
+    if manifest is not None:
+        entries = {key: manifest['entries'][key] for key in (pair_key(app_name, env) for env in envs) if key in manifest['entries']}
+    return results, entries, render_profile.take()
+
+def _count_one(_):
+    return 1
+
+# Functions timed by --profile: phase, unit of the objects a call produces and how to count them
+PROFILE_HOOKS = {
+    'load_yaml_file':             ('load',               'documents', _count_one),
+    'resolve_env_config':         ('load',               'documents', lambda result: len(result[1])),
+    'input_hashes':               ('manifest',           'inputs',    len),
+    'build_tf_vars':              ('build',              'pairs',     _count_one),
+    'process_ecs_services':       ('family.ecs',         'monitors',  len),
+    'process_alb_config':         ('family.alb',         'monitors',  len),
+    'process_db_config':          ('family.db',          'monitors',  len),
+    'process_messaging':          ('family.messaging',   'monitors',  lambda result: sum(map(len, result))),
+    'process_application_config': ('family.application', 'monitors',  len),
+    'process_apm_config':         ('family.apm',         'monitors',  len),
+    'process_log_config':         ('family.logs',        'monitors',  len),
+    'serialize_tf_vars':          ('serialize',          'bytes',     len),
+    'write_output':               ('write',              'files',     int),
+}
+
+def init_worker(log_config=None, profile=False):
+    """Prepare a render worker process: logging and, with --profile, the timed hooks."""
+    if log_config:
+        configure_logging(*log_config)
+    if profile:
+        render_profile.enable(sys.modules[__name__], PROFILE_HOOKS)
+
+def generate_batch(pairs, apps_dir, env_dir, output_pattern, manifest=None, jobs=1, log_config=None, profile=False,
+                   options=None):
+    """Render every (app, env) pair, loading each application config only once.
+
+    With jobs > 1 applications are rendered in a process pool. Results are
+    merged in the order of the pairs regardless of completion order, and an
+    application that fails does not stop the others. log_config is the
+    (level, debug_log) pair the workers configure logging with, profile
+    whether they record profile phases. options are the output options
+    (shard, compact, group, computed_dir) of generate_pair().
+    """
+    outputs = {}
+    for app_name, env in pairs:
+        output = output_pattern.format(app=app_name, env=env)
+        if output in outputs:
+            raise ValueError(f"Output pattern '{output_pattern}' maps {outputs[output]} and {app_name}/{env} to the same file: {output}")
+        outputs[output] = f"{app_name}/{env}"
+
+    app_envs = {}
+    for app_name, env in pairs:
+        app_envs.setdefault(app_name, []).append(env)
+
+    def app_manifest_entries(app_name):
+        if manifest is None:
+            return None
+        keys = (pair_key(app_name, env) for env in app_envs[app_name])
+        return {key: manifest['entries'][key] for key in keys if key in manifest['entries']}
+
+    results = []
+    batch_start = time.perf_counter()
+
+    def merge(app_name, app_results, entries, phases=None):
+        for env, output, status, error, shards, elapsed in app_results:
+            results.append((app_name, env, output, status, error, shards))
+            if error:
+                logger.error("Failed %s/%s: %s", app_name, env, error)
+            else:
+                logger.info("Generated %s/%s -> %s (%s) in %.1f ms", app_name, env, output, status, elapsed * 1000,
+                            extra={"fields": {"app": app_name, "env": env, "output": output, "status": status, "elapsed_ms": round(elapsed * 1000, 3)}})
+        if entries:
+            manifest['entries'].update(entries)
+        if phases:
+            render_profile.merge(phases)
+
+    workers = min(jobs, len(app_envs))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(log_config, profile)) as pool:
+            futures = {
+                app_name: pool.submit(render_app, app_name, envs, apps_dir, env_dir, output_pattern,
+                                      app_manifest_entries(app_name), options)
+                for app_name, envs in app_envs.items()
+            }
+            for app_name, future in futures.items():
+                try:
+                    app_results, entries, phases = future.result()
+                except Exception as e:
+                    # The worker itself died, e.g. killed or out of memory
+                    error = f"{type(e).__name__}: {e}"
+                    app_results = [(env, output_pattern.format(app=app_name, env=env), "error", error, None, 0.0)
+                                   for env in app_envs[app_name]]
+                    entries = phases = None
+                merge(app_name, app_results, entries, phases)
+    else:
+        for app_name, envs in app_envs.items():
+            merge(app_name, *render_app(app_name, envs, apps_dir, env_dir, output_pattern, app_manifest_entries(app_name),
+                                        options))
+
+    total = time.perf_counter() - batch_start
+    changed = sum(1 for *_, status, _, _ in results if status == "changed")
+    failed = sum(1 for *_, status, _, _ in results if status == "error")
+    logger.info("Generated %d configuration(s) for %d application(s) in %.1f ms using %d process(es), %d changed, %d failed",
+                len(results) - failed, len(app_envs), total * 1000, max(workers, 1), changed, failed)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate Terraform variables from YAML configs')
+    parser.add_argument('--env', help='Environment name')
+    parser.add_argument('--app-name', help='Name of the application')
+    parser.add_argument('--apps-dir', required=True, help='Applications config directory')
+    parser.add_argument('--env-dir', required=True, help='Environments config directory')
+    parser.add_argument('--output', help='Output file path (a directory with --shard)')
+    parser.add_argument('--all', action='store_true', help='Render every application in every environment it has a config for')
+    parser.add_argument('--apps', help='Comma separated applications to render in batch mode')
+    parser.add_argument('--envs', help='Comma separated environments to render in batch mode')
+    parser.add_argument('--output-pattern',
+                        help='Batch mode output path, formatted with {app} and {env} (a directory with --shard); required '
+                             'with --all/--apps/--envs. Each pair is planned as its own root module with its own state, '
+                             'so give it its own file, e.g. build/{env}/{app}/terraform.tfvars.json')
+    parser.add_argument('--manifest', help='Manifest of input/output hashes; pairs whose inputs are unchanged are not rendered again')
+    parser.add_argument('--changes-output', help='Write a JSON report of changed/unchanged pairs to this file')
+    parser.add_argument('--shard', action='store_true',
+                        help='Write one <family>.auto.tfvars.json per monitor family and a shard index into the output directory')
+    parser.add_argument('--compact', action='store_true',
+                        help='Write each monitor family as shared <family>_defaults plus per-entry deltas')
+    parser.add_argument('--group-monitors', action='store_true',
+                        help='Consolidate ECS and APM services with identical thresholds and alert settings into multi-alert monitors')
+    parser.add_argument('--computed-dir',
+                        help='Directory of the per-environment computed ALB threshold indexes, e.g. monitor_configs/computed '
+                             '(default: computed thresholds are not used)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Batch mode worker processes used to render applications in parallel (0 = one per CPU)')
+    parser.add_argument('--profile', help='Write a JSON report of wall/CPU time and object counts per phase and monitor family to this file')
+    parser.add_argument('--profile-dump', help='Write cProfile stats of the main process to this file (use --jobs 1 to include rendering)')
+    add_logging_arguments(parser)
+
+    args = parser.parse_args()
+    configure_logging(args.log_level, args.debug_log)
+
+    if args.profile:
+        render_profile.enable(sys.modules[__name__], PROFILE_HOOKS)
+    if args.profile_dump:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    run_wall, run_cpu = time.perf_counter(), render_profile.cpu_times()
+
+    manifest = load_manifest(args.manifest) if args.manifest else None
+    options = {"shard": args.shard, "compact": args.compact, "group": args.group_monitors,
+               "computed_dir": args.computed_dir or None}
+    jobs = 1
+
+    if args.all or args.apps or args.envs:
+        if args.app_name or args.env or args.output:
+            parser.error('--app-name/--env/--output cannot be combined with --all/--apps/--envs')
+        if not args.output_pattern:
+            parser.error('--output-pattern is required with --all, --apps or --envs')
+        pairs = discover_pairs(args.apps_dir, args.env_dir, split_names(args.apps), split_names(args.envs))
+        if not pairs:
+            parser.error('No application/environment pairs matched')
+        jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+        results = generate_batch(pairs, args.apps_dir, args.env_dir, args.output_pattern, manifest, jobs,
+                                 log_config=(args.log_level, args.debug_log), profile=bool(args.profile), options=options)
+    else:
+        if not (args.app_name and args.env and args.output):
+            parser.error('--app-name, --env and --output are required unless --all, --apps or --envs is given')
+
+        status, content, shards = generate_pair(args.app_name, args.env, args.apps_dir, args.env_dir, args.output, manifest,
+                                                **options)
+        results = [(args.app_name, args.env, args.output, status, None, shards)]
+
+        if content is None:
+            logger.info("Inputs and generator unchanged since the last render, kept %s", args.output)
+        else:
+            logger.info("Wrote configuration to %s (%s)", args.output, status)
+            if shards is not None:
+                logger.info("Changed shards: %s", ", ".join(shards) or "none")
+            logger.debug("Generated configuration:\n%s", content.decode('utf-8'))
+
+    if manifest is not None:
+        save_manifest(manifest, args.manifest)
+    if args.changes_output:
+        write_changes(results, args.changes_output)
+
+    if args.profile_dump:
+        profiler.disable()
+        profiler.dump_stats(args.profile_dump)
+        logger.info("Wrote cProfile stats to %s", args.profile_dump)
+    if args.profile:
+        report = render_profile.write_report(args.profile, time.perf_counter() - run_wall, render_profile.cpu_times() - run_cpu,
+                                             generator_version=generator_version(), pairs=len(results),
+                                             jobs=jobs)
+        for phase, entry in report["phases"].items():
+            logger.info("Profile %-18s %6d call(s) %9.1f ms wall %9.1f ms CPU %9d %s", phase, entry["calls"],
+                        entry["wall_s"] * 1000, entry["cpu_s"] * 1000, entry["objects"], entry["unit"],
+                        extra={"fields": {"phase": phase, **entry}})
+        logger.info("Wrote profile report to %s", args.profile)
+
+    failures = [(app_name, env, error) for app_name, env, _, status, error, _ in results if status == "error"]
+    if failures:
+        logger.error("%d configuration(s) failed to render:\n%s", len(failures),
+                     "\n".join(f"  {app_name}/{env}: {error}" for app_name, env, error in failures))
+        sys.exit(1)
 
 
 if __name__ == "__main__":
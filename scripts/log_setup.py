@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# scripts/log_setup.py
+"""Logging configuration shared by the monitoring scripts.
+
+Console output is plain text and quiet by default (INFO). Structured
+details are attached to records as ``extra={"fields": {...}}``; they are
+shown on the console only at DEBUG and are always written to the optional
+JSON-lines debug stream, one object per record.
+"""
+
+import json
+import logging
+import sys
+
+LOG_LEVELS = ['DEBUG', 'INFO', 'WARNING', 'ERROR']
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Format records as their message, followed by their fields at DEBUG."""
+
+    def format(self, record):
+        message = record.getMessage()
+        fields = getattr(record, 'fields', None)
+        if fields and record.levelno <= logging.DEBUG:
+            message = f"{message} {json.dumps(fields, default=str, sort_keys=True)}"
+        if record.levelno >= logging.WARNING:
+            message = f"{record.levelname.capitalize()}: {message}"
+        if record.exc_info:
+            message = f"{message}\n{self.formatException(record.exc_info)}"
+        return message
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format records as single-line JSON objects with stable key order."""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry["fields"] = fields
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, sort_keys=True, separators=(',', ':'))
+
+
+def configure_logging(level='INFO', debug_log=None):
+    """Configure the root logger for a script run.
+
+    level sets the console verbosity. debug_log, when given, is a file that
+    receives every record at DEBUG as JSON lines; it is opened in append mode
+    so worker processes can share it.
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(getattr(logging, level))
+    console.setFormatter(ConsoleFormatter())
+    root.addHandler(console)
+
+    root_level = getattr(logging, level)
+    if debug_log:
+        stream = logging.FileHandler(debug_log, mode='a', encoding='utf-8')
+        stream.setLevel(logging.DEBUG)
+        stream.setFormatter(JsonLinesFormatter())
+        root.addHandler(stream)
+        root_level = logging.DEBUG
+
+    root.setLevel(root_level)
+
+
+def add_logging_arguments(parser):
+    """Add the standard --log-level/--debug-log options to an argument parser."""
+    parser.add_argument('--log-level', default='INFO', choices=LOG_LEVELS, type=str.upper,
+                        help='Console log level (default: INFO)')
+    parser.add_argument('--debug-log', help='Append a JSON-lines stream of all DEBUG records to this file')
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# scripts/merge_engine.py
+"""Table-driven resolution of monitor settings.
+
+Every monitor family resolves its output fields through the same chain:
+the first source (usually the environment override, then the application
+config) that contains the field wins, otherwise a default is used. Instead
+of repeating that chain with nested ``.get()`` calls, a family declares its
+fields once:
+
+    ECS_PLAN = MergePlan([
+        Field('thresholds.cpu_percent', 85, 'override.cpu_percent', 'base.thresholds.cpu_percent'),
+        ...
+    ])
+
+and resolves a service in a single pass with
+``ECS_PLAN.resolve({'override': overrides, 'base': settings})``.
+
+Lookups are presence based, matching ``dict.get(key, fallback)``: a key
+that exists with a null value still wins over the next source.
+"""
+
+_MISSING = object()
+
+
+def _split(path):
+    """Split a dotted path into a tuple of keys."""
+    return tuple(path.split('.'))
+
+
+class Field:
+    """Declaration of one output field.
+
+    out_path is the dotted location in the resolved dict. Each lookup is a
+    dotted path whose first element names a source, tried in order. default
+    is used when no source has the field; a callable default is called with
+    the context passed to MergePlan.resolve(). A required field without a
+    value raises KeyError instead.
+    """
+
+    __slots__ = ('out_path', 'default', 'lookups', 'required')
+
+    def __init__(self, out_path, default, *lookups, required=False):
+        self.out_path = out_path
+        self.default = default
+        self.lookups = lookups
+        self.required = required
+
+
+class MergePlan:
+    """A compiled list of fields resolved together in one pass."""
+
+    def __init__(self, fields):
+        steps = []
+        seen = set()
+        for field in fields:
+            if field.out_path in seen:
+                raise ValueError(f"Field '{field.out_path}' is declared twice")
+            seen.add(field.out_path)
+
+            out_path = _split(field.out_path)
+            lookups = []
+            for lookup in field.lookups:
+                source, *path = _split(lookup)
+                if not path:
+                    raise ValueError(f"Lookup '{lookup}' for '{field.out_path}' needs a key after the source name")
+                lookups.append((source, tuple(path)))
+
+            steps.append((out_path[:-1], out_path[-1], tuple(lookups), field.default,
+                          callable(field.default), field.required, field.out_path))
+
+        self._steps = tuple(steps)
+
+    def resolve(self, sources, context=None):
+        """Resolve every field against the named sources and return the nested result."""
+        result = {}
+        for parents, key, lookups, default, dynamic, required, name in self._steps:
+            value = _MISSING
+            for source, path in lookups:
+                node = sources.get(source)
+                for part in path:
+                    if isinstance(node, dict) and part in node:
+                        node = node[part]
+                    else:
+                        node = _MISSING
+                        break
+                if node is not _MISSING:
+                    value = node
+                    break
+
+            if value is _MISSING:
+                if required:
+                    raise KeyError(f"'{name}' is required but missing from {', '.join(source for source, _ in lookups)}")
+                value = default(context) if dynamic else default
+
+            target = result
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[key] = value
+
+        return result
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# scripts/monitor_groups.py
+"""Consolidation of per-service monitors into multi-alert groups.
+
+Services of a family whose thresholds and alert settings are identical
+can share one multi-alert monitor grouped by service instead of one
+monitor each. A group is keyed by a hash of the values its members share,
+not by its members, so adding or removing a service only changes the
+group's service list and the monitor is updated in place rather than
+recreated.
+"""
+
+import json
+
+from config_loader import content_hash
+
+# Grouped variable: (family it consolidates, key prefix, fields members must share)
+GROUPED_FAMILIES = {
+    "service_groups": ("services", "ecs", ("cluster", "thresholds", "alert_settings")),
+    "apm_service_groups": ("apm_services", "apm", ("cluster", "service_type", "alert_settings")),
+}
+
+
+def group_key(prefix, signature):
+    """Return the stable key of the group sharing signature."""
+    return f"{prefix}-{content_hash(json.dumps(signature, sort_keys=True).encode('utf-8'))[:12]}"
+
+
+def group_entries(entries, fields, prefix):
+    """Group entries by their values of fields.
+
+    Every group lists the keys of its member entries, the service names
+    its monitors filter on, and the tags all members have in common.
+    """
+    groups = {}
+    for key, entry in entries.items():
+        signature = {field: entry.get(field) for field in fields}
+        group = groups.setdefault(group_key(prefix, signature), {**signature, "services": [], "service_names": [],
+                                                                  "tags": dict(entry.get('tags', {}))})
+        group["services"].append(key)
+        group["service_names"].append(entry.get('service_name') or entry['name'])
+        group["tags"] = {tag: value for tag, value in group["tags"].items() if entry.get('tags', {}).get(tag) == value}
+
+    for group in groups.values():
+        group["services"].sort()
+        group["service_names"] = sorted(set(group["service_names"]))
+    return groups
+
+
+def group_tf_vars(tf_vars):
+    """Return the variables with a <group variable> for every family that can be consolidated.
+
+    Only groups of two or more services are kept; a lone service keeps
+    its own monitors. The per-service entries are kept too: the modules
+    use them for the monitors that stay per service and skip grouped
+    members elsewhere.
+    """
+    grouped = dict(tf_vars)
+    for name, (family, kind, fields) in GROUPED_FAMILIES.items():
+        groups = group_entries(tf_vars[family], fields, f"{tf_vars['project_name']}-{kind}")
+        grouped[name] = {key: group for key, group in groups.items() if len(group["services"]) > 1}
+    return grouped
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# scripts/monitoring.py
+"""Single entry point for the monitoring scripts.
+
+    python scripts/monitoring.py <command> [options]
+
+Each command runs the script it names with the remaining arguments, so
+`monitoring.py generate --all` is `generate_tf_vars.py --all`. A script is
+only imported when its command runs: checking configs never loads the
+Datadog client or requests, and `--help` imports none of them.
+
+`pipeline` validates the configs, selects the pairs a change affects and
+renders them in one interpreter. Its stages share the parsed documents
+(config_loader) and merged environment layers (config_layers) of the
+process, so every config file is parsed once, and the pairs discovered for
+change detection are the ones rendered.
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+
+# Command -> (script module run with the remaining arguments, help)
+COMMANDS = {
+    "validate": ("validate_configs", "Validate monitor configurations against their schemas"),
+    "detect": ("detect_changes", "Select the application/environment pairs a change affects"),
+    "generate": ("generate_tf_vars", "Render the Terraform variables of application/environment pairs"),
+    "diff": ("diff_tfvars", "Diff two rendered tfvars documents and map changes to resource addresses"),
+    "alb-thresholds": ("generate_alb_thresholds", "Compute ALB thresholds from Datadog history"),
+    "check-credentials": ("validate_datadog_creds", "Check the Datadog API and application keys"),
+}
+
+logger = logging.getLogger('monitoring')
+
+
+def run_script(prog, module_name, argv):
+    """Run a script's main() as if it had been started with argv."""
+    sys.argv = [prog, *argv]
+    importlib.import_module(module_name).main()
+
+
+def run_pipeline(prog, argv):
+    """Validate, detect and generate in this process; exits non-zero when a stage fails."""
+    import detect_changes
+    import validate_configs
+    from generate_tf_vars import generate_batch, split_names, write_changes
+    from log_setup import add_logging_arguments, configure_logging
+    from render_manifest import load_manifest, save_manifest
+
+    parser = argparse.ArgumentParser(prog=prog, description='Validate the configs, select the pairs a change affects '
+                                                            'and render them, in one process')
+    parser.add_argument('--apps-dir', default=detect_changes.APPS_DIR, help='Applications config directory')
+    parser.add_argument('--env-dir', default=detect_changes.ENVS_DIR, help='Environments config directory')
+    parser.add_argument('--base', help='Git ref to diff HEAD against (default: PR base branch or HEAD^)')
+    parser.add_argument('--all', action='store_true', help='Render every pair on disk instead of diffing')
+    parser.add_argument('--apps', help='Comma separated applications to restrict the selection to')
+    parser.add_argument('--envs', help='Comma separated environments to restrict the selection to')
+    parser.add_argument('--semantic', action='store_true',
+                        help='Only select config-affected pairs whose rendered tfvars differ between the base ref and HEAD')
+    parser.add_argument('--matrix-output', help='Append the GitHub Actions matrix and has_changes outputs to this file')
+    parser.add_argument('--output-pattern', required=True,
+                        help='Output path, formatted with {app} and {env} (see generate --help)')
+    parser.add_argument('--manifest', help='Manifest of input/output hashes; pairs whose inputs are unchanged are not rendered again')
+    parser.add_argument('--changes-output', help='Write a JSON report of changed/unchanged pairs to this file')
+    parser.add_argument('--shard', action='store_true', help='Write sharded per-family tfvars (see generate --help)')
+    parser.add_argument('--compact', action='store_true', help='Write the compact tfvars form (see generate --help)')
+    parser.add_argument('--group-monitors', action='store_true', help='Consolidate services into grouped monitors')
+    parser.add_argument('--computed-dir', help='Directory of the computed ALB threshold indexes to render with '
+                                               '(default: computed thresholds are not used)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Worker processes used to render applications in parallel (0 = one per CPU)')
+    parser.add_argument('files', nargs='*', help='Changed files to use instead of running git diff')
+    add_logging_arguments(parser)
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level, args.debug_log)
+
+    # Validation runs in this process so the documents it parses are reused by the other stages
+    files = validate_configs.find_config_files(Path(args.apps_dir), Path(args.env_dir))
+    errors = [error for path, kind in files for error in validate_configs.validate_file(path, kind, args.env_dir)]
+    for error in errors:
+        logger.error("%s", error)
+    if errors:
+        logger.error("Found %d error(s) in %d configuration file(s)", len(errors), len(files))
+        sys.exit(1)
+    logger.info("Validated %d configuration file(s)", len(files))
+
+    pairs, index = detect_changes.build_dependency_index(args.apps_dir, args.env_dir, split_names(args.apps),
+                                                         split_names(args.envs), args.computed_dir or None)
+    if args.all:
+        selected, full_plan = pairs, set(pairs)
+    else:
+        selected, full_plan = detect_changes.select_pairs(pairs, index,
+                                                          args.files or detect_changes.get_changed_files(args.base),
+                                                          args.base, args.semantic, args.apps_dir, args.env_dir,
+                                                          args.computed_dir or None)
+    logger.info("Selected %d of %d pair(s)", len(selected), len(pairs))
+    if args.matrix_output:
+        with open(args.matrix_output, 'a') as f:
+            f.write(f"matrix={json.dumps(detect_changes.to_matrix(selected, full_plan))}\n")
+            f.write(f"has_changes={'true' if selected else 'false'}\n")
+
+    if not selected:
+        return
+
+    manifest = load_manifest(args.manifest) if args.manifest else None
+    options = {"shard": args.shard, "compact": args.compact, "group": args.group_monitors,
+               "computed_dir": args.computed_dir or None}
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    results = generate_batch(selected, args.apps_dir, args.env_dir, args.output_pattern, manifest, jobs,
+                             log_config=(args.log_level, args.debug_log), options=options)
+    if manifest is not None:
+        save_manifest(manifest, args.manifest)
+    if args.changes_output:
+        write_changes(results, args.changes_output)
+
+    failures = [(app_name, env, error) for app_name, env, _, status, error, _ in results if status == "error"]
+    if failures:
+        logger.error("%d configuration(s) failed to render:\n%s", len(failures),
+                     "\n".join(f"  {app_name}/{env}: {error}" for app_name, env, error in failures))
+        sys.exit(1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Monitoring configuration tools',
+                                     epilog="Run '%(prog)s <command> --help' for the options of a command.")
+    commands = parser.add_subparsers(dest='command', metavar='command', required=True)
+    for name, (_, help) in COMMANDS.items():
+        # Options are left to the command itself, including --help
+        commands.add_parser(name, help=help, add_help=False)
+    commands.add_parser('pipeline', help='Validate, detect changes and generate in one process', add_help=False)
+
+    args, rest = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    prog = f"{parser.prog} {args.command}"
+    if args.command == 'pipeline':
+        run_pipeline(prog, rest)
+    else:
+        run_script(prog, COMMANDS[args.command][0], rest)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# scripts/render_manifest.py
+"""Manifest of rendered tfvars files.
+
+For every (app, env) pair the manifest records the content hashes of the
+YAML inputs, the hash of the rendered output and the generator version
+that produced it. A pair whose inputs, generator and output file all
+still match its entry does not need to be rendered again.
+"""
+
+import json
+import logging
+import os
+import tempfile
+
+from config_loader import content_hash
+
+MANIFEST_FORMAT = 1
+
+logger = logging.getLogger('render_manifest')
+
+
+def file_hash(path):
+    """Return the content hash of a file."""
+    with open(path, 'rb') as f:
+        return content_hash(f.read())
+
+
+def pair_key(app_name, env):
+    """Return the manifest key of an (app, env) pair."""
+    return f"{app_name}/{env}"
+
+
+def load_manifest(path):
+    """Load a manifest, returning an empty one if it is missing or unreadable."""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {"format": MANIFEST_FORMAT, "entries": {}}
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable manifest %s: %s", path, e)
+        return {"format": MANIFEST_FORMAT, "entries": {}}
+
+    if manifest.get('format') != MANIFEST_FORMAT:
+        return {"format": MANIFEST_FORMAT, "entries": {}}
+    return manifest
+
+
+def save_manifest(manifest, path):
+    """Atomically write a manifest with stable key ordering."""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_path, path)
+
+
+def input_hashes(paths):
+    """Return the content hashes of the given input files keyed by path."""
+    return {str(path): file_hash(path) for path in paths}
+
+
+def is_up_to_date(manifest, app_name, env, inputs, output, generator_version):
+    """Check whether a pair's recorded inputs, generator and output still match."""
+    entry = manifest['entries'].get(pair_key(app_name, env))
+    if not entry:
+        return False
+
+    if (entry.get('generator_version') != generator_version
+            or entry.get('inputs') != inputs
+            or entry.get('output') != str(output)):
+        return False
+
+    try:
+        return file_hash(output) == entry.get('output_hash')
+    except OSError:
+        return False
+
+
+def record(manifest, app_name, env, inputs, output, output_hash, generator_version):
+    """Store the state of a freshly rendered pair in the manifest."""
+    manifest['entries'][pair_key(app_name, env)] = {
+        "generator_version": generator_version,
+        "inputs": inputs,
+        "output": str(output),
+        "output_hash": output_hash,
+    }
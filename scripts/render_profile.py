@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# scripts/render_profile.py
+"""Per-phase timing of a render run.
+
+Profiling works by replacing selected module functions with timed
+wrappers, so a run without --profile executes the original functions and
+pays nothing. Every wrapped call adds its wall time, CPU time and the
+number of objects it produced (documents, monitors, bytes...) to its
+phase. Worker processes hand their phases back with take() and the parent
+merges them, so the report covers the whole run.
+"""
+
+import functools
+import json
+import os
+import time
+
+REPORT_FORMAT = 1
+
+# Phase name -> {"calls", "wall_s", "cpu_s", "objects", "unit"}; None while profiling is off
+_phases = None
+
+
+def _entry(phase, unit):
+    entry = _phases.get(phase)
+    if entry is None:
+        entry = _phases[phase] = {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "objects": 0, "unit": unit}
+    return entry
+
+
+def _record(phase, unit, wall, cpu, objects):
+    entry = _entry(phase, unit)
+    entry["calls"] += 1
+    entry["wall_s"] += wall
+    entry["cpu_s"] += cpu
+    entry["objects"] += objects
+
+
+def _timed(function, phase, unit, count):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        wall, cpu = time.perf_counter(), time.process_time()
+        result = function(*args, **kwargs)
+        _record(phase, unit, time.perf_counter() - wall, time.process_time() - cpu, count(result))
+        return result
+
+    wrapper.profiled = True
+    return wrapper
+
+
+def enable(module, hooks):
+    """Start profiling, wrapping module functions in place.
+
+    hooks maps a function name to (phase, unit, count), count taking the
+    function's return value and returning the number of objects produced.
+    Functions that are already wrapped, e.g. inherited by a forked worker,
+    are left alone. Any phases recorded so far are discarded.
+    """
+    global _phases
+    _phases = {}
+    for name, (phase, unit, count) in hooks.items():
+        function = getattr(module, name)
+        if not getattr(function, 'profiled', False):
+            setattr(module, name, _timed(function, phase, unit, count))
+
+
+def take():
+    """Return the phases recorded since the last take() and reset them; None while profiling is off."""
+    global _phases
+    if _phases is None:
+        return None
+    phases, _phases = _phases, {}
+    return phases
+
+
+def merge(phases):
+    """Add phases taken in another process."""
+    for phase, entry in phases.items():
+        own = _entry(phase, entry["unit"])
+        for key in ("calls", "wall_s", "cpu_s", "objects"):
+            own[key] += entry[key]
+
+
+def cpu_times():
+    """Return the CPU time used by this process and its reaped children."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def write_report(path, wall, cpu, **details):
+    """Write the phases and the run totals as a JSON report; returns the report.
+
+    Phase times are summed over every call in every process, so with
+    parallel workers they can add up to more than the run's wall time.
+    """
+    phases = take() or {}
+    report = {
+        "format": REPORT_FORMAT,
+        **details,
+        "total": {"wall_s": round(wall, 6), "cpu_s": round(cpu, 6)},
+        "phases": {
+            phase: {**entry, "wall_s": round(entry["wall_s"], 6), "cpu_s": round(entry["cpu_s"], 6)}
+            for phase, entry in sorted(phases.items(), key=lambda item: -item[1]["wall_s"])
+        },
+    }
+
+    output_dir = os.path.dirname(path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+    return report
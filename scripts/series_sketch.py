@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# scripts/series_sketch.py
+"""Mergeable summaries of metric series.
+
+A SeriesSketch keeps, for every UTC day of a series, a t-digest style
+quantile sketch and running moments (count, mean, M2, min, max) instead of
+the raw points. Folding in new points only touches the days they fall in,
+days that leave the lookback window are dropped, and sketches of
+different series can be merged, e.g. every ALB of an environment into one
+baseline. Memory is bounded by days x compression, whatever the number of
+points.
+"""
+
+import json
+import math
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+SKETCH_FORMAT = 1
+DEFAULT_COMPRESSION = 100
+MS_PER_DAY = 24 * 3600 * 1000
+
+SKETCH_STATISTICS = ('count', 'mean', 'std', 'min', 'p50', 'p95', 'p99', 'max')
+
+
+class Moments:
+    """Running count, mean and M2 (Welford), combined batch-wise with Chan's parallel update."""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, min=math.inf, max=-math.inf):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = min
+        self.max = max
+
+    def _combine(self, count, mean, m2, low, high):
+        if not count:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+
+    def update(self, values):
+        """Fold an array of values in."""
+        if values.size:
+            mean = float(values.mean())
+            self._combine(int(values.size), mean, float(((values - mean) ** 2).sum()),
+                          float(values.min()), float(values.max()))
+
+    def merge(self, other):
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean, "m2": self.m2, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class QuantileDigest:
+    """A merging t-digest: weighted centroids whose size shrinks towards the tails.
+
+    compression bounds the number of centroids (roughly compression / 2
+    after a compress), so quantiles near 0 and 1 stay accurate. Folded
+    values and merged digests are buffered and compressed together when the
+    buffer grows past BUFFER_FACTOR x compression or the centroids are read.
+    """
+
+    BUFFER_FACTOR = 10
+
+    def __init__(self, compression=DEFAULT_COMPRESSION, means=None, weights=None):
+        self.compression = compression
+        self._means = np.asarray(means if means is not None else [], dtype=np.float64)
+        self._weights = np.asarray(weights if weights is not None else [], dtype=np.float64)
+        self._pending = []
+        self._pending_size = 0
+
+    @property
+    def means(self):
+        self._flush()
+        return self._means
+
+    @property
+    def weights(self):
+        self._flush()
+        return self._weights
+
+    @property
+    def total(self):
+        return float(self.weights.sum())
+
+    def _k(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _k_inverse(self, k):
+        return (math.sin(min(k * 2 * math.pi / self.compression, math.pi / 2)) + 1) / 2
+
+    def _add(self, means, weights):
+        self._pending.append((means, weights))
+        self._pending_size += means.size
+        if self._pending_size > self.BUFFER_FACTOR * self.compression:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        means = np.concatenate([self._means] + [means for means, _ in self._pending])
+        weights = np.concatenate([self._weights] + [weights for _, weights in self._pending])
+        self._pending = []
+        self._pending_size = 0
+
+        order = np.argsort(means, kind='mergesort')
+        means, weights = means[order].tolist(), weights[order].tolist()
+        total = sum(weights)
+
+        merged_means, merged_weights = [], []
+        done = 0.0
+        limit = total * self._k_inverse(self._k(0) + 1)
+        mean, weight = means[0], weights[0]
+        for next_mean, next_weight in zip(means[1:], weights[1:]):
+            if done + weight + next_weight <= limit:
+                weight += next_weight
+                mean += (next_mean - mean) * next_weight / weight
+            else:
+                merged_means.append(mean)
+                merged_weights.append(weight)
+                done += weight
+                limit = total * self._k_inverse(self._k(done / total) + 1)
+                mean, weight = next_mean, next_weight
+        merged_means.append(mean)
+        merged_weights.append(weight)
+
+        self._means = np.array(merged_means)
+        self._weights = np.array(merged_weights)
+
+    def update(self, values):
+        """Fold an array of values in, each with weight 1."""
+        if values.size:
+            self._add(values, np.ones(values.size))
+
+    def merge(self, other):
+        if other._means.size:
+            self._add(other._means, other._weights)
+        for means, weights in other._pending:
+            self._add(means, weights)
+
+    def quantile(self, q, low, high):
+        """Estimate the q-quantile, given the exact minimum and maximum of the data."""
+        weights = self.weights
+        total = float(weights.sum())
+        centers = np.cumsum(weights) - weights / 2
+        return float(np.interp(q * total, np.concatenate([[0], centers, [total]]),
+                               np.concatenate([[low], self._means, [high]])))
+
+    def to_dict(self):
+        return {"means": self.means.tolist(), "weights": self.weights.tolist()}
+
+    @classmethod
+    def from_dict(cls, data, compression=DEFAULT_COMPRESSION):
+        return cls(compression, data["means"], data["weights"])
+
+
+class SeriesSketch:
+    """Per-day digests and moments of one series, with the time range it covers."""
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.days = {}
+        self.covered_start = None
+        self.covered_end = None
+        self.last_timestamp = None
+
+    def fold(self, timestamps, values, fetched_from, fetched_to):
+        """Fold in fetched points newer than anything folded before.
+
+        Sketches cannot forget points, so a refetched overlap is skipped
+        rather than counted twice.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if self.last_timestamp is not None:
+            keep = timestamps > self.last_timestamp
+            timestamps, values = timestamps[keep], values[keep]
+
+        if timestamps.size:
+            days = timestamps // MS_PER_DAY
+            for day in np.unique(days).tolist():
+                digest, moments = self.days.setdefault(day, (QuantileDigest(self.compression), Moments()))
+                selected = values[days == day]
+                digest.update(selected)
+                moments.update(selected)
+            self.last_timestamp = int(timestamps.max())
+
+        if self.covered_start is None:
+            self.covered_start = fetched_from
+        self.covered_end = fetched_to
+
+    def compact(self, window_start):
+        """Drop the days that ended before window_start."""
+        first_day = window_start * 1000 // MS_PER_DAY
+        for day in [day for day in self.days if day < first_day]:
+            del self.days[day]
+        if self.covered_start is not None:
+            self.covered_start = max(self.covered_start, window_start)
+
+    def merge(self, other):
+        """Merge another series' days into this sketch."""
+        for day, (digest, moments) in other.days.items():
+            own_digest, own_moments = self.days.setdefault(day, (QuantileDigest(self.compression), Moments()))
+            own_digest.merge(digest)
+            own_moments.merge(moments)
+
+    def summary(self):
+        """Merge every day into a single digest and moments."""
+        digest, moments = QuantileDigest(self.compression), Moments()
+        for day_digest, day_moments in self.days.values():
+            digest.merge(day_digest)
+            moments.merge(day_moments)
+        return digest, moments
+
+    def stats(self):
+        """Return a dict keyed by SKETCH_STATISTICS, or None when nothing was folded in."""
+        digest, moments = self.summary()
+        if not moments.count:
+            return None
+        p50, p95, p99 = (digest.quantile(q, moments.min, moments.max) for q in (0.5, 0.95, 0.99))
+        return {
+            "count": moments.count,
+            "mean": moments.mean,
+            "std": moments.std,
+            "min": moments.min,
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+            "max": moments.max,
+        }
+
+    def to_dict(self):
+        return {
+            "format": SKETCH_FORMAT,
+            "compression": self.compression,
+            "covered_start": self.covered_start,
+            "covered_end": self.covered_end,
+            "last_timestamp": self.last_timestamp,
+            "days": {str(day): {"digest": digest.to_dict(), "moments": moments.to_dict()}
+                     for day, (digest, moments) in sorted(self.days.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('format') != SKETCH_FORMAT:
+            raise ValueError(f"unsupported sketch format {data.get('format')}")
+        sketch = cls(data['compression'])
+        sketch.covered_start = data['covered_start']
+        sketch.covered_end = data['covered_end']
+        sketch.last_timestamp = data['last_timestamp']
+        sketch.days = {int(day): (QuantileDigest.from_dict(entry['digest'], sketch.compression),
+                                  Moments.from_dict(entry['moments']))
+                       for day, entry in data['days'].items()}
+        return sketch
+
+
+def load_sketch(directory, key):
+    """Load a stored sketch, or return None when it is missing or unreadable."""
+    path = Path(directory) / f"{key}.sketch.json"
+    try:
+        with open(path) as f:
+            return SeriesSketch.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Warning: ignoring unreadable sketch {path}: {e}")
+        return None
+
+
+def save_sketch(directory, key, sketch):
+    """Atomically write a sketch."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        # json.dumps() uses the C encoder, json.dump() to a file does not
+        f.write(json.dumps(sketch.to_dict(), separators=(',', ':')))
+    os.replace(tmp_path, directory / f"{key}.sketch.json")
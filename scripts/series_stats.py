@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# scripts/series_stats.py
+"""Vectorized statistics over whole metric series.
+
+compute_stats() summarises a series (timestamps in ms, values) with NumPy
+in a handful of array passes: the mean, p50/p95/p99, the maximum, the
+median absolute deviation (MAD) and an hour-of-week seasonal baseline.
+
+The seasonal baseline is the median of every hour of the week (Monday
+00:00 UTC is hour 0). seasonal_peak is its busiest hour and seasonal_mad
+the MAD of the series around the baseline, i.e. the usual spread once the
+weekly pattern is accounted for.
+"""
+
+import numpy as np
+
+HOURS_PER_WEEK = 168
+MS_PER_HOUR = 3600 * 1000
+# The epoch (1970-01-01) was a Thursday, 72 hours after Monday 00:00
+EPOCH_HOUR_OF_WEEK = 72
+
+STATISTICS = ('count', 'mean', 'p50', 'p95', 'p99', 'max', 'mad', 'seasonal_peak', 'seasonal_mad')
+
+
+def hour_of_week(timestamps):
+    """Return the hour of the week (0-167, Monday 00:00 UTC = 0) of ms timestamps."""
+    return (timestamps // MS_PER_HOUR + EPOCH_HOUR_OF_WEEK) % HOURS_PER_WEEK
+
+
+def grouped_median(groups, values, size):
+    """Return the median of values for every group id in range(size), NaN for empty groups."""
+    order = np.lexsort((values, groups))
+    ordered = values[order]
+    counts = np.bincount(groups, minlength=size)
+    starts = np.cumsum(counts) - counts
+
+    medians = np.full(size, np.nan)
+    present = counts > 0
+    low = starts[present] + (counts[present] - 1) // 2
+    high = starts[present] + counts[present] // 2
+    medians[present] = (ordered[low] + ordered[high]) / 2
+    return medians
+
+
+def seasonal_baseline(timestamps, values):
+    """Return the hour-of-week median baseline of a series as an array of 168 values."""
+    return grouped_median(hour_of_week(np.asarray(timestamps, dtype=np.int64)),
+                          np.asarray(values, dtype=np.float64), HOURS_PER_WEEK)
+
+
+def compute_stats(timestamps, values):
+    """Summarise a series, returning a dict keyed by STATISTICS or None when it is empty."""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
+        return None
+
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    buckets = hour_of_week(timestamps)
+    baseline = grouped_median(buckets, values, HOURS_PER_WEEK)
+
+    return {
+        "count": int(values.size),
+        "mean": float(values.mean()),
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+        "max": float(values.max()),
+        "mad": float(np.median(np.abs(values - p50))),
+        "seasonal_peak": float(np.nanmax(baseline)),
+        "seasonal_mad": float(np.median(np.abs(values - baseline[buckets]))),
+    }
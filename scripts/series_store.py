@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# scripts/series_store.py
+"""Local store of historical metric series.
+
+Each series, keyed by (query, loadbalancer), is one file in a columnar
+layout: a fixed header followed by an int64 column of timestamps (ms) and
+a float64 column of values. Files are read through mmap, so opening a
+series costs nothing until its points are touched, and they are rewritten
+atomically after every merge.
+
+The header records the time range the series covers, so a later run only
+fetches the tail after covered_end and drops points that fell out of the
+retention window.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+STORE_DIR_ENV = 'ALB_SERIES_STORE_DIR'
+DEFAULT_STORE_DIR = Path(__file__).resolve().parent.parent / '.cache' / 'alb_series'
+
+MAGIC = b'DDSERIES'
+STORE_FORMAT = 1
+
+# magic, format, padding, point count, covered start and end (epoch seconds).
+# Native byte order: the store is a local cache, not an exchange format.
+HEADER = struct.Struct('=8sIIqqq')
+
+# Re-read the last hour on every refresh, its rollup bucket may have been partial
+TAIL_OVERLAP = 3600
+
+
+def series_key(query, loadbalancer):
+    """Return the store key of one load balancer's series for a query template."""
+    return hashlib.sha256(f"{query}\n{loadbalancer.lower()}".encode('utf-8')).hexdigest()
+
+
+def store_dir():
+    """Return the store directory, or None when the store is disabled."""
+    configured = os.environ.get(STORE_DIR_ENV)
+    if configured is None:
+        return DEFAULT_STORE_DIR / f"v{STORE_FORMAT}"
+    if not configured:
+        return None
+    return Path(configured) / f"v{STORE_FORMAT}"
+
+
+class Series:
+    """A memory-mapped, read-only view of one stored series."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, _, count, self.covered_start, self.covered_end = HEADER.unpack_from(self._map)
+            if magic != MAGIC or version != STORE_FORMAT or len(self._map) != HEADER.size + count * 16:
+                raise ValueError(f"{path} is not a series file of format {STORE_FORMAT}")
+        except (struct.error, ValueError):
+            self._map.close()
+            raise
+
+        view = memoryview(self._map)
+        self._views = [view]
+        column = HEADER.size + count * 8
+        self.timestamps = view[HEADER.size:column].cast('q')
+        self.values = view[column:].cast('d')
+        self._views += [self.timestamps, self.values]
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def close(self):
+        # Exported views must be released before the map can be closed
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_series(directory, key):
+    """Open a stored series, or return None when it is missing or unreadable."""
+    path = Path(directory) / f"{key}.series"
+    try:
+        return Series(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Warning: ignoring unreadable series {path}: {e}")
+        return None
+
+
+def write_series(directory, key, timestamps, values, covered_start, covered_end):
+    """Atomically write a series from its timestamp and value columns."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, STORE_FORMAT, 0, len(timestamps), covered_start, covered_end))
+        f.write(array('q', timestamps).tobytes())
+        f.write(array('d', values).tobytes())
+    os.replace(tmp_path, directory / f"{key}.series")
+
+
+def fetch_start(series, window_start):
+    """Return where to start fetching so a series (or sketch) covers [window_start, now].
+
+    A series that already covers the start of the window only needs its
+    tail; anything else is fetched from scratch.
+    """
+    if series is None or series.covered_start > window_start or series.covered_end <= window_start:
+        return window_start
+    return max(window_start, series.covered_end - TAIL_OVERLAP)
+
+
+def merge_tail(series, points, fetched_from, fetched_to, window_start):
+    """Merge freshly fetched points into a series and compact it to the window.
+
+    Stored points from fetched_from onwards are replaced by the fetched
+    points, and points older than window_start are dropped. Returns the
+    timestamp and value columns with the new covered range.
+    """
+    cutoff = fetched_from * 1000
+    timestamps = array('q')
+    values = array('d')
+
+    if series is not None and fetched_from > window_start:
+        first = bisect_left(series.timestamps, window_start * 1000)
+        last = bisect_left(series.timestamps, cutoff)
+        timestamps.frombytes(series.timestamps[first:last].tobytes())
+        values.frombytes(series.values[first:last].tobytes())
+
+    for timestamp, value in sorted(points):
+        if timestamp >= cutoff:
+            timestamps.append(int(timestamp))
+            values.append(value)
+
+    return timestamps, values, window_start, fetched_to
+
+
+def prune(directory, before):
+    """Remove stored series whose whole covered range ended before the given time."""
+    removed = 0
+    for path in Path(directory).glob('*.series'):
+        series = open_series(directory, path.stem)
+        if series is None:
+            continue
+        with series:
+            stale = series.covered_end < before
+        if stale:
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+    return removed
@@ -1,84 +1,224 @@
 #!/usr/bin/env python3
 # scripts/validate_configs.py
 
+import argparse
+import json
 import os
-import yaml
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import yaml
+from jsonschema import Draft202012Validator
+
+from config_layers import is_layer, resolve_env_config
+from config_loader import YamlLoader, load_yaml_file
+
+SCHEMA_DIR = Path(__file__).resolve().parent / 'schemas'
+SCHEMA_FILES = {
+    'application': SCHEMA_DIR / 'application.schema.json',
+    'environment': SCHEMA_DIR / 'environment.schema.json',
+    # Shared environment layers hold any part of an environment config
+    'layer': SCHEMA_DIR / 'environment.schema.json',
+}
+
+# Validators compiled once per process, see get_validator()
+_validators = {}
+
+def without_required(schema):
+    """Return a schema that no longer requires any property."""
+    if isinstance(schema, dict):
+        return {key: without_required(value) for key, value in schema.items()
+                if not (key == 'required' and isinstance(value, list))}
+    if isinstance(schema, list):
+        return [without_required(value) for value in schema]
+    return schema
+
+def get_validator(kind):
+    """Return the compiled validator for a config kind ('application', 'environment' or 'layer')."""
+    validator = _validators.get(kind)
+    if validator is None:
+        with open(SCHEMA_FILES[kind]) as f:
+            schema = json.load(f)
+        if kind == 'layer':
+            schema = without_required(schema)
+        Draft202012Validator.check_schema(schema)
+        validator = _validators[kind] = Draft202012Validator(schema)
+    return validator
+
+def format_path(path):
+    """Format a jsonschema error path as a dotted config path."""
+    parts = []
+    for part in path:
+        if isinstance(part, int):
+            parts.append(f"[{part}]")
+        else:
+            parts.append(f".{part}" if parts else str(part))
+    return ''.join(parts) or '<root>'
+
+def find_node(root, path):
+    """Return the YAML node at path, or its deepest existing parent, and whether the whole path was found."""
+    node = root
+    for part in path:
+        child = None
+        if isinstance(node, yaml.MappingNode):
+            for key_node, value_node in node.value:
+                if key_node.value == str(part):
+                    child = value_node
+                    break
+        elif isinstance(node, yaml.SequenceNode) and isinstance(part, int) and part < len(node.value):
+            child = node.value[part]
+        if child is None:
+            return node, False
+        node = child
+    return node, True
+
+def node_line(root, path):
+    """Return the 1-based line of the YAML node at path, or of its deepest existing parent."""
+    return find_node(root, path)[0].start_mark.line + 1
+
+def locate(roots, path):
+    """Return the file and 1-based line an error path comes from, (None, 0) when it cannot be told.
+
+    roots are the (file, composed node tree) a document was merged from,
+    lowest precedence first. A merged path is attributed to the last file
+    defining it. A single file reports the deepest existing parent of a
+    missing path instead.
+    """
+    if len(roots) == 1:
+        file_path, root = roots[0]
+        return file_path, node_line(root, path) if root is not None else 0
+    for file_path, root in reversed(roots):
+        if root is not None:
+            node, found = find_node(root, path)
+            if found:
+                return file_path, node.start_mark.line + 1
+    return None, 0
+
 def validate_monitor_config(config, file_path):
-    """Validate a single monitor configuration."""
-    required_fields = ['name', 'description', 'type', 'monitor_sets']
-    
-    for field in required_fields:
-        if field not in config:
-            print(f"Error in {file_path}: Missing required field '{field}'")
-            return False
-            
-    if 'monitor_sets' not in config:
-        print(f"Error in {file_path}: No monitor_sets defined")
-        return False
-        
-    return True
+    """Validate a single monitor configuration. Returns a list of error messages."""
+    return validate_document(config, file_path, 'application')
 
 def validate_environment_config(config, file_path):
-    """Validate a single environment configuration."""
-    required_fields = ['environment', 'notification_channels', 'threshold_overrides']
-    
-    for field in required_fields:
-        if field not in config:
-            print(f"Error in {file_path}: Missing required field '{field}'")
-            return False
-            
-    return True
+    """Validate a single environment configuration. Returns a list of error messages."""
+    return validate_document(config, file_path, 'environment')
+
+def validate_document(config, file_path, kind, sources=None):
+    """Validate a parsed config against its schema, reporting file, line and path of every error.
+
+    sources are the layer files a resolved environment was merged from,
+    lowest precedence first; an error in an inherited value is reported
+    at the layer that supplied it.
+    """
+    errors = list(get_validator(kind).iter_errors(config))
+    if not errors:
+        return []
+
+    # Only compose the YAML node trees (for line numbers) when there is something to report
+    roots = []
+    for source in sources or [file_path]:
+        with open(source, 'rb') as f:
+            roots.append((Path(source), yaml.compose(f, Loader=YamlLoader)))
+
+    file_path = Path(file_path)
+    # Errors about the document as a whole, such as unexpected top-level keys, belong to the file itself
+    own = [(source, root) for source, root in roots if source == file_path]
+    located = []
+    for error in errors:
+        source, line = locate(roots if error.absolute_path else own, error.absolute_path)
+        located.append((str(source or file_path), line, format_path(error.absolute_path), error.message))
+
+    messages = []
+    for source, line, path, message in sorted(located):
+        inherited = f" (inherited by {file_path})" if source != str(file_path) else ''
+        messages.append(f"{source}{f':{line}' if line else ''}: {path}: {message}{inherited}")
+    return messages
+
+def validate_file(file_path, kind, envs_dir=None):
+    """Load and validate one config file. Returns a list of error messages.
+
+    An environment is validated as resolved from its layers, so required
+    settings may come from a shared layer. It must be at <app>/<env>.yaml
+    under envs_dir (default: the directory above its own), anything else
+    is reported as a layout error.
+    """
+    file_path = Path(file_path)
+    try:
+        sources = None
+        if kind == 'environment':
+            envs_dir = Path(envs_dir) if envs_dir is not None else file_path.parent.parent
+            parts = Path(os.path.relpath(file_path, envs_dir)).parts
+            if len(parts) != 2 or parts[0] == os.pardir:
+                return [f"{file_path}: environment configs must be at <app>/<env>.yaml under {envs_dir}"]
+            config, sources = resolve_env_config(envs_dir, parts[0], file_path.stem)
+        else:
+            config = load_yaml_file(file_path)
+    except yaml.YAMLError as e:
+        mark = getattr(e, 'problem_mark', None)
+        line = f":{mark.line + 1}" if mark else ''
+        return [f"{mark.name if mark else file_path}{line}: error parsing YAML: {e}"]
+    except FileNotFoundError as e:
+        return [f"{file_path}: {e}"]
+    return validate_document(config, file_path, kind, sources)
+
+def find_config_files(apps_dir, envs_dir):
+    """Return every (file, kind) to validate, walking both config trees recursively."""
+    files = [(path, 'application') for path in sorted(apps_dir.rglob('*.yaml'))]
+    files += [(path, 'layer' if is_layer(path, envs_dir) else 'environment') for path in sorted(envs_dir.rglob('*.yaml'))]
+    return files
+
+def validate_files(files, jobs, envs_dir=None):
+    """Validate files across a worker pool, returning their errors in file order."""
+    workers = min(jobs, len(files))
+    if workers <= 1:
+        return [validate_file(path, kind, envs_dir) for path, kind in files]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(validate_file, [path for path, _ in files], [kind for _, kind in files],
+                             [envs_dir] * len(files), chunksize=max(1, len(files) // (workers * 4))))
 
 def main():
     script_dir = Path(__file__).parent.parent
-    apps_dir = script_dir / 'monitor_configs' / 'applications'
-    envs_dir = script_dir / 'monitor_configs' / 'environments'
-    
+
+    parser = argparse.ArgumentParser(description='Validate monitor configurations against their schemas')
+    parser.add_argument('--apps-dir', type=Path, default=script_dir / 'monitor_configs' / 'applications',
+                        help='Applications config directory')
+    parser.add_argument('--env-dir', type=Path, default=script_dir / 'monitor_configs' / 'environments',
+                        help='Environments config directory')
+    parser.add_argument('--jobs', type=int, default=0, help='Worker processes (0 = one per CPU)')
+    args = parser.parse_args()
+
+    apps_dir = args.apps_dir
+    envs_dir = args.env_dir
+
     print(f"Checking configurations in {apps_dir} and {envs_dir}")
-    
+
     has_error = False
-    
-    # Validate application configs
-    if apps_dir.exists():
-        for config_file in apps_dir.glob('*.yaml'):
-            print(f"Validating {config_file}")
-            try:
-                with open(config_file) as f:
-                    config = yaml.safe_load(f)
-                if not validate_monitor_config(config, config_file):
-                    has_error = True
-            except yaml.YAMLError as e:
-                print(f"Error parsing {config_file}: {e}")
-                has_error = True
-    else:
-        print(f"Applications directory not found: {apps_dir}")
-        has_error = True
-    
-    # Validate environment configs
-    if envs_dir.exists():
-        for config_file in envs_dir.glob('*.yaml'):
-            print(f"Validating {config_file}")
-            try:
-                with open(config_file) as f:
-                    config = yaml.safe_load(f)
-                if not validate_environment_config(config, config_file):
-                    has_error = True
-            except yaml.YAMLError as e:
-                print(f"Error parsing {config_file}: {e}")
-                has_error = True
-    else:
-        print(f"Environments directory not found: {envs_dir}")
+
+    for directory, label in ((apps_dir, 'Applications'), (envs_dir, 'Environments')):
+        if not directory.exists():
+            print(f"{label} directory not found: {directory}")
+            has_error = True
+
+    files = find_config_files(apps_dir, envs_dir) if not has_error else []
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+
+    error_count = 0
+    for errors in validate_files(files, jobs, envs_dir):
+        for error in errors:
+            print(f"Error: {error}")
+        error_count += len(errors)
+
+    if error_count:
         has_error = True
-    
+        print(f"\nFound {error_count} error(s) in {len(files)} configuration file(s)")
+
     if has_error:
         print("Validation failed!")
         sys.exit(1)
     else:
-        print("All configurations are valid!")
+        print(f"All {len(files)} configurations are valid!")
         sys.exit(0)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,7 +1,8 @@
 # scripts/validate_datadog_creds.py
 import os
 import sys
-import requests
+
+from datadog_client import DatadogClient, DatadogError
 
 def validate_datadog_credentials():
     api_key = os.environ.get('DATADOG_API_KEY')
@@ -11,29 +12,29 @@ def validate_datadog_credentials():
         print("Error: Missing Datadog credentials in environment variables")
         return False
     
-    # Test the credentials against Datadog EU API
-    headers = {
-        'DD-API-KEY': api_key,
-        'DD-APPLICATION-KEY': app_key,
-    }
+    # Test the credentials against Datadog EU API, or DATADOG_HOST (e.g. scripts/fake_datadog.py)
+    client = DatadogClient(api_key=api_key, app_key=app_key, pool_size=1)
     
     try:
-        response = requests.get(
-            'https://api.datadoghq.eu/api/v1/validate',
-            headers=headers
-        )
-        
-        if response.status_code == 200:
-            print("Datadog credentials are valid!")
-            return True
+        client.get('/api/v1/validate')
+        print("Datadog credentials are valid!")
+        return True
+    except DatadogError as e:
+        if e.response is not None:
+            print(f"Error validating Datadog credentials: {e.response.status_code}")
+            print(f"Response: {e.response.text}")
         else:
-            print(f"Error validating Datadog credentials: {response.status_code}")
-            print(f"Response: {response.text}")
-            return False
+            print(f"Error testing Datadog credentials: {e}")
+        return False
     except Exception as e:
         print(f"Error testing Datadog credentials: {e}")
         return False
+    finally:
+        client.close()
 
-if __name__ == "__main__":
+def main():
     if not validate_datadog_credentials():
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,23 @@ locals {
     }
   }
 
+  # Services covered by a group get one multi-alert monitor per group instead of their own
+  grouped_services   = toset(flatten([for group in values(var.apm_service_groups) : group.services]))
+  ungrouped_services = { for key, service in var.apm_services : key => service if !contains(local.grouped_services, key) }
+
+  group_metric_paths = {
+    for key, group in var.apm_service_groups :
+    key => {
+      request = group.service_type == "node" ? "trace.next.request" : "trace.servlet.request"
+      error   = group.service_type == "node" ? "trace.next.request.errors" : "trace.servlet.request.errors"
+      hits    = group.service_type == "node" ? "trace.next.request.hits" : "trace.servlet.request.hits"
+    }
+  }
+
+  group_filters = {
+    for key, group in var.apm_service_groups : key => "service IN (${join(", ", group.service_names)}) AND env:${var.environment}"
+  }
+
   # Queries using dynamic metric paths with working configuration
   error_anomaly_queries = {
     for service, config in var.apm_services :
@@ -32,7 +49,7 @@ locals {
 }
 
 resource "datadog_monitor" "apm_latency" {
-  for_each = var.apm_services
+  for_each = local.ungrouped_services
 
   name    = "[${var.environment}] APM Latency Anomaly - ${each.value.name}"
   type    = "query alert"
@@ -94,7 +111,7 @@ resource "datadog_monitor" "apm_latency" {
 }
 
 resource "datadog_monitor" "error_rate_monitor" {
-  for_each = var.apm_services
+  for_each = local.ungrouped_services
 
   name    = "[${var.environment}] APM Error Rate Anomaly - ${each.value.service_name}"
   type    = "query alert"
@@ -163,7 +180,7 @@ resource "datadog_monitor" "error_rate_monitor" {
 }
 
 resource "datadog_monitor" "apm_throughput" {
-  for_each = var.apm_services
+  for_each = local.ungrouped_services
 
   name    = "[${var.environment}] APM Throughput - ${each.value.name}"
   type    = "metric alert"
@@ -209,3 +226,183 @@ resource "datadog_monitor" "apm_throughput" {
   )
   priority = each.value.alert_settings.priority
 }
+
+
+# Grouped monitors - one multi-alert monitor per group of services sharing
+# service type and alert settings, alerting separately for each service
+
+resource "datadog_monitor" "apm_latency_group" {
+  for_each = var.apm_service_groups
+
+  name    = "[${var.environment}] APM Latency Anomaly - {{service.name}}"
+  type    = "query alert"
+  message = <<-EOT
+    ## Significant Latency Anomaly Detected for {{service.name}}
+
+    Current Latency: {{value}} ms
+    Expected Range: {{threshold}} ms
+    
+    This represents a major deviation (5+ standard deviations) from normal behavior:
+    * Based on 2 weeks of historical data
+    * Trigger: Anomaly sustained for 1 week
+    * Recovery: Normal behavior for 30 minutes
+
+    This severe anomaly could indicate:
+    * Unusual response times from dependencies
+    * Unexpected workload patterns
+    * Performance degradation
+    * Resource constraints
+
+    Investigation Priority Steps:
+    1. Compare with last week's latency patterns
+    2. Check dependencies' performance
+    3. Review resource utilization
+    4. Analyze current traffic patterns
+    5. Check recent deployments
+    6. Review database performance
+
+    @${local.slack_channel}
+  EOT
+
+  query = "avg(last_2w):anomalies(avg:${local.group_metric_paths[each.key].request}{${local.group_filters[each.key]}} by {service}, 'agile', 5, direction='above', interval=21600, alert_window='last_1w', seasonality='weekly', count_default_zero='true', timezone='utc') >= 1"
+
+  monitor_thresholds {
+    critical = 1.0
+  }
+
+  monitor_threshold_windows {
+    trigger_window  = "last_1w"
+    recovery_window = "last_30m"
+  }
+
+  include_tags        = true
+  notify_no_data      = false
+  require_full_window = true
+  evaluation_delay    = 900 # 15 minutes
+  notify_audit        = false
+
+  tags = concat(
+    local.monitor_tags,
+    [for k, v in each.value.tags : "${k}:${v}"],
+    [
+      "cluster:${each.value.cluster}",
+      "service_group:${each.key}"
+    ]
+  )
+  priority = each.value.alert_settings.priority
+}
+
+resource "datadog_monitor" "error_rate_monitor_group" {
+  for_each = var.apm_service_groups
+
+  name    = "[${var.environment}] APM Error Rate Anomaly - {{service.name}}"
+  type    = "query alert"
+  message = <<-EOT
+    ## Significant Error Rate Anomaly Detected for {{service.name}}
+
+    Current Error Rate Pattern: {{value}}%
+    Expected Range: {{threshold}}%
+    
+    This represents a major deviation (5+ standard deviations) from normal behavior:
+    * Based on 2 weeks of historical data
+    * Trigger: Anomaly sustained for 1 week
+    * Recovery: Normal behavior for 30 minutes
+
+    This severe anomaly could indicate:
+    * Deployment issues
+    * Service dependencies failing
+    * System resource constraints
+    * External service integration problems
+    * Database connection issues
+    * Configuration errors
+
+    Investigation Priority Steps:
+    1. Compare with last week's error patterns
+    2. Check recent deployments or changes
+    3. Review error logs and stack traces
+    4. Check downstream dependencies
+    5. Verify external service status
+    6. Monitor system resources
+
+    Additional Context:
+    * Service Type: ${each.value.service_type}
+    * Environment: ${var.environment}
+    * Detection Window: 1 week of sustained anomalous behavior
+
+    @${local.slack_channel}
+  EOT
+
+  query = "avg(last_2w):anomalies(sum:${local.group_metric_paths[each.key].error}{${local.group_filters[each.key]}} by {service}.as_rate() / sum:${local.group_metric_paths[each.key].hits}{${local.group_filters[each.key]}} by {service}.as_rate() * 100, 'agile', 5, direction='above', interval=21600, alert_window='last_1w', seasonality='weekly', count_default_zero='true', timezone='utc') >= 1"
+
+  monitor_thresholds {
+    critical = 1.0
+  }
+
+  monitor_threshold_windows {
+    trigger_window  = "last_1w"
+    recovery_window = "last_30m"
+  }
+
+  include_tags        = true
+  notify_no_data      = false
+  require_full_window = true
+  evaluation_delay    = 900 # 15 minutes
+  notify_audit        = false
+
+  tags = concat(
+    local.monitor_tags,
+    [for k, v in each.value.tags : "${k}:${v}"],
+    [
+      "cluster:${each.value.cluster}",
+      "service_group:${each.key}"
+    ]
+  )
+  priority = each.value.alert_settings.priority
+}
+
+resource "datadog_monitor" "apm_throughput_group" {
+  for_each = var.apm_service_groups
+
+  name    = "[${var.environment}] APM Throughput - {{service.name}}"
+  type    = "metric alert"
+  message = <<-EOT
+    ## No Data Detected for {{service.name}}
+
+    No throughput data has been reported for the last 10 minutes, indicating that your service may have stopped running entirely. 
+
+    Potential causes:
+    * Service is down or unresponsive
+    * Network connectivity issues
+    * Infrastructure resource limitations
+
+    Please investigate:
+    * Check the service status in your deployment environment
+    * Review network configurations and traffic flow
+    * Monitor resources for potential bottlenecks
+
+    @${local.slack_channel}
+  EOT
+
+  query = "sum(last_2w):sum:${local.group_metric_paths[each.key].hits}{${local.group_filters[each.key]}} by {service}.as_count().rollup(sum, 300) < 0"
+
+  monitor_thresholds {
+    critical          = 0 # No data should trigger critical alert
+    critical_recovery = 1 # Any data received will clear the alert
+  }
+
+  include_tags      = true
+  notify_no_data    = false
+  no_data_timeframe = 20
+  timeout_h         = 1
+  renotify_interval = 60
+
+  tags = concat(
+    local.monitor_tags,
+    [for k, v in each.value.tags : "${k}:${v}"],
+    [
+      "cluster:${each.value.cluster}",
+      "service_group:${each.key}"
+    ]
+  )
+  priority = each.value.alert_settings.priority
+}
@@ -24,6 +24,22 @@ variable "apm_services" {
   default = {}
 }
 
+variable "apm_service_groups" {
+  description = "APM services sharing alert settings, monitored by one multi-alert monitor per group"
+  type = map(object({
+    cluster       = string
+    service_type  = string
+    services      = list(string) # keys of the grouped entries in var.apm_services
+    service_names = list(string)
+    alert_settings = object({
+      priority     = string
+      include_tags = bool
+    })
+    tags = map(string)
+  }))
+  default = {}
+}
+
 variable "notification_channels" {
   description = "Notification channel configuration"
   type = object({
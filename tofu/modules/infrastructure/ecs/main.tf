@@ -13,11 +13,19 @@ locals {
     var.notification_channels.infrastructure["ecs"],
     var.notification_channels.default
   )
+
+  # Services covered by a group get one multi-alert monitor per group instead of their own
+  grouped_services   = toset(flatten([for group in values(var.service_groups) : group.services]))
+  ungrouped_services = { for key, service in var.services : key => service if !contains(local.grouped_services, key) }
+
+  group_filters = {
+    for key, group in var.service_groups : key => "cluster_name:${group.cluster} AND (${join(" OR ", [for name in group.service_names : "service:${name}*"])})"
+  }
 }
 
 # CPU Usage Monitor
 resource "datadog_monitor" "cpu_usage" {
-  for_each = var.services
+  for_each = local.ungrouped_services
 
   name    = "[${var.environment}] ECS Service ${each.value.service_name} - High CPU Usage"
   type    = "metric alert"
@@ -71,7 +79,7 @@ resource "datadog_monitor" "cpu_usage" {
 
 # Memory Usage Monitor
 resource "datadog_monitor" "memory_usage" {
-  for_each = var.services
+  for_each = local.ungrouped_services
 
   name    = "[${var.environment}] ECS Service ${each.value.service_name} - High Memory Usage"
   type    = "metric alert"
@@ -129,7 +137,7 @@ resource "datadog_monitor" "memory_usage" {
 
 # Network Errors Monitor
 resource "datadog_monitor" "network_errors" {
-  for_each = var.services
+  for_each = local.ungrouped_services
 
   name    = "[${var.environment}] ECS Service ${each.value.service_name} - Network Errors Detected"
   type    = "metric alert"
@@ -192,7 +200,7 @@ resource "datadog_monitor" "network_errors" {
 # Container Health Monitor - Production Only
 resource "datadog_monitor" "container_health" {
   # Only create this monitor when environment is "prd"
-  for_each = var.environment == "prd" ? var.services : {}
+  for_each = var.environment == "prd" ? local.ungrouped_services : {}
 
   name    = "[${var.environment}] ECS Service ${each.value.service_name} - Container Health Check Failures"
   type    = "metric alert"
@@ -246,7 +254,7 @@ resource "datadog_monitor" "container_health" {
 
 # Unhealthy Tasks Monitor
 resource "datadog_monitor" "unhealthy_tasks" {
-  for_each = var.environment == "prd" ? var.services : {}
+  for_each = var.environment == "prd" ? local.ungrouped_services : {}
 
   name    = "[${var.environment}] ECS Service ${each.value.service_name} - Unhealthy Tasks Detected"
   type    = "query alert"
@@ -296,8 +304,7 @@ resource "datadog_monitor" "unhealthy_tasks" {
   priority = each.value.alert_settings.priority
 }
 
-# ECS Task Health Monitor
-# ECS Task Health Monitor
+# ECS Task Health Monitor - per task, also for grouped services
 resource "datadog_monitor" "ecs_task_health" {
   for_each = var.services
 
@@ -343,3 +350,249 @@ resource "datadog_monitor" "ecs_task_health" {
 
   priority = each.value.alert_settings.priority
 }
+
+
+# Grouped monitors - one multi-alert monitor per group of services sharing
+# thresholds and alert settings, alerting separately for each service
+
+locals {
+  group_tags = {
+    for key, group in var.service_groups : key => concat(
+      local.monitor_tags,
+      [for k, v in group.tags : "${k}:${v}"],
+      [
+        "cluster:${group.cluster}",
+        "service_group:${key}"
+      ]
+    )
+  }
+}
+
+# CPU Usage Monitor - Grouped
+resource "datadog_monitor" "cpu_usage_group" {
+  for_each = var.service_groups
+
+  name    = "[${var.environment}] ECS Service {{service.name}} - High CPU Usage"
+  type    = "metric alert"
+  message = <<-EOT
+    ## Service {{service.name}} is experiencing high CPU usage
+
+    Current CPU Usage: {{value}}%
+    Threshold: ${each.value.thresholds.cpu_percent}%
+
+    This could indicate:
+    * Resource constraints
+    * High application load
+    * Potential memory leaks
+    * Long-running operations
+
+    Please investigate:
+    * Application metrics and logs
+    * Recent code deployments
+    * Current service load
+    * Resource allocation
+
+    @${local.slack_channel}
+  EOT
+
+  query = "avg(last_4h):avg:ecs.fargate.cpu.percent{${local.group_filters[each.key]}} by {service}.rollup(max, 120) >= ${each.value.thresholds.cpu_percent}"
+
+  monitor_thresholds {
+    critical          = each.value.thresholds.cpu_percent
+    critical_recovery = each.value.thresholds.cpu_percent * 0.9
+  }
+
+
+  include_tags        = true
+  notify_no_data      = false
+  no_data_timeframe   = 30
+  require_full_window = false
+  evaluation_delay    = 900
+
+  tags     = local.group_tags[each.key]
+  priority = each.value.alert_settings.priority
+}
+
+# Memory Usage Monitor - Grouped
+resource "datadog_monitor" "memory_usage_group" {
+  for_each = var.service_groups
+
+  name    = "[${var.environment}] ECS Service {{service.name}} - High Memory Usage"
+  type    = "metric alert"
+  message = <<-EOT
+    ## Service {{service.name}} is approaching Out of Memory condition
+
+    Current Memory Usage: {{value}}%
+    Memory Threshold: ${each.value.thresholds.memory_percent}% of ${format("%.2f", each.value.thresholds.memory_available / 1024)} GB
+
+    This indicates the service is close to running out of memory!
+
+    Immediate actions required:
+    * Check for memory leaks
+    * Review recent deployments
+    * Check for unusual load patterns
+    * Consider emergency scaling
+
+    Critical System Impact:
+    * Service might experience OOM kills
+    * Performance degradation
+    * Potential service disruption
+
+    @${local.slack_channel}
+  EOT
+
+  query = "avg(last_5m):avg:ecs.fargate.mem.usage{${local.group_filters[each.key]}} by {service} > ${(each.value.thresholds.memory_available * 1024 * 1024) * (each.value.thresholds.memory_percent / 100)}"
+
+  monitor_thresholds {
+    critical          = (each.value.thresholds.memory_available * 1024 * 1024) * (each.value.thresholds.memory_percent / 100)
+    critical_recovery = (each.value.thresholds.memory_available * 1024 * 1024) * ((each.value.thresholds.memory_percent - 10) / 100)
+    warning           = (each.value.thresholds.memory_available * 1024 * 1024) * ((each.value.thresholds.memory_percent - 5) / 100)
+    warning_recovery  = (each.value.thresholds.memory_available * 1024 * 1024) * ((each.value.thresholds.memory_percent - 15) / 100)
+  }
+
+  include_tags        = true
+  notify_no_data      = false
+  no_data_timeframe   = 10
+  require_full_window = false
+
+  tags     = local.group_tags[each.key]
+  priority = each.value.alert_settings.priority
+}
+
+# Network Errors Monitor - Grouped
+resource "datadog_monitor" "network_errors_group" {
+  for_each = var.service_groups
+
+  name    = "[${var.environment}] ECS Service {{service.name}} - Network Errors Detected"
+  type    = "metric alert"
+  message = <<-EOT
+    ## Service {{service.name}} is experiencing network errors
+
+    Current Error Rate: {{value}}
+    Threshold: ${each.value.thresholds.network_errors}
+
+    This could indicate:
+    * Network connectivity issues
+    * Service mesh problems
+    * DNS resolution failures
+    * Application network issues
+
+    Please investigate:
+    * Network connectivity
+    * DNS resolution
+    * Security groups and NACLs
+    * Application logs for connection errors
+
+    @${local.slack_channel}
+  EOT
+
+  query = <<EOT
+    avg(last_15m):(
+      sum:ecs.fargate.net.rcvd_errors{${local.group_filters[each.key]}} by {service}.as_rate() +
+      sum:ecs.fargate.net.sent_errors{${local.group_filters[each.key]}} by {service}.as_rate()
+    ) > ${each.value.thresholds.network_errors}
+    EOT
+
+  monitor_thresholds {
+    critical          = each.value.thresholds.network_errors
+    critical_recovery = floor(each.value.thresholds.network_errors * 0.6)
+    warning           = floor(each.value.thresholds.network_errors * 0.7)
+    warning_recovery  = floor(each.value.thresholds.network_errors * 0.5)
+  }
+
+
+  include_tags        = true
+  notify_no_data      = false
+  no_data_timeframe   = 20
+  require_full_window = false
+  evaluation_delay    = 300
+
+  tags     = local.group_tags[each.key]
+  priority = each.value.alert_settings.priority
+}
+
+# Container Health Monitor - Grouped, Production Only
+resource "datadog_monitor" "container_health_group" {
+  for_each = var.environment == "prd" ? var.service_groups : {}
+
+  name    = "[${var.environment}] ECS Service {{servicename.name}} - Container Health Check Failures"
+  type    = "metric alert"
+  message = <<-EOT
+    ## Service {{servicename.name}} is experiencing container health check failures
+
+    Current Running Task Count: {{value}}
+    Minimum Expected Tasks: ${floor(each.value.thresholds.desired_count * 0.5)}
+    
+    This could indicate:
+    * Application crashes
+    * Deadlocks
+    * Configuration issues
+    * Resource exhaustion
+
+    Please investigate:
+    * Container logs
+    * Health check configuration
+    * Resource metrics
+    * Recent deployments
+    * ECS Events and Service status
+
+    @${var.environment == "prd" ? "slack-dd-unhealthy-container-p1" : "slack-dd-unhealthy-container-p2"}
+  EOT
+
+  query = "sum(last_1h):avg:ecs.containerinsights.RunningTaskCount{clustername:${each.value.cluster} AND servicename IN (${join(", ", each.value.service_names)})} by {servicename} < 0.9"
+
+  monitor_thresholds {
+    critical          = 0.9 # Alert when less than 1 container is running
+    critical_recovery = 1   # Recover when 1 container is running
+  }
+
+  include_tags      = true
+  notify_no_data    = false
+  no_data_timeframe = 20
+  evaluation_delay  = 900
+
+  tags     = local.group_tags[each.key]
+  priority = 1
+}
+
+# Unhealthy Tasks Monitor - Grouped
+resource "datadog_monitor" "unhealthy_tasks_group" {
+  for_each = var.environment == "prd" ? var.service_groups : {}
+
+  name    = "[${var.environment}] ECS Service {{service.name}} - Unhealthy Tasks Detected"
+  type    = "query alert"
+  message = <<-EOT
+    ## Service {{service.name}} has unhealthy tasks
+
+    Desired Tasks: {{desired_value}}
+    Running Tasks: {{running_value}}
+    Missing Tasks: {{value}}
+
+    This indicates tasks are not running as expected.
+
+    Please investigate:
+    * ECS Service Events
+    * Container logs
+    * Recent deployments
+    * Resource constraints
+    * Health check configurations
+
+    @${var.environment == "prd" ? "slack-dd-unhealthy-container-p1" : "slack-dd-unhealthy-container-p2"}
+  EOT
+
+  query = "max(last_1m):avg:aws.ecs.service.desired{${replace(local.group_filters[each.key], "cluster_name:", "cluster:")}} by {service} - avg:aws.ecs.service.running{${replace(local.group_filters[each.key], "cluster_name:", "cluster:")}} by {service} > 0"
+
+  monitor_thresholds {
+    critical          = 0
+    critical_recovery = -1
+  }
+
+  include_tags        = true
+  notify_no_data      = false
+  no_data_timeframe   = 10
+  require_full_window = false
+  evaluation_delay    = 30
+
+  tags     = local.group_tags[each.key]
+  priority = each.value.alert_settings.priority
+}
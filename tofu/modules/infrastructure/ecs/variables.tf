@@ -30,6 +30,28 @@ variable "services" {
   }))
 }
 
+variable "service_groups" {
+  description = "Services sharing thresholds and alert settings, monitored by one multi-alert monitor per group"
+  type = map(object({
+    cluster       = string
+    services      = list(string) # keys of the grouped entries in var.services
+    service_names = list(string)
+    thresholds = object({
+      cpu_percent      = number
+      memory_percent   = number
+      memory_available = number
+      network_errors   = number
+      desired_count    = number
+    })
+    alert_settings = object({
+      priority     = string
+      include_tags = bool
+    })
+    tags = map(string)
+  }))
+  default = {}
+}
+
 variable "notification_channels" {
   description = "Notification channel configuration"
   type = object({
@@ -5,11 +5,40 @@ provider "datadog" {
   validate = false # Temporarily disable validation for debugging
 }
 
+locals {
+  # Compact tfvars carry per-family defaults and per-entry deltas; merge them
+  # back into full entries. Scalar fields of an entry override the defaults,
+  # object fields (thresholds, alert_settings, tags) are merged key by key.
+  # Full-form tfvars have empty defaults and pass through unchanged.
+  families = {
+    services      = { entries = var.services, defaults = var.services_defaults }
+    alb           = { entries = var.alb, defaults = var.alb_defaults }
+    databases     = { entries = var.databases, defaults = var.databases_defaults }
+    queues        = { entries = var.queues, defaults = var.queues_defaults }
+    topics        = { entries = var.topics, defaults = var.topics_defaults }
+    java_services = { entries = var.java_services, defaults = var.java_services_defaults }
+    node_services = { entries = var.node_services, defaults = var.node_services_defaults }
+    apm_services  = { entries = var.apm_services, defaults = var.apm_services_defaults }
+    logs          = { entries = var.logs, defaults = var.logs_defaults }
+  }
+
+  expanded = {
+    for family, source in local.families : family => {
+      for key, entry in source.entries : key => merge(
+        { for field, value in source.defaults : field => value if !can(keys(value)) },
+        { for field, value in source.defaults : field => merge(value, lookup(entry, field, {})) if can(keys(value)) },
+        { for field, value in entry : field => value if !can(keys(value)) || !contains(keys(source.defaults), field) }
+      )
+    }
+  }
+}
+
 module "ecs_monitoring" {
   source = "../../modules/infrastructure/ecs"
 
   project_name          = var.project_name
-  services              = var.services
+  services              = local.expanded.services
+  service_groups        = var.service_groups
   notification_channels = var.notification_channels
   tags                  = var.tags
   environment           = var.environment
@@ -19,7 +48,7 @@ module "alb_monitoring" {
   source = "../../modules/infrastructure/alb"
 
   project_name          = var.project_name
-  alb                   = var.alb
+  alb                   = local.expanded.alb
   notification_channels = var.notification_channels
   tags                  = var.tags
   environment           = var.environment
@@ -30,7 +59,7 @@ module "db_monitoring" {
 
   project_name          = var.project_name
   environment           = var.environment
-  databases             = var.databases
+  databases             = local.expanded.databases
   notification_channels = var.notification_channels
   tags                  = var.tags
 }
@@ -40,7 +69,7 @@ module "sqs_monitoring" {
 
   project_name          = var.project_name
   environment           = var.environment
-  queues                = var.queues
+  queues                = local.expanded.queues
   notification_channels = var.notification_channels
   tags                  = var.tags
 }
@@ -50,7 +79,7 @@ module "sns_monitoring" {
 
   project_name          = var.project_name
   environment           = var.environment
-  topics                = var.topics
+  topics                = local.expanded.topics
   notification_channels = var.notification_channels
   tags                  = var.tags
 }
@@ -60,7 +89,7 @@ module "java_monitoring" {
 
   project_name          = var.project_name
   environment           = var.environment
-  java_services         = var.java_services
+  java_services         = local.expanded.java_services
   notification_channels = var.notification_channels
   tags                  = var.tags
 }
@@ -70,7 +99,7 @@ module "node_monitoring" {
 
   project_name          = var.project_name
   environment           = var.environment
-  node_services         = var.node_services
+  node_services         = local.expanded.node_services
   notification_channels = var.notification_channels
   tags                  = var.tags
 }
@@ -80,7 +109,8 @@ module "apm_monitoring" {
 
   project_name          = var.project_name
   environment           = var.environment
-  apm_services          = var.apm_services
+  apm_services          = local.expanded.apm_services
+  apm_service_groups    = var.apm_service_groups
   notification_channels = var.notification_channels
   tags                  = var.tags
 }
@@ -90,7 +120,7 @@ module "logs_monitoring" {
 
   project_name          = var.project_name
   environment           = var.environment
-  logs                  = var.logs
+  logs                  = local.expanded.logs
   notification_channels = var.notification_channels
   tags                  = var.tags
 }
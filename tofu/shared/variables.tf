@@ -18,177 +18,123 @@ variable "environment" {
   type        = string
 }
 
+# Monitor families are maps of full entries, or of deltas over <family>_defaults
+# in compact form (generate_tf_vars.py --compact); main.tf expands them. The
+# module consuming each expanded map checks the entry schema.
+
 variable "services" {
   description = "Map of services to monitor"
-  type = map(object({
-    name         = string
-    cluster      = string
-    service_name = string
-    task_name    = string
-    thresholds = object({
-      cpu_percent      = number
-      memory_percent   = number # Critical threshold level in percent
-      memory_available = number # Total memory allocated to the service (in MB)
-      network_errors   = number
-      desired_count    = number
-    })
-    alert_settings = object({
-      priority     = string
-      include_tags = bool
-    })
-    tags = map(string)
-  }))
+  type        = any
+}
+
+variable "services_defaults" {
+  description = "Fields shared by every services entry in compact form"
+  type        = any
+  default     = {}
 }
 
 variable "alb" {
   description = "Configuration for ALB services"
-  type = map(object({
-    name         = string
-    cluster      = string
-    alb_name     = string
-    service_name = string
-    thresholds = object({
-      request_count = number
-      latency       = number
-      error_rate    = number
-    })
-    alert_settings = object({
-      priority     = string
-      include_tags = bool
-    })
-    tags = map(string)
-  }))
+  type        = any
+}
+
+variable "alb_defaults" {
+  description = "Fields shared by every alb entry in compact form"
+  type        = any
+  default     = {}
 }
 
 variable "databases" {
   description = "Map of databases to monitor"
-  type = map(object({
-    name         = string
-    cluster      = string
-    type         = string # "aurora" or "rds"
-    identifier   = string # cluster identifier for Aurora, instance identifier for RDS
-    service_name = string
-    thresholds = object({
-      cpu_percent          = number
-      memory_threshold     = number
-      connection_threshold = number
-      iops_threshold       = number
-    })
-    alert_settings = object({
-      priority     = string
-      include_tags = bool
-    })
-    tags = map(string)
-  }))
+  type        = any
+}
+
+variable "databases_defaults" {
+  description = "Fields shared by every databases entry in compact form"
+  type        = any
+  default     = {}
 }
 
 variable "queues" {
   description = "Map of queues to monitor"
-  type = map(object({
-    name         = string
-    cluster      = string
-    service_name = string # For unified service tagging
-    queue_name   = string
-    dlq_name     = optional(string)
-    thresholds = object({
-      age_threshold   = number
-      depth_threshold = number
-      dlq_threshold   = optional(number)
-    })
-    alert_settings = object({
-      priority     = string
-      include_tags = bool
-    })
-    tags = map(string)
-  }))
+  type        = any
+}
+
+variable "queues_defaults" {
+  description = "Fields shared by every queues entry in compact form"
+  type        = any
+  default     = {}
 }
 
 variable "topics" {
   description = "Map of SNS topics to monitor"
-  type = map(object({
-    name         = string
-    cluster      = string
-    service_name = string # For unified service tagging
-    topic_name   = string
-    thresholds = object({
-      message_count_threshold = number
-      age_threshold           = number
-    })
-    alert_settings = object({
-      priority     = string
-      include_tags = bool
-    })
-    tags = map(string)
-  }))
+  type        = any
+}
+
+variable "topics_defaults" {
+  description = "Fields shared by every topics entry in compact form"
+  type        = any
+  default     = {}
 }
 
 variable "java_services" {
   description = "Configuration for Java services"
-  type = map(object({
-    name         = string
-    cluster      = string
-    service_name = string
-    service_type = string
-    alert_settings = object({
-      priority     = string
-      include_tags = bool
-    })
-    tags = map(string)
-  }))
+  type        = any
+}
+
+variable "java_services_defaults" {
+  description = "Fields shared by every java_services entry in compact form"
+  type        = any
+  default     = {}
 }
 
 variable "node_services" {
   description = "Node.js service configurations for monitoring"
-  type = map(object({
-    name         = string
-    cluster      = string
-    service_name = string
-    service_type = string
-    alert_settings = object({
-      priority     = string
-      include_tags = bool
-    })
-    tags = map(string)
-  }))
-  default = {}
+  type        = any
+  default     = {}
+}
+
+variable "node_services_defaults" {
+  description = "Fields shared by every node_services entry in compact form"
+  type        = any
+  default     = {}
 }
 
 variable "apm_services" {
   description = "APM service configurations for monitoring"
-  type = map(object({
-    name         = string
-    cluster      = string
-    service_name = string
-    service_type = string
-    alert_settings = object({
-      priority     = string
-      include_tags = bool
-    })
-    tags = map(string)
-  }))
-  default = {}
+  type        = any
+  default     = {}
+}
+
+variable "apm_services_defaults" {
+  description = "Fields shared by every apm_services entry in compact form"
+  type        = any
+  default     = {}
 }
 
 variable "logs" {
   description = "Log monitoring configurations for each service"
-  type = map(object({
-    name         = string
-    cluster      = string
-    query        = string
-    service_name = string
-    alert_settings = object({
-      priority     = string
-      include_tags = bool
-    })
-    thresholds = object({
-      critical          = number
-      critical_recovery = number
-      warning           = number
-      warning_recovery  = number
-    })
-  }))
+  type        = any
 }
 
+variable "logs_defaults" {
+  description = "Fields shared by every logs entry in compact form"
+  type        = any
+  default     = {}
+}
+
+
+variable "service_groups" {
+  description = "ECS services sharing thresholds and alert settings, monitored together (generate_tf_vars.py --group-monitors)"
+  type        = any
+  default     = {}
+}
+
+variable "apm_service_groups" {
+  description = "APM services sharing alert settings, monitored together (generate_tf_vars.py --group-monitors)"
+  type        = any
+  default     = {}
+}
 
 variable "notification_channels" {
   description = "Notification channel configuration"